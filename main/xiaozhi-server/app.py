@@ -77,6 +77,11 @@ async def main():
         get_local_ip(),
         port,
     )
+    logger.bind(tag=TAG).info(
+        "运行指标接口是\thttp://{}:{}/xiaozhi/metrics/",
+        get_local_ip(),
+        port,
+    )
     mcp_endpoint = config.get("mcp_endpoint", None)
     if mcp_endpoint is not None and "你" not in mcp_endpoint:
         # 校验MCP接入点格式
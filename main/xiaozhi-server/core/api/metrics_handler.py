@@ -0,0 +1,20 @@
+import json
+from aiohttp import web
+from core.api.base_handler import BaseHandler
+from core.utils.metrics import collect_metrics
+
+TAG = __name__
+
+
+class MetricsHandler(BaseHandler):
+    def __init__(self, config: dict):
+        super().__init__(config)
+
+    async def handle_get(self, request):
+        """处理运行指标GET请求"""
+        response = web.Response(
+            text=json.dumps(collect_metrics(), ensure_ascii=False),
+            content_type="application/json",
+        )
+        self._add_cors_headers(response)
+        return response
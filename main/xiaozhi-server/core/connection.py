@@ -10,6 +10,7 @@ import threading
 import traceback
 import subprocess
 import websockets
+import opuslib_next
 from core.utils.util import (
     extract_json_from_string,
     check_vad_update,
@@ -22,6 +23,7 @@ from core.utils.modules_initialize import (
     initialize_modules,
     initialize_tts,
     initialize_asr,
+    close_module,
 )
 from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
@@ -40,6 +42,8 @@ from config.manage_api_client import DeviceNotFoundException, DeviceBindExceptio
 from core.utils.prompt_manager import PromptManager
 from core.utils.voiceprint_provider import VoiceprintProvider
 from core.utils import textUtils
+from core.utils.audio_buffer import UtteranceAudio, DEFAULT_MAX_UTTERANCE_MS
+from core.utils.audio_ingest import UplinkAudioDecoder
 
 TAG = __name__
 
@@ -113,18 +117,33 @@ class ConnectionHandler:
         self.voiceprint_provider = None
 
         # vad相关变量
-        self.client_audio_buffer = bytearray()
+        # 连接私有的VAD会话（模型状态、解码器、音频缓冲区），由VAD模块首次检测时创建
+        self.vad_session = None
         self.client_have_voice = False
         self.last_activity_time = 0.0  # 统一的活动时间戳（毫秒）
         self.client_voice_stop = False
+        # 静音超过预判阈值（但还未确认说完）时为True，用于提前开始识别
+        self.client_voice_tentative_stop = False
         self.client_voice_window = deque(maxlen=5)
         self.last_is_voice = False
 
         # asr相关变量
         # 因为实际部署时可能会用到公共的本地ASR，不能把变量暴露给公共ASR
         # 所以涉及到ASR的变量，需要在这里定义，属于connection的私有变量
-        self.asr_audio = []
+        # 单句话的音频缓冲有固定容量，超过最长时长时强制结束本句
+        self.max_utterance_duration_ms = int(
+            self.config.get("max_utterance_duration_ms", DEFAULT_MAX_UTTERANCE_MS)
+        )
+        self.asr_audio = UtteranceAudio(self.max_utterance_duration_ms)
         self.asr_audio_queue = queue.Queue()
+        # 上行音频解码器，每个包只在接入时解码一次，PCM客户端直接透传
+        self.uplink_decoder = UplinkAudioDecoder()
+        # 正在进行的语音识别任务，用户打断时取消
+        self.asr_task = None
+        # 预判静音时提前开始的识别任务，用户继续说话时丢弃
+        self.asr_speculation = None
+        # 本地流式ASR中当前这句话的识别流
+        self.asr_stream = None
 
         # llm相关变量
         self.llm_finish_task = True
@@ -283,6 +302,14 @@ class ConnectionHandler:
                 return
             self.asr_audio_queue.put(message)
 
+    def ingest_audio(self, audio: bytes) -> bytes:
+        """上行音频接入：每个包只解码一次，解码后的PCM供VAD、ASR、声纹识别和上报共享"""
+        try:
+            return self.uplink_decoder.decode(audio, self.audio_format)
+        except opuslib_next.OpusError as e:
+            self.logger.bind(tag=TAG).info(f"解码错误: {e}")
+            return b""
+
     async def handle_restart(self, message):
         """处理服务器重启请求"""
         try:
@@ -939,6 +966,29 @@ class ConnectionHandler:
                         f"清理工具处理器时出错: {cleanup_error}"
                     )
 
+            # 取消正在进行的语音识别
+            if self.asr_task and not self.asr_task.done():
+                self.asr_task.cancel()
+            if self.asr_speculation and not self.asr_speculation.done():
+                self.asr_speculation.cancel()
+            if self.asr:
+                try:
+                    await self.asr.close_audio_channels(self)
+                except Exception as e:
+                    self.logger.bind(tag=TAG).error(f"关闭ASR音频通道时出错: {e}")
+
+            # 归还本连接缓存的上行音频占用的内存预算
+            self.asr_audio.clear()
+            voice_audio = getattr(self, "asr_audio_for_voiceprint", None)
+            if voice_audio is not None:
+                voice_audio.release_memory()
+
+            # 连接私有的VAD和ASR（私有配置或按连接创建的实例）随连接释放，共享的由服务器管理
+            if self.vad is not None and self.vad is not self._vad:
+                await close_module(self.vad)
+            if self.asr is not None and self.asr is not self._asr:
+                await close_module(self.asr)
+
             # 触发停止事件
             if self.stop_event:
                 self.stop_event.set()
@@ -1006,6 +1056,8 @@ class ConnectionHandler:
     def clear_queues(self):
         """清空所有任务队列"""
         if self.tts:
+            # 丢弃正在预合成的句子
+            self.tts.tts_pipeline.cancel()
             self.logger.bind(tag=TAG).debug(
                 f"开始清理: TTS队列大小={self.tts.tts_text_queue.qsize()}, 音频队列大小={self.tts.tts_audio_queue.qsize()}"
             )
@@ -1028,10 +1080,27 @@ class ConnectionHandler:
                 f"清理结束: TTS队列大小={self.tts.tts_text_queue.qsize()}, 音频队列大小={self.tts.tts_audio_queue.qsize()}"
             )
 
+    async def run_in_audio_thread(self, func):
+        """在音频处理线程中执行修改VAD会话或拾音状态的操作
+
+        VAD检测在音频处理线程中进行，事件循环直接修改这些状态会与检测同时发生，
+        因此排入音频队列，与音频包按到达顺序执行。func可以返回协程，协程在事件循环中执行，
+        执行期间音频处理线程等待。没有音频处理线程时直接执行
+        """
+        thread = getattr(self, "asr_priority_thread", None)
+        if thread is not None and thread.is_alive():
+            self.asr_audio_queue.put(func)
+            return
+        result = func()
+        if asyncio.iscoroutine(result):
+            await result
+
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        if self.vad_session:
+            self.vad_session.audio_buffer.clear()
         self.client_have_voice = False
         self.client_voice_stop = False
+        self.client_voice_tentative_stop = False
         self.logger.bind(tag=TAG).debug("VAD states reset.")
 
     def chat_and_close(self, text):
@@ -1,4 +1,5 @@
 import json
+import asyncio
 
 TAG = __name__
 
@@ -7,6 +8,11 @@ async def handleAbortMessage(conn):
     conn.logger.bind(tag=TAG).info("Abort message received")
     # 设置成打断状态，会自动打断llm、tts任务
     conn.client_abort = True
+    # 取消还未完成的语音识别，避免打断后又开始回答上一句
+    # （识别完成后开始对话时也会打断播放，此时不能取消识别任务自身）
+    asr_task = conn.asr_task
+    if asr_task and not asr_task.done() and asr_task is not asyncio.current_task():
+        asr_task.cancel()
     conn.clear_queues()
     # 打断客户端说话状态
     await conn.websocket.send(
@@ -13,9 +13,14 @@ async def handleHelloMessage(conn, msg_json):
     """处理hello消息"""
     audio_params = msg_json.get("audio_params")
     if audio_params:
-        format = audio_params.get("format")
+        format = str(audio_params.get("format") or "opus").lower()
         conn.logger.bind(tag=TAG).info(f"客户端音频格式: {format}")
         conn.audio_format = format
+        if format == "pcm" and str(audio_params.get("sample_rate", 16000)) != "16000":
+            # 上行PCM不做重采样，VAD和ASR都按16kHz处理
+            conn.logger.bind(tag=TAG).warning(
+                f"PCM上行仅支持16kHz采样率，客户端声明为: {audio_params.get('sample_rate')}"
+            )
         conn.welcome_msg["audio_params"] = audio_params
     features = msg_json.get("features")
     if features:
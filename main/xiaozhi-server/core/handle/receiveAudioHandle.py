@@ -5,14 +5,18 @@ from core.handle.intentHandler import handle_user_intent
 from core.utils.output_counter import check_device_output_limit
 from core.handle.abortHandle import handleAbortMessage
 from core.handle.sendAudioHandle import SentenceType
-from core.utils.util import audio_to_data_stream
+from core.utils.audio_assets import audio_asset_store
 
 TAG = __name__
 
 
-async def handleAudioMessage(conn, audio):
+async def handleAudioMessage(conn, audio, have_voice=None, pcm_frame=None):
+    # 音频处理线程中已经解码、检测过的直接使用
+    if pcm_frame is None:
+        pcm_frame = conn.ingest_audio(audio)
     # 当前片段是否有人说话
-    have_voice = conn.vad.is_vad(conn, audio)
+    if have_voice is None:
+        have_voice = conn.vad.is_vad(conn, pcm_frame)
 
     if have_voice:
         if conn.client_is_speaking:
@@ -20,7 +24,7 @@ async def handleAudioMessage(conn, audio):
     # 设备长时间空闲检测，用于say goodbye
     await no_voice_close_connect(conn, have_voice)
     # 接收音频
-    await conn.asr.receive_audio(conn, audio, have_voice)
+    await conn.asr.receive_audio(conn, audio, have_voice, pcm_frame)
 
 async def startToChat(conn, text):
     # 检查输入是否是JSON格式（包含说话人信息）
@@ -148,12 +152,8 @@ async def check_bind_device(conn):
 
 
 def play_audio_frames(conn, file_path):
-    """播放音频文件并处理发送帧数据"""
+    """播放音频文件并处理发送帧数据，提示音只在首次使用（或文件修改后）转码一次"""
     def handle_audio_frame(frame_data):
         conn.tts.tts_audio_queue.put((SentenceType.MIDDLE, frame_data, None))
 
-    audio_to_data_stream(
-        file_path,
-        is_opus=True,
-        callback=handle_audio_frame
-    )
+    audio_asset_store.play(file_path, callback=handle_audio_frame)
@@ -14,6 +14,7 @@ import time
 import opuslib_next
 
 from config.manage_api_client import report as manage_report
+from core.utils.audio_buffer import UtteranceAudio
 
 TAG = __name__
 
@@ -25,11 +26,14 @@ def report(conn, type, text, opus_data, report_time):
         conn: 连接对象
         type: 上报类型，1为用户，2为智能体
         text: 合成文本
-        opus_data: opus音频数据
+        opus_data: opus音频数据，用户语音为接入时已解码的UtteranceAudio
         report_time: 上报时间
     """
     try:
-        if opus_data:
+        if isinstance(opus_data, UtteranceAudio):
+            # 用户语音在接入时已经解码，直接使用PCM
+            audio_data = pcm_to_wav(opus_data.pcm_bytes()) if opus_data else None
+        elif opus_data:
             audio_data = opus_to_wav(conn, opus_data)
         else:
             audio_data = None
@@ -69,8 +73,15 @@ def opus_to_wav(conn, opus_data):
     if not pcm_data:
         raise ValueError("没有有效的PCM数据")
 
+    return pcm_to_wav(b"".join(pcm_data))
+
+
+def pcm_to_wav(pcm_data_bytes):
+    """将16kHz单声道16位PCM数据转换为WAV格式的字节流"""
+    if not pcm_data_bytes:
+        raise ValueError("没有有效的PCM数据")
+
     # 创建WAV文件头
-    pcm_data_bytes = b"".join(pcm_data)
     num_samples = len(pcm_data_bytes) // 2  # 16-bit samples
 
     # WAV文件头
@@ -131,7 +142,7 @@ def enqueue_asr_report(conn, text, opus_data):
     Args:
         conn: 连接对象
         text: 合成文本
-        opus_data: opus音频数据
+        opus_data: 用户语音（UtteranceAudio），纯文本上报时为空列表
     """
     try:
         # 使用连接对象的队列，传入文本和二进制数据而非文件路径
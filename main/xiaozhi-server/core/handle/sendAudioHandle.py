@@ -3,6 +3,7 @@ import asyncio
 import time
 from core.providers.tts.dto.dto import SentenceType
 from core.utils import textUtils
+from core.utils.audio_assets import audio_asset_store
 
 TAG = __name__
 
@@ -101,7 +102,7 @@ async def send_tts_message(conn, state, text=None):
             stop_tts_notify_voice = conn.config.get(
                 "stop_tts_notify_voice", "config/assets/tts_notify.mp3"
             )
-            conn.tts.audio_to_opus_data_stream(
+            audio_asset_store.play(
                 stop_tts_notify_voice,
                 callback=lambda audio_data: asyncio.run_coroutine_threadsafe(
                     sendAudio(conn, audio_data, True), conn.loop
@@ -142,3 +143,20 @@ async def send_stt_message(conn, text):
     )
     conn.client_is_speaking = True
     await send_tts_message(conn, "start")
+
+
+async def send_stt_partial_message(conn, text):
+    """发送流式识别的中间结果，客户端可实时显示，最终结果仍由send_stt_message发送"""
+    stt_text = textUtils.get_string_no_punctuation_or_emoji(text)
+    if not stt_text:
+        return
+    await conn.websocket.send(
+        json.dumps(
+            {
+                "type": "stt",
+                "text": stt_text,
+                "is_final": False,
+                "session_id": conn.session_id,
+            }
+        )
+    )
@@ -28,24 +28,10 @@ async def handleTextMessage(conn, message):
             await handleAbortMessage(conn)
         elif msg_json["type"] == "listen":
             conn.logger.bind(tag=TAG).info(f"收到listen消息：{message}")
-            if "mode" in msg_json:
-                conn.client_listen_mode = msg_json["mode"]
-                conn.logger.bind(tag=TAG).debug(
-                    f"客户端拾音模式：{conn.client_listen_mode}"
-                )
-            if msg_json["state"] == "start":
-                conn.client_have_voice = True
-                conn.client_voice_stop = False
-            elif msg_json["state"] == "stop":
-                conn.client_have_voice = True
-                conn.client_voice_stop = True
-                if len(conn.asr_audio) > 0:
-                    await handleAudioMessage(conn, b"")
-            elif msg_json["state"] == "detect":
-                conn.client_have_voice = False
-                conn.asr_audio.clear()
+            # 拾音状态由音频处理线程按顺序修改，不与VAD检测同时进行
+            await conn.run_in_audio_thread(lambda: handleListenState(conn, msg_json))
+            if msg_json["state"] == "detect":
                 if "text" in msg_json:
-                    conn.last_activity_time = time.time() * 1000
                     original_text = msg_json["text"]  # 保留原始文本
                     filtered_len, filtered_text = remove_punctuation_and_length(
                         original_text
@@ -152,3 +138,23 @@ async def handleTextMessage(conn, message):
             conn.logger.bind(tag=TAG).error(f"收到未知类型消息：{message}")
     except json.JSONDecodeError:
         await conn.websocket.send(message)
+
+
+async def handleListenState(conn, msg_json):
+    """更新拾音模式和拾音状态"""
+    if "mode" in msg_json:
+        conn.client_listen_mode = msg_json["mode"]
+        conn.logger.bind(tag=TAG).debug(f"客户端拾音模式：{conn.client_listen_mode}")
+    if msg_json["state"] == "start":
+        conn.client_have_voice = True
+        conn.client_voice_stop = False
+    elif msg_json["state"] == "stop":
+        conn.client_have_voice = True
+        conn.client_voice_stop = True
+        if len(conn.asr_audio) > 0:
+            await handleAudioMessage(conn, b"")
+    elif msg_json["state"] == "detect":
+        conn.client_have_voice = False
+        conn.asr_audio.clear()
+        if "text" in msg_json:
+            conn.last_activity_time = time.time() * 1000
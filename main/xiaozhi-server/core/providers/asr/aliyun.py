@@ -88,6 +88,9 @@ class AccessToken:
 
 
 class ASRProvider(ASRProviderBase):
+    # Token刷新使用同步的requests请求，识别交给线程池执行
+    blocking = True
+
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
         self.interface_type = InterfaceType.NON_STREAM
@@ -233,7 +236,7 @@ class ASRProvider(ASRProviderBase):
             if self.delete_audio_file:
                 pass
             else:
-                file_path = self.save_audio_to_file(pcm_data, session_id)
+                file_path = self.archive_audio(pcm_data, session_id)
 
             # 发送请求并获取文本
             text = await self._send_request(combined_pcm_data)
@@ -7,7 +7,6 @@ import hashlib
 import asyncio
 import requests
 import websockets
-import opuslib_next
 import random
 from typing import Optional, Tuple, List
 from urllib import parse
@@ -15,6 +14,7 @@ from datetime import datetime
 from config.logger import setup_logging
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.audio_buffer import UtteranceAudio
 
 TAG = __name__
 logger = setup_logging()
@@ -72,7 +72,6 @@ class ASRProvider(ASRProviderBase):
         self.interface_type = InterfaceType.STREAM
         self.config = config
         self.text = ""
-        self.decoder = opuslib_next.Decoder(16000, 1)
         self.asr_ws = None
         self.forward_task = None
         self.is_processing = False
@@ -125,17 +124,13 @@ class ASRProvider(ASRProviderBase):
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
 
-    async def receive_audio(self, conn, audio, audio_have_voice):
+    async def receive_audio(self, conn, audio, audio_have_voice, pcm_frame=b""):
         # 初始化音频缓存
         if not hasattr(conn, 'asr_audio_for_voiceprint'):
-            conn.asr_audio_for_voiceprint = []
-        
-        # 存储音频数据
-        if audio:
-            conn.asr_audio_for_voiceprint.append(audio)
-        
-        conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+            conn.asr_audio_for_voiceprint = UtteranceAudio(conn.max_utterance_duration_ms)
+
+        conn.asr_audio.append(audio, pcm_frame)
+        conn.asr_audio.keep_last(10)
 
         # 只在有声音且没有连接时建立连接
         if audio_have_voice and not self.is_processing:
@@ -145,10 +140,25 @@ class ASRProvider(ASRProviderBase):
                 logger.bind(tag=TAG).error(f"开始识别失败: {str(e)}")
                 await self._cleanup(conn)
                 return
+            # 新的识别会话，声纹和上报用的音频从预录音频（含当前包）重新开始
+            conn.asr_audio_for_voiceprint.release_memory()
+            conn.asr_audio_for_voiceprint = conn.asr_audio.copy()
+        elif self.is_processing and audio:
+            # 只在识别会话进行中保存音频，静音期间不占用音频内存
+            voice_audio = conn.asr_audio_for_voiceprint
+            if voice_audio.is_full:
+                # 已请求结束识别，等待服务端返回最终结果
+                return
+            if not voice_audio.append(audio, pcm_frame):
+                # 超过单句最长时长或全局音频内存预算，结束本次识别
+                logger.bind(tag=TAG).warning(
+                    f"单句音频已满（{len(voice_audio)}包），结束本次识别"
+                )
+                await self._send_stop_request()
+                return
 
-        if self.asr_ws and self.is_processing and self.server_ready:
+        if self.asr_ws and self.is_processing and self.server_ready and pcm_frame:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
                 await self.asr_ws.send(pcm_frame)
             except Exception as e:
                 logger.bind(tag=TAG).warning(f"发送音频失败: {str(e)}")
@@ -157,8 +167,9 @@ class ASRProvider(ASRProviderBase):
     async def _start_recognition(self, conn):
         """开始识别会话"""
         if self._is_token_expired():
-            self._refresh_token()
-        
+            # Token刷新是同步HTTP请求，放到线程池中执行，避免阻塞事件循环
+            await asyncio.get_running_loop().run_in_executor(None, self._refresh_token)
+
         # 建立连接
         headers = {"X-NLS-Token": self.token}
         self.asr_ws = await websockets.connect(
@@ -229,10 +240,9 @@ class ASRProvider(ASRProviderBase):
                         
                         # 发送缓存音频
                         if conn.asr_audio:
-                            for cached_audio in conn.asr_audio[-10:]:
+                            for cached_pcm in conn.asr_audio.pcm_frames[-10:]:
                                 try:
-                                    pcm_frame = self.decoder.decode(cached_audio, 960)
-                                    await self.asr_ws.send(pcm_frame)
+                                    await self.asr_ws.send(cached_pcm)
                                 except Exception as e:
                                     logger.bind(tag=TAG).warning(f"发送缓存音频失败: {e}")
                                     break
@@ -248,12 +258,12 @@ class ASRProvider(ASRProviderBase):
                         text = payload.get("result", "")
                         if text:
                             self.text = text
-                            conn.reset_vad_states()
+                            await conn.run_in_audio_thread(conn.reset_vad_states)
                             # 传递缓存的音频数据
-                            audio_data = getattr(conn, 'asr_audio_for_voiceprint', [])
+                            audio_data = getattr(conn, 'asr_audio_for_voiceprint', UtteranceAudio())
                             await self.handle_voice_stop(conn, audio_data)
                             # 清空缓存
-                            conn.asr_audio_for_voiceprint = []
+                            conn.asr_audio_for_voiceprint = UtteranceAudio(conn.max_utterance_duration_ms)
                             break
                     elif message_name == "TranscriptionCompleted":
                         # 识别完成
@@ -273,36 +283,43 @@ class ASRProvider(ASRProviderBase):
         finally:
             await self._cleanup(conn)
 
+    async def _send_stop_request(self):
+        """请求结束识别，服务端返回最终结果（SentenceEnd）后结束本句"""
+        if not self.asr_ws:
+            return
+        try:
+            stop_msg = {
+                "header": {
+                    "namespace": "SpeechTranscriber",
+                    "name": "StopTranscription",
+                    "status": 20000000,
+                    "message_id": ''.join(random.choices('0123456789abcdef', k=32)),
+                    "status_text": "Client:Stop",
+                    "appkey": self.appkey
+                }
+            }
+            logger.bind(tag=TAG).info("正在发送ASR终止请求")
+            await self.asr_ws.send(json.dumps(stop_msg, ensure_ascii=False))
+            logger.bind(tag=TAG).info("ASR终止请求已发送")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"ASR终止请求发送失败: {e}")
+
     async def _cleanup(self, conn):
         """清理资源"""
         logger.bind(tag=TAG).info(f"开始ASR会话清理 | 当前状态: processing={self.is_processing}, server_ready={self.server_ready}")
         
         # 清理连接的音频缓存
         if conn and hasattr(conn, 'asr_audio_for_voiceprint'):
-            conn.asr_audio_for_voiceprint = []
+            conn.asr_audio_for_voiceprint.release_memory()
+            conn.asr_audio_for_voiceprint = UtteranceAudio(conn.max_utterance_duration_ms)
         
         # 判断是否需要发送终止请求
         should_stop = self.is_processing or self.server_ready
         
         # 发送停止识别请求
         if self.asr_ws and should_stop:
-            try:
-                stop_msg = {
-                    "header": {
-                        "namespace": "SpeechTranscriber",
-                        "name": "StopTranscription",
-                        "status": 20000000,
-                        "message_id": ''.join(random.choices('0123456789abcdef', k=32)),
-                        "status_text": "Client:Stop",
-                        "appkey": self.appkey
-                    }
-                }
-                logger.bind(tag=TAG).info("正在发送ASR终止请求")
-                await self.asr_ws.send(json.dumps(stop_msg, ensure_ascii=False))
-                await asyncio.sleep(0.1)
-                logger.bind(tag=TAG).info("ASR终止请求已发送")
-            except Exception as e:
-                logger.bind(tag=TAG).error(f"ASR终止请求发送失败: {e}")
+            await self._send_stop_request()
+            await asyncio.sleep(0.1)
         
         # 状态重置（在终止请求发送后）
         self.is_processing = False
@@ -339,5 +356,5 @@ class ASRProvider(ASRProviderBase):
         return result, None
 
     async def close(self):
-        """关闭资源"""
-        await self._cleanup()
+        """关闭资源，连接关闭时调用，连接的音频缓存由连接自己释放"""
+        await self._cleanup(None)
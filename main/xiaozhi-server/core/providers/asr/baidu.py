@@ -11,6 +11,9 @@ logger = setup_logging()
 
 
 class ASRProvider(ASRProviderBase):
+    # 百度语音SDK为同步调用
+    blocking = True
+
     def __init__(self, config: dict, delete_audio_file: bool = True):
         super().__init__()
         self.interface_type = InterfaceType.NON_STREAM
@@ -16,13 +16,44 @@ from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
 from core.utils.util import remove_punctuation_and_length
+from core.utils.audio_buffer import UtteranceAudio
+from core.utils.audio_archiver import get_audio_archiver
+from core.utils.asr_cache import get_asr_cache
 from core.handle.receiveAudioHandle import handleAudioMessage
 
 TAG = __name__
 logger = setup_logging()
 
 
+# 单句识别（含声纹识别）的超时时间（秒）
+ASR_TIMEOUT = 15
+# 去除首尾静音时，语音前后保留的音频长度（16kHz/16位PCM，200ms）
+SPEECH_PADDING_BYTES = 16000 * 2 * 200 // 1000
+
+# 阻塞式ASR共享的长驻线程池，不再为每句话创建线程池
+_blocking_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="asr-blocking"
+)
+_worker_local = threading.local()
+
+
+def _run_in_worker_loop(coroutine_func, *args):
+    """在线程池线程中运行协程，每个线程复用自己的事件循环"""
+    loop = getattr(_worker_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _worker_local.loop = loop
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coroutine_func(*args))
+
+
 class ASRProviderBase(ABC):
+    # speech_to_text内部包含阻塞调用（同步HTTP请求、同步SDK）的提供者设为True，
+    # 识别会交给共享线程池执行，避免阻塞事件循环
+    blocking = False
+    # 是否支持静音预判时提前识别，流式识别的提供者说完时已基本识别完毕，不需要提前识别
+    speculative = True
+
     def __init__(self):
         pass
 
@@ -33,13 +64,30 @@ class ASRProviderBase(ABC):
         )
         conn.asr_priority_thread.start()
 
+    # 关闭音频通道，连接断开时调用，用于释放连接在共享ASR中占用的资源
+    async def close_audio_channels(self, conn):
+        pass
+
+    # 释放模块占用的推理线程、进程池等资源，模块被替换或随连接释放时调用
+    async def close(self):
+        pass
+
     # 有序处理ASR音频
     def asr_text_priority_thread(self, conn):
         while not conn.stop_event.is_set():
             try:
                 message = conn.asr_audio_queue.get(timeout=1)
+                if callable(message):
+                    # 事件循环排入的状态修改（拾音状态、重置VAD），与音频包按到达顺序执行
+                    result = message()
+                    if asyncio.iscoroutine(result):
+                        asyncio.run_coroutine_threadsafe(result, conn.loop).result()
+                    continue
+                # 解码和VAD在本线程中完成（推理由共享的批量引擎执行），不阻塞事件循环
+                pcm_frame = conn.ingest_audio(message)
+                have_voice = conn.vad.is_vad(conn, pcm_frame)
                 future = asyncio.run_coroutine_threadsafe(
-                    handleAudioMessage(conn, message),
+                    handleAudioMessage(conn, message, have_voice, pcm_frame),
                     conn.loop,
                 )
                 future.result()
@@ -52,132 +100,186 @@ class ASRProviderBase(ABC):
                 continue
 
     # 接收音频
-    async def receive_audio(self, conn, audio, audio_have_voice):
+    async def receive_audio(self, conn, audio, audio_have_voice, pcm_frame=b""):
         if conn.client_listen_mode == "auto" or conn.client_listen_mode == "realtime":
             have_voice = audio_have_voice
         else:
             have_voice = conn.client_have_voice
         
-        conn.asr_audio.append(audio)
+        conn.asr_audio.append(audio, pcm_frame, audio_have_voice)
         if not have_voice and not conn.client_have_voice:
-            conn.asr_audio = conn.asr_audio[-10:]
+            conn.asr_audio.keep_last(10)
             return
 
+        if conn.asr_audio.is_full and not conn.client_voice_stop:
+            # 超过单句最长时长或全局音频内存预算，强制结束本句
+            logger.bind(tag=TAG).warning(
+                f"单句音频已满（{len(conn.asr_audio)}包），强制结束本句并开始识别"
+            )
+            conn.client_voice_stop = True
+
+        # 用户继续说话，提前开始的识别作废
+        if audio_have_voice:
+            self._discard_speculation(conn)
+
         if conn.client_voice_stop:
-            asr_audio_task = conn.asr_audio.copy()
-            conn.asr_audio.clear()
+            asr_audio_task = conn.asr_audio.take()
             conn.reset_vad_states()
+            speculation, conn.asr_speculation = conn.asr_speculation, None
 
             if len(asr_audio_task) > 15:
-                await self.handle_voice_stop(conn, asr_audio_task)
+                await self.handle_voice_stop(conn, asr_audio_task, speculation)
+            else:
+                asr_audio_task.clear()
+                if speculation:
+                    speculation.cancel()
+        elif (
+            self.speculative
+            and conn.client_voice_tentative_stop
+            and conn.asr_speculation is None
+            and conn.client_listen_mode in ("auto", "realtime")
+            and len(conn.asr_audio) > 15
+        ):
+            # 静音已超过预判阈值：先用已有音频开始识别，确认说完后直接使用结果
+            conn.asr_speculation = asyncio.ensure_future(
+                self._transcribe(conn, conn.asr_audio.copy())
+            )
+
+    def _discard_speculation(self, conn):
+        speculation, conn.asr_speculation = conn.asr_speculation, None
+        if speculation:
+            speculation.cancel()
+            logger.bind(tag=TAG).debug("用户继续说话，丢弃提前识别的结果")
 
     # 处理语音停止
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
-        """并行处理ASR和声纹识别"""
+    async def handle_voice_stop(
+        self, conn, asr_audio_task: UtteranceAudio, speculation=None
+    ):
+        """并行处理ASR和声纹识别，用户打断时取消
+
+        speculation是静音预判时提前开始的识别任务，之后新增的只有静音，直接使用它的结果
+        """
+        task = asyncio.ensure_future(
+            self._recognize(conn, asr_audio_task, speculation)
+        )
+        conn.asr_task = task
         try:
-            total_start_time = time.monotonic()
-            
-            # 准备音频数据
-            if conn.audio_format == "pcm":
-                pcm_data = asr_audio_task
-            else:
-                pcm_data = self.decode_opus(asr_audio_task)
-            
-            combined_pcm_data = b"".join(pcm_data)
-            
-            # 预先准备WAV数据
-            wav_data = None
-            # 使用连接的声纹识别提供者
-            if conn.voiceprint_provider and combined_pcm_data:
-                wav_data = self._pcm_to_wav(combined_pcm_data)
-            
-            
-            # 定义ASR任务
-            def run_asr():
-                start_time = time.monotonic()
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        result = loop.run_until_complete(
-                            self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
-                        )
-                        end_time = time.monotonic()
-                        logger.bind(tag=TAG).info(f"ASR耗时: {end_time - start_time:.3f}s")
-                        return result
-                    finally:
-                        loop.close()
-                except Exception as e:
-                    end_time = time.monotonic()
-                    logger.bind(tag=TAG).error(f"ASR失败: {e}")
-                    return ("", None)
-            
-            # 定义声纹识别任务
-            def run_voiceprint():
-                if not wav_data:
-                    return None
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        # 使用连接的声纹识别提供者
-                        result = loop.run_until_complete(
-                            conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
-                        )
-                        return result
-                    finally:
-                        loop.close()
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"声纹识别失败: {e}")
-                    return None
-            
-            # 使用线程池执行器并行运行
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as thread_executor:
-                asr_future = thread_executor.submit(run_asr)
-                
-                if conn.voiceprint_provider and wav_data:
-                    voiceprint_future = thread_executor.submit(run_voiceprint)
-                    
-                    # 等待两个线程都完成
-                    asr_result = asr_future.result(timeout=15)
-                    voiceprint_result = voiceprint_future.result(timeout=15)
-                    
-                    results = {"asr": asr_result, "voiceprint": voiceprint_result}
-                else:
-                    asr_result = asr_future.result(timeout=15)
-                    results = {"asr": asr_result, "voiceprint": None}
-            
-            
-            # 处理结果
-            raw_text, file_path = results.get("asr", ("", None))
-            speaker_name = results.get("voiceprint", None)
-            
-            # 记录识别结果
-            if raw_text:
-                logger.bind(tag=TAG).info(f"识别文本: {raw_text}")
-            if speaker_name:
-                logger.bind(tag=TAG).info(f"识别说话人: {speaker_name}")
-            
-            # 性能监控
-            total_time = time.monotonic() - total_start_time
-            logger.bind(tag=TAG).info(f"总处理耗时: {total_time:.3f}s")
-            
-            # 检查文本长度
-            text_len, _ = remove_punctuation_and_length(raw_text)
-            self.stop_ws_connection()
-            
-            if text_len > 0:
-                # 构建包含说话人信息的JSON字符串
-                enhanced_text = self._build_enhanced_text(raw_text, speaker_name)
-                
-                # 使用自定义模块进行上报
-                await startToChat(conn, enhanced_text)
-                enqueue_asr_report(conn, enhanced_text, asr_audio_task)
-                
+            await task
+        except asyncio.CancelledError:
+            logger.bind(tag=TAG).info("语音识别已被打断取消")
         except Exception as e:
             logger.bind(tag=TAG).error(f"处理语音停止失败: {e}")
-            import traceback
             logger.bind(tag=TAG).debug(f"异常详情: {traceback.format_exc()}")
+        finally:
+            if conn.asr_task is task:
+                conn.asr_task = None
+            if speculation and not speculation.done():
+                speculation.cancel()
+            # 识别已结束，音频只剩上报队列使用，归还上行音频预算
+            asr_audio_task.release_memory()
+
+    async def _transcribe(self, conn, asr_audio_task: UtteranceAudio):
+        """ASR和声纹识别在事件循环上并发等待，只有阻塞式的ASR才交给共享线程池"""
+        # 按VAD判定去掉首尾静音（预录音和结束时的静音窗口），减少识别计算量和上传数据量
+        asr_audio_task = asr_audio_task.trim_silence(SPEECH_PADDING_BYTES)
+
+        # 准备音频数据，接入时已经解码过，这里直接使用PCM
+        pcm_data = asr_audio_task.pcm_frames
+        combined_pcm_data = asr_audio_task.pcm_bytes()
+
+        # 预先准备WAV数据
+        wav_data = None
+        # 使用连接的声纹识别提供者
+        if conn.voiceprint_provider and combined_pcm_data:
+            wav_data = self._pcm_to_wav(combined_pcm_data)
+
+        # 开启短句缓存时，同一设备重复说的短指令直接使用缓存的识别结果
+        asr_cache = get_asr_cache(conn.config.get("asr_cache"))
+        if asr_cache is not None:
+            asr_result = asr_cache.recognize(
+                conn.device_id,
+                combined_pcm_data,
+                lambda: self._run_asr(pcm_data, conn.session_id),
+            )
+        else:
+            asr_result = self._run_asr(pcm_data, conn.session_id)
+
+        return await asyncio.gather(
+            asr_result,
+            self._run_voiceprint(conn, wav_data),
+        )
+
+    async def _recognize(self, conn, asr_audio_task: UtteranceAudio, speculation=None):
+        total_start_time = time.monotonic()
+
+        if speculation is not None:
+            logger.bind(tag=TAG).debug("使用静音预判时提前识别的结果")
+            transcription = speculation
+        else:
+            transcription = self._transcribe(conn, asr_audio_task)
+        asr_result, speaker_name = await asyncio.wait_for(
+            transcription, timeout=ASR_TIMEOUT
+        )
+
+        # 处理结果
+        raw_text, file_path = asr_result
+
+        # 记录识别结果
+        if raw_text:
+            logger.bind(tag=TAG).info(f"识别文本: {raw_text}")
+        if speaker_name:
+            logger.bind(tag=TAG).info(f"识别说话人: {speaker_name}")
+
+        # 性能监控
+        total_time = time.monotonic() - total_start_time
+        logger.bind(tag=TAG).info(f"总处理耗时: {total_time:.3f}s")
+
+        # 检查文本长度
+        text_len, _ = remove_punctuation_and_length(raw_text)
+        self.stop_ws_connection()
+
+        if text_len > 0:
+            # 构建包含说话人信息的JSON字符串
+            enhanced_text = self._build_enhanced_text(raw_text, speaker_name)
+
+            # 使用自定义模块进行上报
+            await startToChat(conn, enhanced_text)
+            enqueue_asr_report(conn, enhanced_text, asr_audio_task)
+
+    async def _run_asr(self, pcm_data: List[bytes], session_id: str):
+        start_time = time.monotonic()
+        try:
+            if self.blocking:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    _blocking_executor,
+                    _run_in_worker_loop,
+                    self.speech_to_text,
+                    pcm_data,
+                    session_id,
+                    "pcm",
+                )
+            else:
+                result = await self.speech_to_text(pcm_data, session_id, "pcm")
+            logger.bind(tag=TAG).info(f"ASR耗时: {time.monotonic() - start_time:.3f}s")
+            return result or ("", None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"ASR失败: {e}")
+            return ("", None)
+
+    async def _run_voiceprint(self, conn, wav_data: Optional[bytes]):
+        if not wav_data:
+            return None
+        try:
+            return await conn.voiceprint_provider.identify_speaker(
+                wav_data, conn.session_id
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"声纹识别失败: {e}")
+            return None
 
     def _build_enhanced_text(self, text: str, speaker_name: Optional[str]) -> str:
         """构建包含说话人信息的文本"""
@@ -233,6 +335,15 @@ class ASRProviderBase(ABC):
 
         return file_path
 
+    def archive_audio(self, pcm_data: List[bytes], session_id: str) -> Optional[str]:
+        """delete_audio为false时把音频交给后台线程归档，返回归档文件路径"""
+        if getattr(self, "delete_audio_file", True):
+            return None
+        module_name = self.__class__.__module__.split(".")[-1]
+        return get_audio_archiver(self.output_dir).archive(
+            pcm_data, f"asr_{module_name}_{session_id}"
+        )
+
     @abstractmethod
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
@@ -249,7 +249,8 @@ class ASRProvider(ASRProviderBase):
             if self.delete_audio_file:
                 pass
             else:
-                file_path = self.save_audio_to_file(pcm_data, session_id)
+                # 音频由后台线程写入磁盘，不阻塞事件循环
+                file_path = self.archive_audio(pcm_data, session_id)
 
             # 直接使用PCM数据
             # 计算分段大小 (单声道, 16bit, 16kHz采样率)
@@ -3,8 +3,10 @@ import gzip
 import uuid
 import asyncio
 import websockets
-import opuslib_next
 from core.providers.asr.base import ASRProviderBase
+from core.utils.audio_buffer import UtteranceAudio
+from core.utils.ws_pool import get_ws_pool
+from core.utils.audio_aggregator import PCMAggregator
 from config.logger import setup_logging
 from core.providers.asr.dto.dto import InterfaceType
 
@@ -20,7 +22,6 @@ class ASRProvider(ASRProviderBase):
         self.text = ""
         self.max_retries = 3
         self.retry_delay = 2
-        self.decoder = opuslib_next.Decoder(16000, 1)
         self.asr_ws = None
         self.forward_task = None
         self.is_processing = False  # 添加处理状态标志
@@ -50,88 +51,67 @@ class ASRProvider(ASRProviderBase):
         self.auth_method = config.get("auth_method", "token")
         self.secret = config.get("secret", "access_secret")
 
+        # 上行音频聚合：按服务端推荐的包长（默认200ms）合并后再压缩发送，0表示每个包直接发送
+        send_chunk_ms = config.get("send_chunk_ms", "200")
+        self.uplink_aggregator = PCMAggregator(
+            int(send_chunk_ms) if send_chunk_ms not in ("", None) else 200
+        )
+
+        # 预热连接池：提前建立并初始化好的连接，检测到说话时直接取用
+        # 一次识别会话结束后服务端会关闭连接，因此连接用完即关闭，由连接池在后台补充
+        pool_size = config.get("pool_size", "0")
+        pool_max_idle_time = config.get("pool_max_idle_time", "10")
+        self.ws_pool = None
+        if pool_size and int(pool_size) > 0:
+            self.ws_pool = get_ws_pool(
+                (__name__, json.dumps(config, sort_keys=True, default=str)),
+                self._connect_session,
+                pool_size=int(pool_size),
+                max_idle_time=float(pool_max_idle_time) if pool_max_idle_time else 10,
+            )
+
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
+        if self.ws_pool:
+            self.ws_pool.start()
+
+    async def receive_audio(self, conn, audio, audio_have_voice, pcm_frame=b""):
+        conn.asr_audio.append(audio, pcm_frame)
+        conn.asr_audio.keep_last(10)
 
-    async def receive_audio(self, conn, audio, audio_have_voice):
-        conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
-        
-        # 存储音频数据
         if not hasattr(conn, 'asr_audio_for_voiceprint'):
-            conn.asr_audio_for_voiceprint = []
-        conn.asr_audio_for_voiceprint.append(audio)
-        
+            conn.asr_audio_for_voiceprint = UtteranceAudio(conn.max_utterance_duration_ms)
+
         # 当没有音频数据时处理完整语音片段
         if not audio and len(conn.asr_audio_for_voiceprint) > 0:
             await self.handle_voice_stop(conn, conn.asr_audio_for_voiceprint)
-            conn.asr_audio_for_voiceprint = []
+            conn.asr_audio_for_voiceprint = UtteranceAudio(conn.max_utterance_duration_ms)
 
         # 如果本次有声音，且之前没有建立连接
         if audio_have_voice and self.asr_ws is None and not self.is_processing:
             try:
                 self.is_processing = True
-                # 建立新的WebSocket连接
-                headers = self.token_auth() if self.auth_method == "token" else None
-                logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
-
-                self.asr_ws = await websockets.connect(
-                    self.ws_url,
-                    additional_headers=headers,
-                    max_size=1000000000,
-                    ping_interval=None,
-                    ping_timeout=None,
-                    close_timeout=10,
-                )
+                # 优先使用连接池中已完成初始化的连接
+                if self.ws_pool:
+                    self.asr_ws = await self.ws_pool.acquire()
+                else:
+                    self.asr_ws = await self._connect_session()
 
-                # 发送初始化请求
-                request_params = self.construct_request(str(uuid.uuid4()))
-                try:
-                    payload_bytes = str.encode(json.dumps(request_params))
-                    payload_bytes = gzip.compress(payload_bytes)
-                    full_client_request = self.generate_header()
-                    full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
-                    full_client_request.extend(payload_bytes)
-
-                    logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
-                    await self.asr_ws.send(full_client_request)
-
-                    # 等待初始化响应
-                    init_res = await self.asr_ws.recv()
-                    result = self.parse_response(init_res)
-                    logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
-
-                    # 检查初始化响应
-                    if "code" in result and result["code"] != 1000:
-                        error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
-                        logger.bind(tag=TAG).error(error_msg)
-                        raise Exception(error_msg)
-
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
-                    if hasattr(e, "__cause__") and e.__cause__:
-                        logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
-                    raise e
+                # 新的识别会话，声纹和上报用的音频从预录音频（含当前包）重新开始
+                conn.asr_audio_for_voiceprint.release_memory()
+                conn.asr_audio_for_voiceprint = conn.asr_audio.copy()
 
                 # 启动接收ASR结果的异步任务
                 self.forward_task = asyncio.create_task(self._forward_asr_results(conn))
 
-                # 发送缓存的音频数据
-                if conn.asr_audio and len(conn.asr_audio) > 0:
-                    for cached_audio in conn.asr_audio[-10:]:
-                        try:
-                            pcm_frame = self.decoder.decode(cached_audio, 960)
-                            payload = gzip.compress(pcm_frame)
-                            audio_request = bytearray(
-                                self.generate_audio_default_header()
-                            )
-                            audio_request.extend(len(payload).to_bytes(4, "big"))
-                            audio_request.extend(payload)
-                            await self.asr_ws.send(audio_request)
-                        except Exception as e:
-                            logger.bind(tag=TAG).info(
-                                f"发送缓存音频数据时发生错误: {e}"
-                            )
+                # 发送缓存的音频数据（当前包在下面发送），一次性合并发送
+                self.uplink_aggregator.clear()
+                cached_pcm = b"".join(conn.asr_audio.pcm_frames[-10:-1])
+                if cached_pcm:
+                    try:
+                        await self._send_pcm(cached_pcm)
+                    except Exception as e:
+                        logger.bind(tag=TAG).info(f"发送缓存音频数据时发生错误: {e}")
 
             except Exception as e:
                 logger.bind(tag=TAG).error(f"建立ASR连接失败: {str(e)}")
@@ -142,24 +122,106 @@ class ASRProvider(ASRProviderBase):
                     self.asr_ws = None
                 self.is_processing = False
                 return
+        elif self.is_processing and audio:
+            # 只在识别会话进行中保存音频，静音期间不占用音频内存
+            voice_audio = conn.asr_audio_for_voiceprint
+            if voice_audio.is_full:
+                # 已发送最后一包，等待服务端返回最终结果
+                return
+            if not voice_audio.append(audio, pcm_frame):
+                # 超过单句最长时长或全局音频内存预算，结束本次识别
+                logger.bind(tag=TAG).warning(
+                    f"单句音频已满（{len(voice_audio)}包），结束本次识别"
+                )
+                await self._finish_session()
+                return
 
-        # 发送当前音频数据
+        # 发送当前音频数据，凑满一块再发送；说话结束（VAD判定说完或手动停止）时立即发送剩余数据，
+        # 句中短暂停顿（滑动窗口翻转为无声）不提前发送
         if self.asr_ws and self.is_processing:
             try:
-                pcm_frame = self.decoder.decode(audio, 960)
-                payload = gzip.compress(pcm_frame)
-                audio_request = bytearray(self.generate_audio_default_header())
-                audio_request.extend(len(payload).to_bytes(4, "big"))
-                audio_request.extend(payload)
-                await self.asr_ws.send(audio_request)
+                chunk = self.uplink_aggregator.push(pcm_frame) if pcm_frame else None
+                end_of_speech = not audio or conn.client_voice_stop
+                if end_of_speech:
+                    rest = self.uplink_aggregator.flush()
+                    if rest:
+                        chunk = chunk + rest if chunk else rest
+                if chunk:
+                    await self._send_pcm(chunk)
             except Exception as e:
                 logger.bind(tag=TAG).info(f"发送音频数据时发生错误: {e}")
 
+    async def _finish_session(self):
+        """发送剩余音频并标记为最后一包，服务端返回最终结果后由结果转发任务结束本句"""
+        if not self.asr_ws:
+            return
+        try:
+            await self._send_pcm(self.uplink_aggregator.flush() or b"", last=True)
+        except Exception as e:
+            logger.bind(tag=TAG).info(f"发送最后一包音频时发生错误: {e}")
+
+    async def _send_pcm(self, pcm: bytes, last: bool = False):
+        """压缩并发送一段PCM音频"""
+        payload = gzip.compress(pcm)
+        audio_request = bytearray(
+            self.generate_last_audio_default_header()
+            if last
+            else self.generate_audio_default_header()
+        )
+        audio_request.extend(len(payload).to_bytes(4, "big"))
+        audio_request.extend(payload)
+        await self.asr_ws.send(audio_request)
+
+    async def _connect_session(self):
+        """建立WebSocket连接并完成初始化请求，返回可直接发送音频的连接"""
+        headers = self.token_auth() if self.auth_method == "token" else None
+        logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
+
+        asr_ws = await websockets.connect(
+            self.ws_url,
+            additional_headers=headers,
+            max_size=1000000000,
+            ping_interval=None,
+            ping_timeout=None,
+            close_timeout=10,
+        )
+
+        # 发送初始化请求
+        request_params = self.construct_request(str(uuid.uuid4()))
+        try:
+            payload_bytes = str.encode(json.dumps(request_params))
+            payload_bytes = gzip.compress(payload_bytes)
+            full_client_request = self.generate_header()
+            full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
+            full_client_request.extend(payload_bytes)
+
+            logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
+            await asr_ws.send(full_client_request)
+
+            # 等待初始化响应
+            init_res = await asr_ws.recv()
+            result = self.parse_response(init_res)
+            logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
+
+            # 检查初始化响应
+            if "code" in result and result["code"] != 1000:
+                error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
+                logger.bind(tag=TAG).error(error_msg)
+                raise Exception(error_msg)
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
+            if hasattr(e, "__cause__") and e.__cause__:
+                logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
+            await asr_ws.close()
+            raise e
+        return asr_ws
+
     async def _forward_asr_results(self, conn):
         try:
             while self.asr_ws and not conn.stop_event.is_set():
                 # 获取当前连接的音频数据
-                audio_data = getattr(conn, 'asr_audio_for_voiceprint', [])
+                audio_data = getattr(conn, 'asr_audio_for_voiceprint', UtteranceAudio())
                 try:
                     response = await self.asr_ws.recv()
                     result = self.parse_response(response)
@@ -182,7 +244,7 @@ class ASRProvider(ASRProviderBase):
                             ):
                                 logger.bind(tag=TAG).error(f"识别文本：空")
                                 self.text = ""
-                                conn.reset_vad_states()
+                                await conn.run_in_audio_thread(conn.reset_vad_states)
                                 if len(audio_data) > 15:  # 确保有足够音频数据
                                     await self.handle_voice_stop(conn, audio_data)
                                 break
@@ -193,7 +255,7 @@ class ASRProvider(ASRProviderBase):
                                     logger.bind(tag=TAG).info(
                                         f"识别到文本: {self.text}"
                                     )
-                                    conn.reset_vad_states()
+                                    await conn.run_in_audio_thread(conn.reset_vad_states)
                                     if len(audio_data) > 15:  # 确保有足够音频数据
                                         await self.handle_voice_stop(conn, audio_data)
                                     break
@@ -222,11 +284,13 @@ class ASRProvider(ASRProviderBase):
                 await self.asr_ws.close()
                 self.asr_ws = None
             self.is_processing = False
+            self.uplink_aggregator.clear()
             if conn:
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
-                    conn.asr_audio_for_voiceprint = []
+                    conn.asr_audio_for_voiceprint.release_memory()
+                    conn.asr_audio_for_voiceprint = UtteranceAudio(conn.max_utterance_duration_ms)
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
 
@@ -235,6 +299,7 @@ class ASRProvider(ASRProviderBase):
             asyncio.create_task(self.asr_ws.close())
             self.asr_ws = None
         self.is_processing = False
+        self.uplink_aggregator.clear()
 
     def construct_request(self, reqid):
         req = {
@@ -374,8 +439,9 @@ class ASRProvider(ASRProviderBase):
         if hasattr(self, '_connections'):
             for conn in self._connections.values():
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
-                    conn.asr_audio_for_voiceprint = []
+                    conn.asr_audio_for_voiceprint.release_memory()
+                    conn.asr_audio_for_voiceprint = UtteranceAudio(conn.max_utterance_duration_ms)
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
@@ -1,15 +1,19 @@
 import time
+import asyncio
 import os
 import sys
 import io
 import psutil
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
-from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.base import ASRProviderBase, ASR_TIMEOUT
 from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
-import shutil
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.asr_engine import ASRBatchEngine
+from core.utils.metrics import register_metrics
+from core.utils.asr_process_pool import ASRProcessPool
+import numpy as np
 
 TAG = __name__
 logger = setup_logging()
@@ -35,6 +39,31 @@ class CaptureOutput:
             logger.bind(tag=TAG).info(self.output.strip())
 
 
+def load_model(model_dir: str):
+    """加载FunASR模型，主进程和推理进程池的工作进程共用"""
+    with CaptureOutput():
+        return AutoModel(
+            model=model_dir,
+            vad_kwargs={"max_single_segment_time": 30000},
+            disable_update=True,
+            hub="hf",
+            # device="cuda:0",  # 启用GPU加速
+        )
+
+
+def recognize(model, samples: List[np.ndarray]) -> List[str]:
+    """批量识别多句归一化到[-1, 1]的16kHz float32音频"""
+    results = model.generate(
+        input=samples,
+        cache={},
+        language="auto",
+        use_itn=True,
+        batch_size=len(samples),
+        batch_size_s=60,
+    )
+    return [rich_transcription_postprocess(r["text"]) for r in results]
+
+
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
@@ -52,14 +81,52 @@ class ASRProvider(ASRProviderBase):
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
-        with CaptureOutput():
-            self.model = AutoModel(
-                model=self.model_dir,
-                vad_kwargs={"max_single_segment_time": 30000},
-                disable_update=True,
-                hub="hf",
-                # device="cuda:0",  # 启用GPU加速
+
+        # 配置了进程池时模型只在工作进程中加载
+        process_pool_size = config.get("process_pool_size", "0")
+        process_pool_size = int(process_pool_size) if process_pool_size else 0
+        if process_pool_size > 0:
+            self.model = None
+            self.pool = ASRProcessPool(
+                __name__, {"model_dir": self.model_dir}, process_pool_size
             )
+            recognize_batch = self.pool.recognize_batch
+        else:
+            self.model = load_model(self.model_dir)
+            self.pool = None
+            recognize_batch = self.recognize_batch
+
+        # 所有连接共享推理服务，并发的多句话合并成一个批次识别
+        batch_max_size = config.get("batch_max_size", "8")
+        batch_wait_ms = config.get("batch_wait_ms", "10")
+        self.engine = ASRBatchEngine(
+            recognize_batch,
+            max_batch_size=int(batch_max_size) if batch_max_size else 8,
+            batch_wait_ms=float(batch_wait_ms) if batch_wait_ms not in ("", None) else 10,
+            name="funasr-batch-engine",
+            num_workers=max(1, process_pool_size),
+        )
+        # 排队时间、批大小等统计通过/xiaozhi/metrics/接口查看
+        register_metrics("asr_batch_funasr", self.engine.get_stats)
+
+    async def close(self):
+        """停止批量推理服务和推理进程池"""
+        self.engine.close()
+        if self.pool is not None:
+            # 等推理线程处理完当前批次再关闭进程池和共享内存，不阻塞事件循环
+            await asyncio.get_running_loop().run_in_executor(None, self._close_pool)
+
+    def _close_pool(self):
+        self.engine.close(timeout=ASR_TIMEOUT)
+        self.pool.close()
+
+    def recognize_batch(self, pcm_batch: List[bytes]) -> List[str]:
+        """批量识别多句PCM音频，在推理线程中调用"""
+        samples = [
+            np.frombuffer(pcm_data, dtype=np.int16).astype(np.float32) / 32768
+            for pcm_data in pcm_batch
+        ]
+        return recognize(self.model, samples)
 
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
@@ -78,28 +145,12 @@ class ASRProvider(ASRProviderBase):
 
                 combined_pcm_data = b"".join(pcm_data)
 
-                # 检查磁盘空间
-                if not self.delete_audio_file:
-                    free_space = shutil.disk_usage(self.output_dir).free
-                    if free_space < len(combined_pcm_data) * 2:  # 预留2倍空间
-                        raise OSError("磁盘空间不足")
-
-                # 判断是否保存为WAV文件
-                if self.delete_audio_file:
-                    pass
-                else:
-                    file_path = self.save_audio_to_file(pcm_data, session_id)
+                # 识别直接使用内存中的PCM，需要保留音频时交给后台线程归档
+                file_path = self.archive_audio(pcm_data, session_id)
 
                 # 语音识别
                 start_time = time.time()
-                result = self.model.generate(
-                    input=combined_pcm_data,
-                    cache={},
-                    language="auto",
-                    use_itn=True,
-                    batch_size_s=60,
-                )
-                text = rich_transcription_postprocess(result[0]["text"])
+                text = await self.engine.recognize(combined_pcm_data)
                 logger.bind(tag=TAG).debug(
                     f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
                 )
@@ -116,19 +167,8 @@ class ASRProvider(ASRProviderBase):
                 logger.bind(tag=TAG).warning(
                     f"语音识别失败，正在重试（{retry_count}/{MAX_RETRIES}）: {e}"
                 )
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
 
             except Exception as e:
                 logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
                 return "", file_path
-
-            finally:
-                # 文件清理逻辑
-                if self.delete_audio_file and file_path and os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(
-                            f"文件删除失败: {file_path} | 错误: {e}"
-                        )
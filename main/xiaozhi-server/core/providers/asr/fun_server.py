@@ -5,6 +5,7 @@ import ssl
 import json
 import websockets
 from config.logger import setup_logging
+from core.utils.ws_pool import get_ws_pool
 import asyncio
 import re
 
@@ -41,12 +42,40 @@ class ASRProvider(ASRProviderBase):
             self.ssl_context.check_hostname = False
             self.ssl_context.verify_mode = ssl.CERT_NONE
 
-    async def _receive_responses(self, ws) -> None:
+        # 连接池：保持若干个已建立的连接，一句话识别完成后连接放回池中复用
+        pool_size = config.get("pool_size", "0")
+        pool_max_idle_time = config.get("pool_max_idle_time", "30")
+        self.ws_pool = None
+        if pool_size and int(pool_size) > 0:
+            self.ws_pool = get_ws_pool(
+                (__name__, self.uri, self.api_key),
+                self._connect,
+                pool_size=int(pool_size),
+                max_idle_time=float(pool_max_idle_time) if pool_max_idle_time else 30,
+            )
+
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        if self.ws_pool:
+            self.ws_pool.start()
+
+    async def _connect(self):
+        auth_header = {"Authorization": "Bearer; {}".format(self.api_key)}
+        return await websockets.connect(
+            self.uri,
+            additional_headers=auth_header,
+            subprotocols=["binary"],
+            ping_interval=None,
+            ssl=self.ssl_context,
+        )
+
+    async def _receive_responses(self, ws) -> Tuple[str, bool]:
         """
-        Asynchronous generator to receive messages from the WebSocket.
-        Yields each message as it is received.
+        Receive messages from the WebSocket until the final result arrives.
+        Returns the recognized text and whether the final result was received.
         """
         text = ""
+        is_final = False
         while True:
             try:
                 response = await asyncio.wait_for(ws.recv(), timeout=5)
@@ -54,6 +83,7 @@ class ASRProvider(ASRProviderBase):
                 logger.bind(tag=TAG).debug(f"Received response: {response_data}")
                 if response_data.get("is_final", True):
                     text += response_data.get("text", "")
+                    is_final = True
                     break
                 else:
                     text += response_data.get("text", "")
@@ -65,7 +95,7 @@ class ASRProvider(ASRProviderBase):
             except websockets.exceptions.ConnectionClosed as e:
                 logger.bind(tag=TAG).error(f"WebSocket connection closed: {e}")
                 break
-        return text
+        return text, is_final
 
     async def _send_data(self, ws, pcm_data: bytes, session_id: str) -> tuple:
         """
@@ -119,51 +149,55 @@ class ASRProvider(ASRProviderBase):
         if self.delete_audio_file:
             pass
         else:
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-        auth_header = {"Authorization": "Bearer; {}".format(self.api_key)}
-        async with websockets.connect(
-            self.uri,
-            additional_headers=auth_header,
-            subprotocols=["binary"],
-            ping_interval=None,
-            ssl=self.ssl_context,
-        ) as ws:
-            try:
-                # Use asyncio to handle WebSocket communication
-                send_task = asyncio.create_task(
-                    self._send_data(ws, combined_pcm_data, session_id)
-                )
-                receive_task = asyncio.create_task(self._receive_responses(ws))
+            # 音频由后台线程写入磁盘，不阻塞事件循环
+            file_path = self.archive_audio(pcm_data, session_id)
+        if self.ws_pool:
+            ws = await self.ws_pool.acquire()
+        else:
+            ws = await self._connect()
+        # 只有完整收到最终结果的连接才能放回连接池复用
+        reusable = False
+        try:
+            # Use asyncio to handle WebSocket communication
+            send_task = asyncio.create_task(
+                self._send_data(ws, combined_pcm_data, session_id)
+            )
+            receive_task = asyncio.create_task(self._receive_responses(ws))
 
-                # Gather tasks with error handling
-                done, pending = await asyncio.wait(
-                    [send_task, receive_task], return_when=asyncio.FIRST_EXCEPTION
-                )
+            # Gather tasks with error handling
+            done, pending = await asyncio.wait(
+                [send_task, receive_task], return_when=asyncio.FIRST_EXCEPTION
+            )
 
-                # Cancel any pending tasks
-                for task in pending:
-                    task.cancel()
-
-                # Check for exceptions in completed tasks
-                for task in done:
-                    if task.exception():
-                        raise task.exception()
-
-                # Get the result from the receive task
-                result = receive_task.result()
-                match = re.match(r"<\|(.*?)\|><\|(.*?)\|><\|(.*?)\|>(.*)", result)
-                if match:
-                    result = match.group(4).strip()
-                return (
-                    result,
-                    file_path,
-                )  # Return the recognized text and timestamp (if any)
+            # Cancel any pending tasks
+            for task in pending:
+                task.cancel()
 
-            except websockets.exceptions.ConnectionClosed as e:
-                logger.bind(tag=TAG).error(f"WebSocket connection closed: {e}")
-                return "", file_path
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"Error during speech-to-text conversion: {e}", exc_info=True
-                )
-                return "", file_path
+            # Check for exceptions in completed tasks
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+
+            # Get the result from the receive task
+            result, reusable = receive_task.result()
+            match = re.match(r"<\|(.*?)\|><\|(.*?)\|><\|(.*?)\|>(.*)", result)
+            if match:
+                result = match.group(4).strip()
+            return (
+                result,
+                file_path,
+            )  # Return the recognized text and timestamp (if any)
+
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.bind(tag=TAG).error(f"WebSocket connection closed: {e}")
+            return "", file_path
+        except Exception as e:
+            logger.bind(tag=TAG).error(
+                f"Error during speech-to-text conversion: {e}", exc_info=True
+            )
+            return "", file_path
+        finally:
+            if self.ws_pool:
+                await self.ws_pool.release(ws, reusable)
+            else:
+                await ws.close()
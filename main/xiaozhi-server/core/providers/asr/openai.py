@@ -11,6 +11,9 @@ TAG = __name__
 logger = setup_logging()
 
 class ASRProvider(ASRProviderBase):
+    # speech_to_text中使用requests同步请求
+    blocking = True
+
     def __init__(self, config: dict, delete_audio_file: bool):
         self.interface_type = InterfaceType.NON_STREAM
         self.api_key = config.get("api_key")
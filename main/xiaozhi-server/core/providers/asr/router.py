@@ -0,0 +1,269 @@
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import deque
+import numpy as np
+from config.logger import setup_logging
+from typing import Optional, Tuple, List
+from core.providers.asr.dto.dto import InterfaceType
+from core.providers.asr.base import (
+    ASR_TIMEOUT,
+    ASRProviderBase,
+    _blocking_executor,
+    _run_in_worker_loop,
+)
+from core.utils import asr
+from core.utils.metrics import register_metrics
+
+TAG = __name__
+logger = setup_logging()
+
+# 16kHz/16位单声道PCM每毫秒的字节数
+PCM_BYTES_PER_MS = 16000 * 2 // 1000
+# 判断是否有人声时的分析窗口（60ms）
+VOICE_WINDOW_SAMPLES = 960
+# 单侧识别的最长超时（秒）：两侧都超时也不超过单句识别的总超时ASR_TIMEOUT，
+# 预留1秒给声纹识别结果汇总等收尾工作，保证首选一侧超时后另一侧仍有完整的时间
+MAX_SIDE_TIMEOUT = (ASR_TIMEOUT - 1) / 2
+
+# 本地模型由所有连接的路由共享，同一配置只加载一份：{配置: [实例, 引用数]}，
+# 没有路由再使用时释放
+_local_providers = {}
+_local_providers_lock = threading.Lock()
+# 各路ASR的负载和错误统计，按配置区分，同一配置的路由共享
+_route_states = {}
+
+
+class RouteState:
+    """一路ASR的在途请求数和最近一段时间的错误率"""
+
+    def __init__(self, name: str, error_window_s: float):
+        self.name = name
+        self.error_window_s = error_window_s
+        self.inflight = 0
+        # (完成时间, 是否成功)
+        self._outcomes = deque()
+        self.stats = {"requests": 0, "errors": 0, "fallbacks": 0}
+
+    def _prune(self):
+        deadline = time.monotonic() - self.error_window_s
+        while self._outcomes and self._outcomes[0][0] < deadline:
+            self._outcomes.popleft()
+
+    def error_rate(self) -> float:
+        self._prune()
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def record(self, ok: bool):
+        self.stats["requests"] += 1
+        if not ok:
+            self.stats["errors"] += 1
+        self._outcomes.append((time.monotonic(), ok))
+        self._prune()
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["inflight"] = self.inflight
+        stats["error_rate"] = round(self.error_rate(), 3)
+        return stats
+
+
+def _config_key(config: dict) -> str:
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def _get_route_state(name: str, config: dict, error_window_s: float) -> RouteState:
+    # 同名的ASR在不同的配置（例如设备私有配置）下是不同的服务，统计分开
+    digest = hashlib.md5(_config_key(config).encode("utf-8")).hexdigest()[:8]
+    key = f"{name}@{digest}"
+    state = _route_states.get(key)
+    if state is None:
+        state = RouteState(name, error_window_s)
+        _route_states[key] = state
+    return state
+
+
+def get_router_stats() -> dict:
+    return {name: state.get_stats() for name, state in _route_states.items()}
+
+
+register_metrics("asr_router", get_router_stats)
+
+
+class ASRProvider(ASRProviderBase):
+    """按句路由的ASR
+
+    短句（大多数指令在2秒以内）优先交给进程内的本地模型，长句优先交给云端识别；
+    首选的一侧排队过多或最近错误率过高时自动切换到另一侧，识别失败或超时时也会改用另一侧重试；
+    大多数ASR内部捕获异常后返回空文本，因此音频中明显有人声却识别为空也按失败处理
+    """
+
+    def __init__(self, config: dict, delete_audio_file: bool):
+        super().__init__()
+        # 云端识别每个连接一个实例，因此路由本身也按连接创建；本地模型在所有连接间共享
+        self.interface_type = InterfaceType.NON_STREAM
+        self.delete_audio_file = delete_audio_file
+        self.short_utterance_ms = int(config.get("short_utterance_ms", 2000))
+        self.max_local_queue = int(config.get("max_local_queue", 4))
+        self.max_error_rate = float(config.get("max_error_rate", 0.5))
+        timeout = config.get("timeout")
+        self.timeout = float(timeout) if timeout not in ("", None) else MAX_SIDE_TIMEOUT
+        if self.timeout > MAX_SIDE_TIMEOUT:
+            logger.bind(tag=TAG).warning(
+                f"单侧识别超时{self.timeout}秒过长，两侧重试会超过单句识别总超时{ASR_TIMEOUT}秒，"
+                f"已调整为{MAX_SIDE_TIMEOUT}秒"
+            )
+            self.timeout = MAX_SIDE_TIMEOUT
+        # 任一60ms窗口的音量（RMS）超过该值即认为有人声，0表示不把空结果当作失败
+        self.voice_rms_threshold = float(config.get("voice_rms_threshold", 500))
+        error_window_s = float(config.get("error_window_s", 60))
+
+        local_config = dict(config["local"])
+        remote_config = dict(config["remote"])
+        local_name = local_config.pop("name")
+        remote_name = remote_config.pop("name")
+
+        self._local_key = _config_key(local_config)
+        with _local_providers_lock:
+            entry = _local_providers.get(self._local_key)
+            if entry is None:
+                entry = [self._create(local_name, local_config), 0]
+                _local_providers[self._local_key] = entry
+            entry[1] += 1
+        self.local = entry[0]
+        self._closed = False
+        try:
+            self.remote = self._create(remote_name, remote_config)
+        except Exception:
+            self._release_local()
+            raise
+
+        self.local_state = _get_route_state(local_name, local_config, error_window_s)
+        self.remote_state = _get_route_state(remote_name, remote_config, error_window_s)
+
+    def _create(self, name: str, config: dict) -> ASRProviderBase:
+        asr_type = config.get("type", name)
+        provider = asr.create_instance(asr_type, config, self.delete_audio_file)
+        if provider.interface_type == InterfaceType.STREAM:
+            raise ValueError(f"路由ASR只支持整句识别的ASR，{name}是流式ASR")
+        return provider
+
+    async def close_audio_channels(self, conn):
+        await self.remote.close_audio_channels(conn)
+
+    def _release_local(self):
+        """减少本地模型的引用数，返回不再被任何路由使用、需要释放的实例"""
+        if self._closed:
+            return None
+        self._closed = True
+        with _local_providers_lock:
+            entry = _local_providers.get(self._local_key)
+            if entry is None or entry[0] is not self.local:
+                return None
+            entry[1] -= 1
+            if entry[1] > 0:
+                return None
+            del _local_providers[self._local_key]
+        return self.local
+
+    async def close(self):
+        await self.remote.close()
+        local = self._release_local()
+        if local is not None:
+            await local.close()
+
+    def _is_available(self, state: RouteState) -> bool:
+        if state is self.local_state and state.inflight >= self.max_local_queue:
+            return False
+        return state.error_rate() < self.max_error_rate
+
+    def _choose(self, duration_ms: float) -> List[Tuple[ASRProviderBase, RouteState]]:
+        """按句长选择首选的一侧，首选不可用而另一侧可用时互换"""
+        local = (self.local, self.local_state)
+        remote = (self.remote, self.remote_state)
+        if duration_ms <= self.short_utterance_ms:
+            order = [local, remote]
+        else:
+            order = [remote, local]
+        if not self._is_available(order[0][1]) and self._is_available(order[1][1]):
+            order.reverse()
+            order[0][1].stats["fallbacks"] += 1
+        return order
+
+    async def _call(self, provider: ASRProviderBase, pcm_data: List[bytes], session_id: str):
+        if provider.blocking:
+            return await asyncio.get_running_loop().run_in_executor(
+                _blocking_executor,
+                _run_in_worker_loop,
+                provider.speech_to_text,
+                pcm_data,
+                session_id,
+                "pcm",
+            )
+        return await provider.speech_to_text(pcm_data, session_id, "pcm")
+
+    def _has_voice(self, pcm_data: List[bytes]) -> bool:
+        """音频中是否有明显的人声，有人声时空的识别结果视为失败"""
+        if self.voice_rms_threshold <= 0:
+            return False
+        samples = np.frombuffer(b"".join(pcm_data), dtype=np.int16)
+        count = len(samples) // VOICE_WINDOW_SAMPLES * VOICE_WINDOW_SAMPLES
+        if count == 0:
+            return False
+        windows = samples[:count].astype(np.float32).reshape(-1, VOICE_WINDOW_SAMPLES)
+        rms = np.sqrt(np.mean(windows * windows, axis=1))
+        return bool(rms.max() >= self.voice_rms_threshold)
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        if audio_format == "pcm":
+            pcm_data = opus_data
+        else:
+            pcm_data = self.decode_opus(opus_data)
+
+        duration_ms = sum(len(frame) for frame in pcm_data) / PCM_BYTES_PER_MS
+        order = self._choose(duration_ms)
+        has_voice = None
+        empty_result = None
+        for i, (provider, state) in enumerate(order):
+            state.inflight += 1
+            start_time = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    self._call(provider, pcm_data, session_id), timeout=self.timeout
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                state.record(False)
+                logger.bind(tag=TAG).warning(
+                    f"{state.name}识别失败: {type(e).__name__} {e}"
+                )
+                if i + 1 < len(order):
+                    order[i + 1][1].stats["fallbacks"] += 1
+                continue
+            finally:
+                state.inflight -= 1
+            text = result[0] if result else None
+            if not (text and str(text).strip()):
+                if has_voice is None:
+                    has_voice = self._has_voice(pcm_data)
+                if has_voice:
+                    # 有人声却没有识别结果，通常是ASR内部出错后返回了空文本
+                    state.record(False)
+                    logger.bind(tag=TAG).warning(f"{state.name}识别结果为空，视为识别失败")
+                    empty_result = result
+                    if i + 1 < len(order):
+                        order[i + 1][1].stats["fallbacks"] += 1
+                    continue
+            state.record(True)
+            logger.bind(tag=TAG).debug(
+                f"语音{duration_ms:.0f}ms路由到{state.name}，耗时{time.monotonic() - start_time:.3f}s"
+            )
+            return result
+        return empty_result or ("", None)
@@ -1,12 +1,15 @@
 import time
-import wave
+import asyncio
 import os
 import sys
 import io
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
-from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.base import ASRProviderBase, ASR_TIMEOUT
+from core.utils.asr_engine import ASRBatchEngine
+from core.utils.metrics import register_metrics
+from core.utils.asr_process_pool import ASRProcessPool
 
 import numpy as np
 import sherpa_onnx
@@ -34,6 +37,43 @@ class CaptureOutput:
             logger.bind(tag=TAG).info(self.output.strip())
 
 
+def load_model(model_path: str, tokens_path: str, model_type: str):
+    """加载sherpa-onnx离线识别模型，主进程和推理进程池的工作进程共用"""
+    with CaptureOutput():
+        if model_type == "paraformer":
+            return sherpa_onnx.OfflineRecognizer.from_paraformer(
+                paraformer=model_path,
+                tokens=tokens_path,
+                num_threads=2,
+                sample_rate=16000,
+                feature_dim=80,
+                decoding_method="greedy_search",
+                debug=False,
+            )
+        # sense_voice
+        return sherpa_onnx.OfflineRecognizer.from_sense_voice(
+            model=model_path,
+            tokens=tokens_path,
+            num_threads=2,
+            sample_rate=16000,
+            feature_dim=80,
+            decoding_method="greedy_search",
+            debug=False,
+            use_itn=True,
+        )
+
+
+def recognize(model, samples: List[np.ndarray]) -> List[str]:
+    """批量识别多句归一化到[-1, 1]的16kHz float32音频"""
+    streams = []
+    for audio in samples:
+        stream = model.create_stream()
+        stream.accept_waveform(16000, audio)
+        streams.append(stream)
+    model.decode_streams(streams)
+    return [stream.result.text for stream in streams]
+
+
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
@@ -73,52 +113,54 @@ class ASRProvider(ASRProviderBase):
             logger.bind(tag=TAG).error(f"模型文件处理失败: {str(e)}")
             raise
 
-        with CaptureOutput():
-            if self.model_type == "paraformer":
-                self.model = sherpa_onnx.OfflineRecognizer.from_paraformer(
-                    paraformer=self.model_path,
-                    tokens=self.tokens_path,
-                    num_threads=2,
-                    sample_rate=16000,
-                    feature_dim=80,
-                    decoding_method="greedy_search",
-                    debug=False,
-                )
-            else:  # sense_voice
-                self.model = sherpa_onnx.OfflineRecognizer.from_sense_voice(
-                    model=self.model_path,
-                    tokens=self.tokens_path,
-                    num_threads=2,
-                    sample_rate=16000,
-                    feature_dim=80,
-                    decoding_method="greedy_search",
-                    debug=False,
-                    use_itn=True,
-                )
-
-    def read_wave(self, wave_filename: str) -> Tuple[np.ndarray, int]:
-        """
-        Args:
-        wave_filename:
-            Path to a wave file. It should be single channel and each sample should
-            be 16-bit. Its sample rate does not need to be 16kHz.
-        Returns:
-        Return a tuple containing:
-        - A 1-D array of dtype np.float32 containing the samples, which are
-        normalized to the range [-1, 1].
-        - sample rate of the wave file
-        """
-
-        with wave.open(wave_filename) as f:
-            assert f.getnchannels() == 1, f.getnchannels()
-            assert f.getsampwidth() == 2, f.getsampwidth()  # it is in bytes
-            num_samples = f.getnframes()
-            samples = f.readframes(num_samples)
-            samples_int16 = np.frombuffer(samples, dtype=np.int16)
-            samples_float32 = samples_int16.astype(np.float32)
-
-            samples_float32 = samples_float32 / 32768
-            return samples_float32, f.getframerate()
+        # 配置了进程池时模型只在工作进程中加载
+        model_kwargs = {
+            "model_path": self.model_path,
+            "tokens_path": self.tokens_path,
+            "model_type": self.model_type,
+        }
+        process_pool_size = config.get("process_pool_size", "0")
+        process_pool_size = int(process_pool_size) if process_pool_size else 0
+        if process_pool_size > 0:
+            self.model = None
+            self.pool = ASRProcessPool(__name__, model_kwargs, process_pool_size)
+            recognize_batch = self.pool.recognize_batch
+        else:
+            self.model = load_model(**model_kwargs)
+            self.pool = None
+            recognize_batch = self.recognize_batch
+
+        # 所有连接共享推理服务，并发的多句话通过decode_streams批量解码
+        batch_max_size = config.get("batch_max_size", "8")
+        batch_wait_ms = config.get("batch_wait_ms", "10")
+        self.engine = ASRBatchEngine(
+            recognize_batch,
+            max_batch_size=int(batch_max_size) if batch_max_size else 8,
+            batch_wait_ms=float(batch_wait_ms) if batch_wait_ms not in ("", None) else 10,
+            name="sherpa-batch-engine",
+            num_workers=max(1, process_pool_size),
+        )
+        # 排队时间、批大小等统计通过/xiaozhi/metrics/接口查看
+        register_metrics("asr_batch_sherpa", self.engine.get_stats)
+
+    async def close(self):
+        """停止批量推理服务和推理进程池"""
+        self.engine.close()
+        if self.pool is not None:
+            # 等推理线程处理完当前批次再关闭进程池和共享内存，不阻塞事件循环
+            await asyncio.get_running_loop().run_in_executor(None, self._close_pool)
+
+    def _close_pool(self):
+        self.engine.close(timeout=ASR_TIMEOUT)
+        self.pool.close()
+
+    def recognize_batch(self, pcm_batch: List[bytes]) -> List[str]:
+        """批量识别多句PCM音频，在推理线程中调用"""
+        samples = [
+            np.frombuffer(pcm_data, dtype=np.int16).astype(np.float32) / 32768
+            for pcm_data in pcm_batch
+        ]
+        return recognize(self.model, samples)
 
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
@@ -126,24 +168,16 @@ class ASRProvider(ASRProviderBase):
         """语音转文本主处理逻辑"""
         file_path = None
         try:
-            # 保存音频文件
-            start_time = time.time()
             if audio_format == "pcm":
                 pcm_data = opus_data
             else:
                 pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-            logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
-            )
+            # 识别直接使用内存中的PCM，需要保留音频时交给后台线程归档
+            file_path = self.archive_audio(pcm_data, session_id)
 
             # 语音识别
             start_time = time.time()
-            s = self.model.create_stream()
-            samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            text = await self.engine.recognize(b"".join(pcm_data))
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
@@ -153,11 +187,3 @@ class ASRProvider(ASRProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
             return "", file_path
-        finally:
-            # 文件清理逻辑
-            if self.delete_audio_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
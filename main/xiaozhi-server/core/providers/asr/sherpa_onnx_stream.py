@@ -0,0 +1,194 @@
+import os
+import asyncio
+from config.logger import setup_logging
+from typing import Optional, Tuple, List
+from core.providers.asr.dto.dto import InterfaceType
+from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.sherpa_onnx_local import CaptureOutput
+from core.handle.sendAudioHandle import send_stt_partial_message
+from core.utils.asr_engine import StreamingASREngine
+from core.utils.audio_buffer import UtteranceAudio
+from core.utils.metrics import register_metrics
+
+import sherpa_onnx
+
+TAG = __name__
+logger = setup_logging()
+
+
+def load_model(
+    model_dir: str, files: dict, model_type: str, num_threads: int
+) -> "sherpa_onnx.OnlineRecognizer":
+    """加载sherpa-onnx在线（流式）识别模型"""
+    paths = {key: os.path.join(model_dir, name) for key, name in files.items()}
+    for path in paths.values():
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"模型文件不存在: {path}，请先手动下载流式模型")
+
+    # 断句由服务端的VAD负责，这里关闭模型自带的端点检测
+    with CaptureOutput():
+        if model_type == "paraformer":
+            return sherpa_onnx.OnlineRecognizer.from_paraformer(
+                tokens=paths["tokens"],
+                encoder=paths["encoder"],
+                decoder=paths["decoder"],
+                num_threads=num_threads,
+                sample_rate=16000,
+                feature_dim=80,
+                decoding_method="greedy_search",
+                enable_endpoint_detection=False,
+            )
+        # zipformer等transducer模型
+        return sherpa_onnx.OnlineRecognizer.from_transducer(
+            tokens=paths["tokens"],
+            encoder=paths["encoder"],
+            decoder=paths["decoder"],
+            joiner=paths["joiner"],
+            num_threads=num_threads,
+            sample_rate=16000,
+            feature_dim=80,
+            decoding_method="greedy_search",
+            enable_endpoint_detection=False,
+        )
+
+
+class ASRProvider(ASRProviderBase):
+    """sherpa-onnx本地流式识别
+
+    所有连接共享一个在线识别模型，说话期间逐帧送入各自的识别流并实时下发中间结果，
+    VAD判定说完后只需解码剩余的尾部音频，最终结果几乎没有额外延迟
+    """
+
+    speculative = False
+
+    def __init__(self, config: dict, delete_audio_file: bool):
+        super().__init__()
+        self.interface_type = InterfaceType.LOCAL
+        self.model_dir = config.get("model_dir")
+        self.output_dir = config.get("output_dir", "tmp/")
+        self.model_type = config.get("model_type", "transducer")
+        self.delete_audio_file = delete_audio_file
+        self.send_partial_results = str(
+            config.get("send_partial_results", True)
+        ).lower() in ("true", "1")
+
+        # 确保输出目录存在
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        files = {
+            "tokens": config.get("tokens", "tokens.txt"),
+            "encoder": config.get("encoder", "encoder.int8.onnx"),
+            "decoder": config.get("decoder", "decoder.onnx"),
+        }
+        if self.model_type != "paraformer":
+            files["joiner"] = config.get("joiner", "joiner.int8.onnx")
+        num_threads = config.get("num_threads", "2")
+        try:
+            self.model = load_model(
+                self.model_dir,
+                files,
+                self.model_type,
+                int(num_threads) if num_threads else 2,
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"模型文件处理失败: {str(e)}")
+            raise
+
+        # 所有正在说话的连接的识别流，每轮通过decode_streams合并解码
+        batch_max_size = config.get("batch_max_size", "32")
+        tail_padding_ms = config.get("tail_padding_ms", "300")
+        self.engine = StreamingASREngine(
+            self.model,
+            max_batch_size=int(batch_max_size) if batch_max_size else 32,
+            tail_padding_ms=int(tail_padding_ms) if tail_padding_ms not in ("", None) else 300,
+            name="sherpa-stream-engine",
+        )
+        register_metrics("asr_stream", self.engine.get_stats)
+
+    async def receive_audio(self, conn, audio, audio_have_voice, pcm_frame=b""):
+        handle = conn.asr_stream
+        if pcm_frame and (audio_have_voice or conn.client_have_voice):
+            if handle is None:
+                # 开始说话：新建识别流，并送入说话前的预录音
+                handle = self.engine.open(self._partial_callback(conn))
+                conn.asr_stream = handle
+                for cached_pcm in conn.asr_audio.pcm_frames[-10:]:
+                    self.engine.feed(handle, cached_pcm)
+            self.engine.feed(handle, pcm_frame)
+
+        await super().receive_audio(conn, audio, audio_have_voice, pcm_frame)
+
+        # 本句已结束但没有进入识别（例如语音太短），丢弃识别流
+        if handle is not None and conn.asr_stream is handle and not conn.client_have_voice:
+            conn.asr_stream = None
+            self.engine.discard(handle)
+
+    async def close(self):
+        """停止流式识别推理服务"""
+        self.engine.close()
+
+    async def close_audio_channels(self, conn):
+        handle = conn.asr_stream
+        if handle is not None:
+            conn.asr_stream = None
+            self.engine.discard(handle)
+
+    def _partial_callback(self, conn):
+        if not self.send_partial_results:
+            return None
+
+        def on_partial(text: str):
+            asyncio.run_coroutine_threadsafe(
+                send_stt_partial_message(conn, text), conn.loop
+            )
+
+        return on_partial
+
+    async def _transcribe(self, conn, asr_audio_task: UtteranceAudio):
+        handle = conn.asr_stream
+        if handle is None:
+            # 没有识别流时（例如说话期间切换过ASR）按整句识别
+            return await super()._transcribe(conn, asr_audio_task)
+        conn.asr_stream = None
+
+        wav_data = None
+        if conn.voiceprint_provider:
+            wav_data = self._pcm_to_wav(asr_audio_task.pcm_bytes())
+        return await asyncio.gather(
+            self._finish_stream(handle, asr_audio_task, conn.session_id),
+            self._run_voiceprint(conn, wav_data),
+        )
+
+    async def _finish_stream(
+        self, handle, asr_audio_task: UtteranceAudio, session_id: str
+    ) -> Tuple[str, Optional[str]]:
+        file_path = self.archive_audio(asr_audio_task.pcm_frames, session_id)
+        try:
+            text = await asyncio.wrap_future(self.engine.finish(handle))
+            return text, file_path
+        except asyncio.CancelledError:
+            self.engine.discard(handle)
+            raise
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"流式语音识别失败: {e}")
+            return "", file_path
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """整句识别：一次送入全部音频后结束输入"""
+        file_path = None
+        try:
+            if audio_format == "pcm":
+                pcm_data = opus_data
+            else:
+                pcm_data = self.decode_opus(opus_data)
+            file_path = self.archive_audio(pcm_data, session_id)
+
+            handle = self.engine.open()
+            self.engine.feed(handle, b"".join(pcm_data))
+            text = await asyncio.wrap_future(self.engine.finish(handle))
+            return text, file_path
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
+            return "", file_path
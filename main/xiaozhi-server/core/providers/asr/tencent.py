@@ -16,6 +16,9 @@ logger = setup_logging()
 
 
 class ASRProvider(ASRProviderBase):
+    # speech_to_text中使用requests同步请求
+    blocking = True
+
     API_URL = "https://asr.tencentcloudapi.com"
     API_VERSION = "2019-06-14"
     FORMAT = "pcm"  # 支持的音频格式：pcm, wav, mp3
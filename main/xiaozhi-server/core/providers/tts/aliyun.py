@@ -93,10 +93,15 @@ class TTSProvider(TTSProviderBase):
         self.access_key_secret = config.get("access_key_secret")
 
         self.appkey = config.get("appkey")
-        self.format = config.get("format", "wav")
-        self.audio_file_type = config.get("format", "wav")
         sample_rate = config.get("sample_rate", "16000")
         self.sample_rate = int(sample_rate) if sample_rate else 16000
+        # 阿里云支持直接输出16kHz的pcm，未配置格式时不再经过wav封装
+        self.supported_audio_formats = {
+            "pcm": (self.sample_rate,),
+            "wav": (self.sample_rate,),
+            "mp3": (self.sample_rate,),
+        }
+        self.format = self.negotiate_audio_format(config.get("format"))
 
         if config.get("private_voice"):
             self.voice = config.get("private_voice")
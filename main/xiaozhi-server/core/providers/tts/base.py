@@ -1,10 +1,12 @@
 import os
 import re
+import json
 import queue
+import hashlib
 import uuid
 import asyncio
 import threading
-from typing import Callable, Any
+from typing import Callable, Any, Dict, List, Optional, Tuple
 from core.utils import p3
 import time
 from datetime import datetime
@@ -13,6 +15,9 @@ from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
 from core.utils.tts import MarkdownCleaner
+from core.utils.tts_pipeline import TTSPipeline
+from core.utils.tts_cache import get_tts_cache
+from core.utils.sentence_segmenter import SentenceSegmenter
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
@@ -28,20 +33,42 @@ import traceback
 TAG = __name__
 logger = setup_logging()
 
+# 协商输出格式时各格式的解码开销：p3是16kHz的60ms Opus帧，直接透传；
+# pcm没有容器，16kHz时直接进入Opus编码器；wav在进程内解析；其他格式需要ffmpeg解码。
+# 服务端返回的opus（ogg_opus）是48kHz、20ms一包的Ogg封装，帧长与下发的60ms帧不一致，
+# 不能透传，只能和其他容器格式一样解码后重新编码
+AUDIO_FORMAT_COST = {"p3": 0, "pcm": 1, "wav": 2, "opus": 5, "ogg_opus": 5}
+CONTAINER_FORMAT_COST = 5
+# 采样率不是16kHz时需要ffmpeg重采样
+RESAMPLE_COST = 10
+
 
 class TTSProviderBase(ABC):
+    # 提供者原生支持的输出格式及对应采样率，例如{"pcm": (24000,), "mp3": (24000,)}，
+    # 子类声明后调用negotiate_audio_format选择开销最低的格式
+    supported_audio_formats: Dict[str, Tuple[int, ...]] = {}
+
     def __init__(self, config, delete_audio_file):
         self.interface_type = InterfaceType.NON_STREAM
         self.conn = None
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
+        # 没有文件头的pcm数据的采样率
+        self.audio_sample_rate = 16000
         self.output_file = config.get("output_dir", "tmp/")
+        # 音频缓存按提供者类型和完整配置（音色、语速、音调等）区分
+        self.tts_cache_key = hashlib.sha1(
+            f"{type(self).__module__}:{json.dumps(config, sort_keys=True, default=str)}".encode(
+                "utf-8"
+            )
+        ).hexdigest()
         self.tts_text_queue = queue.Queue()
         self.tts_audio_queue = queue.Queue()
+        # 非流式TTS的预合成流水线，预合成的句数在打开音频通道时按配置设置
+        self.tts_pipeline = TTSPipeline(self.tts_audio_queue.put)
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
         self.punctuations = (
             "。",
             "？",
@@ -67,15 +94,52 @@ class TTSProviderBase(ABC):
             "：",
         )
         self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+        # 流式文本分句，只扫描新追加的文本
+        self.text_segmenter = SentenceSegmenter(
+            self.punctuations, self.first_sentence_punctuations
+        )
 
-    def generate_filename(self, extension=".wav"):
+    def generate_filename(self, extension=None):
+        # 默认按实际的音频格式命名，pcm等没有文件头的格式解码时依赖扩展名
+        extension = extension or f".{self.audio_file_type}"
         return os.path.join(
             self.output_file,
             f"tts-{datetime.now().date()}@{uuid.uuid4().hex}{extension}",
         )
 
+    def negotiate_audio_format(self, requested: Optional[str] = None) -> str:
+        """选择请求TTS服务时使用的音频格式
+
+        配置中指定了格式（不是auto）时直接使用，否则从supported_audio_formats中
+        选择解码开销最低的格式和采样率，结果保存在audio_file_type和audio_sample_rate中
+        """
+        if requested and str(requested).lower() != "auto":
+            fmt = str(requested).lower()
+            rates = self.supported_audio_formats.get(fmt) or (16000,)
+            rate = 16000 if 16000 in rates else rates[0]
+        elif self.supported_audio_formats:
+
+            def cost(candidate):
+                fmt, rate = candidate
+                return AUDIO_FORMAT_COST.get(fmt, CONTAINER_FORMAT_COST) + (
+                    0 if rate == 16000 else RESAMPLE_COST
+                )
+
+            fmt, rate = min(
+                (
+                    (fmt, rate)
+                    for fmt, rates in self.supported_audio_formats.items()
+                    for rate in rates
+                ),
+                key=cost,
+            )
+        else:
+            return self.audio_file_type
+        self.audio_file_type = fmt
+        self.audio_sample_rate = rate
+        logger.bind(tag=TAG).debug(f"TTS音频格式: {fmt}，采样率: {rate}")
+        return fmt
+
     def handle_opus(self, opus_data: bytes):
         logger.bind(tag=TAG).debug(f"推送数据到队列里面帧数～～ {len(opus_data)}")
         self.tts_audio_queue.put((SentenceType.MIDDLE, opus_data, None))
@@ -83,8 +147,72 @@ class TTSProviderBase(ABC):
     def handle_audio_file(self, file_audio: bytes, text):
         self.before_stop_play_files.append((file_audio, text))
 
-    def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
+    def to_tts_stream(
+        self,
+        text,
+        opus_handler: Callable[[bytes], None] = None,
+        audio_handler: Callable[[Any], None] = None,
+    ) -> None:
+        """合成一句话并编码为音频帧
+
+        Args:
+            opus_handler: 接收每一帧音频
+            audio_handler: 接收句子开始等音频队列数据，默认直接放入tts_audio_queue
+        """
+        audio_handler = audio_handler or self.tts_audio_queue.put
         text = MarkdownCleaner.clean_markdown(text)
+
+        # 重复的句子直接使用缓存的音频帧，不再合成和编码
+        tts_cache = get_tts_cache(self.conn.config.get("tts_cache")) if self.conn else None
+        cache_key = None
+        if tts_cache is not None:
+            cache_key = tts_cache.make_key(
+                f"{self.tts_cache_key}:{self._output_frame_format()}", text
+            )
+        if cache_key:
+            frames = tts_cache.get(cache_key)
+            if frames is not None:
+                logger.bind(tag=TAG).debug(f"语音命中缓存: {text}")
+                audio_handler((SentenceType.FIRST, None, text))
+                for frame in frames:
+                    opus_handler(frame)
+                return None
+
+            frames = []
+            output_handler = opus_handler
+            output_audio_handler = audio_handler
+
+            def collect_frame(frame):
+                frames.append(frame)
+                output_handler(frame)
+
+            def start_attempt(item):
+                # 每次（重试）合成开始时都会发出句子开始，丢弃上一次失败前已产出的帧，
+                # 只缓存完整合成的那一次
+                if item[0] == SentenceType.FIRST:
+                    frames.clear()
+                output_audio_handler(item)
+
+            opus_handler = collect_frame
+            audio_handler = start_attempt
+
+        if self._synthesize_stream(text, opus_handler, audio_handler) and cache_key:
+            tts_cache.put(cache_key, frames)
+        return None
+
+    def _output_frame_format(self) -> str:
+        """合成结果下发的帧格式：内存中的音频总是编码为Opus，临时文件按客户端要求输出pcm或Opus"""
+        if not self.delete_audio_file and self.conn.audio_format == "pcm":
+            return "pcm"
+        return "opus"
+
+    def _synthesize_stream(
+        self,
+        text,
+        opus_handler: Callable[[bytes], None],
+        audio_handler: Callable[[Any], None],
+    ) -> bool:
+        """合成并编码一句话，返回是否成功"""
         max_repeat_time = 5
         if self.delete_audio_file:
             # 需要删除文件的直接转为音频数据
@@ -92,12 +220,13 @@ class TTSProviderBase(ABC):
                 try:
                     audio_bytes = asyncio.run(self.text_to_speak(text, None))
                     if audio_bytes:
-                        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                        audio_handler((SentenceType.FIRST, None, text))
                         audio_bytes_to_data_stream(
                             audio_bytes,
                             file_type=self.audio_file_type,
                             is_opus=True,
                             callback=opus_handler,
+                            sample_rate=self.audio_sample_rate,
                         )
                         break
                     else:
@@ -115,7 +244,7 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(
                     f"语音生成失败: {text}，请检查网络或服务是否正常"
                 )
-            return None
+            return max_repeat_time > 0
         else:
             tmp_file = self.generate_filename()
             try:
@@ -139,11 +268,12 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).error(
                         f"语音生成失败: {text}，请检查网络或服务是否正常"
                     )
-                    self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                    audio_handler((SentenceType.FIRST, None, text))
                 self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                return max_repeat_time > 0
             except Exception as e:
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
-                return None
+                return False
 
     @abstractmethod
     async def text_to_speak(self, text, output_file):
@@ -153,13 +283,23 @@ class TTSProviderBase(ABC):
         self, audio_file_path, callback: Callable[[Any], Any] = None
     ):
         """音频文件转换为PCM编码"""
-        return audio_to_data_stream(audio_file_path, is_opus=False, callback=callback)
+        return audio_to_data_stream(
+            audio_file_path,
+            is_opus=False,
+            callback=callback,
+            sample_rate=self.audio_sample_rate,
+        )
 
     def audio_to_opus_data_stream(
         self, audio_file_path, callback: Callable[[Any], Any] = None
     ):
         """音频文件转换为Opus编码"""
-        return audio_to_data_stream(audio_file_path, is_opus=True, callback=callback)
+        return audio_to_data_stream(
+            audio_file_path,
+            is_opus=True,
+            callback=callback,
+            sample_rate=self.audio_sample_rate,
+        )
 
     def tts_one_sentence(
         self,
@@ -191,6 +331,10 @@ class TTSProviderBase(ABC):
 
     async def open_audio_channels(self, conn):
         self.conn = conn
+        self.tts_pipeline.lookahead = max(1, int(conn.config.get("tts_lookahead", 2)))
+        self.text_segmenter.max_segment_length = max(
+            0, int(conn.config.get("tts_max_segment_length", 0))
+        )
         # tts 消化线程
         self.tts_priority_thread = threading.Thread(
             target=self.tts_text_priority_thread, daemon=True
@@ -212,29 +356,33 @@ class TTSProviderBase(ABC):
                 if message.sentence_type == SentenceType.FIRST:
                     self.conn.client_abort = False
                 if self.conn.client_abort:
+                    self.tts_pipeline.cancel()
                     logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
                     continue
                 if message.sentence_type == SentenceType.FIRST:
+                    # 丢弃上一轮被打断时还在合成的句子
+                    self.tts_pipeline.cancel()
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
+                    self.text_segmenter.reset()
                     self.tts_audio_first_sentence = True
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
+                    for segment_text in self._get_segment_texts(
+                        message.content_detail
+                    ):
+                        self._submit_segment(segment_text)
                 elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
+                    self._process_remaining_text_stream()
+                    # 文件音频排在已提交的句子之后
+                    self.tts_pipeline.wait(self.conn.stop_event)
                     tts_file = message.content_file
                     if tts_file and os.path.exists(tts_file):
                         self._process_audio_file_stream(
                             tts_file, callback=self.handle_opus
                         )
                 if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
+                    self._process_remaining_text_stream()
+                    self.tts_pipeline.wait(self.conn.stop_event)
                     self.tts_audio_queue.put(
                         (message.sentence_type, [], message.content_detail)
                     )
@@ -313,44 +461,23 @@ class TTSProviderBase(ABC):
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
-    def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
+    def _get_segment_texts(self, text) -> List[str]:
+        """追加LLM输出的文本，返回可以合成的完整句子"""
+        segments = []
+        for segment_text_raw in self.text_segmenter.push(text):
             segment_text = textUtils.get_string_no_punctuation_or_emoji(
                 segment_text_raw
             )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
+            if segment_text:
+                segments.append(segment_text)
+        return segments
 
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
-            return segment_text
-        else:
-            return None
+    def _get_remaining_text(self) -> Optional[str]:
+        """取出剩余未断句的文本"""
+        remaining_text = self.text_segmenter.flush()
+        if remaining_text:
+            return textUtils.get_string_no_punctuation_or_emoji(remaining_text) or None
+        return None
 
     def _process_audio_file_stream(
         self, tts_file, callback: Callable[[Any], Any]
@@ -382,20 +509,28 @@ class TTSProviderBase(ABC):
         self.before_stop_play_files.clear()
         self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
-    def _process_remaining_text_stream(
-        self, opus_handler: Callable[[bytes], None] = None
-    ):
+    def _submit_segment(self, text):
+        """把一句话提交到预合成流水线，合成的音频按句子顺序进入tts_audio_queue"""
+
+        def synthesize(emit):
+            self.to_tts_stream(
+                text,
+                opus_handler=lambda opus_data: emit(
+                    (SentenceType.MIDDLE, opus_data, None)
+                ),
+                audio_handler=emit,
+            )
+
+        self.tts_pipeline.submit(synthesize, self.conn.stop_event)
+
+    def _process_remaining_text_stream(self):
         """处理剩余的文本并生成语音
 
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_stream(segment_text, opus_handler=opus_handler)
-                self.processed_chars += len(full_text)
-                return True
+        segment_text = self._get_remaining_text()
+        if segment_text:
+            self._submit_segment(segment_text)
+            return True
         return False
@@ -29,7 +29,16 @@ class TTSProvider(TTSProviderBase):
         speed_ratio = config.get("speed_ratio", "1.0")
         volume_ratio = config.get("volume_ratio", "1.0")
         pitch_ratio = config.get("pitch_ratio", "1.0")
-        self.audio_file_type = config.get("format", "wav")
+        # 豆包支持8k/16k/24kHz输出，未配置格式时请求16kHz的pcm，直接进入Opus编码器
+        sample_rate = config.get("sample_rate")
+        rates = (int(sample_rate),) if sample_rate else (16000, 24000, 8000)
+        self.supported_audio_formats = {
+            "pcm": rates,
+            "wav": rates,
+            "mp3": rates,
+            "ogg_opus": rates,
+        }
+        self.negotiate_audio_format(config.get("format"))
         self.speed_ratio = float(speed_ratio) if speed_ratio else 1.0
         self.volume_ratio = float(volume_ratio) if volume_ratio else 1.0
         self.pitch_ratio = float(pitch_ratio) if pitch_ratio else 1.0
@@ -52,6 +61,7 @@ class TTSProvider(TTSProviderBase):
             "audio": {
                 "voice_type": self.voice,
                 "encoding": self.audio_file_type,
+                "rate": self.audio_sample_rate,
                 "speed_ratio": self.speed_ratio,
                 "volume_ratio": self.volume_ratio,
                 "pitch_ratio": self.pitch_ratio,
@@ -6,13 +6,16 @@ from core.providers.tts.base import TTSProviderBase
 
 
 class TTSProvider(TTSProviderBase):
+    # edge_tts固定输出24kHz的mp3，没有可协商的格式
+    supported_audio_formats = {"mp3": (24000,)}
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         if config.get("private_voice"):
             self.voice = config.get("private_voice")
         else:
             self.voice = config.get("voice")
-        self.audio_file_type = config.get("format", "mp3")
+        self.negotiate_audio_format(config.get("format"))
 
     def generate_filename(self, extension=".mp3"):
         return os.path.join(
@@ -91,8 +91,6 @@ class TTSProvider(TTSProviderBase):
         self.reference_text = parse_string_to_list(
              config.get('ref_text')if config.get('ref_text') else config.get("reference_text")
         )
-        self.format = config.get("response_format", "wav")
-        self.audio_file_type = config.get("response_format", "wav")
         self.api_key = config.get("api_key", "YOUR_API_KEY")
         model_key_msg = check_model_key("FishSpeech TTS", self.api_key)
         if model_key_msg:
@@ -115,6 +113,14 @@ class TTSProvider(TTSProviderBase):
         self.max_new_tokens = int(max_new_tokens) if max_new_tokens else 1024
         self.chunk_length = int(chunk_length) if chunk_length else 200
 
+        # 输出采样率由服务端模型决定（rate），未配置格式时优先使用没有容器的pcm
+        self.supported_audio_formats = {
+            "pcm": (self.rate,),
+            "wav": (self.rate,),
+            "mp3": (self.rate,),
+        }
+        self.format = self.negotiate_audio_format(config.get("response_format"))
+
         # 处理空字符串的情况
         top_p = config.get("top_p", "0.7")
         temperature = config.get("temperature", "0.7")
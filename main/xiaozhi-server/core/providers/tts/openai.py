@@ -8,6 +8,15 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    # OpenAI语音接口的输出均为24kHz，pcm为16位单声道裸数据
+    supported_audio_formats = {
+        "pcm": (24000,),
+        "wav": (24000,),
+        "flac": (24000,),
+        "mp3": (24000,),
+        "aac": (24000,),
+    }
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.api_key = config.get("api_key")
@@ -17,8 +26,9 @@ class TTSProvider(TTSProviderBase):
             self.voice = config.get("private_voice")
         else:
             self.voice = config.get("voice", "alloy")
-        self.response_format = config.get("format", "wav")
-        self.audio_file_type = config.get("format", "wav")
+        # 未配置格式时使用wav：很多OpenAI兼容的服务不支持pcm；
+        # 配置为auto时自动选择解码开销最低的pcm（官方接口支持）
+        self.response_format = self.negotiate_audio_format(config.get("format") or "wav")
 
         # 处理空字符串的情况
         speed = config.get("speed", "1.0")
@@ -38,7 +48,7 @@ class TTSProvider(TTSProviderBase):
             "model": self.model,
             "input": text,
             "voice": self.voice,
-            "response_format": "wav",
+            "response_format": self.response_format,
             "speed": self.speed,
         }
         response = requests.post(self.api_url, json=data, headers=headers)
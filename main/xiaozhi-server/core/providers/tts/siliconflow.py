@@ -11,9 +11,18 @@ class TTSProvider(TTSProviderBase):
             self.voice = config.get("private_voice")
         else:
             self.voice = config.get("voice")
-        self.response_format = config.get("response_format", "mp3")
-        self.audio_file_type = config.get("response_format", "mp3")
-        self.sample_rate = config.get("sample_rate")
+        # pcm/wav支持16kHz输出，未配置格式时请求16kHz的pcm，直接进入Opus编码器
+        sample_rate = config.get("sample_rate")
+        self.supported_audio_formats = {
+            "pcm": (int(sample_rate),) if sample_rate else (16000, 24000, 44100),
+            "wav": (int(sample_rate),) if sample_rate else (16000, 24000, 44100),
+            "mp3": (int(sample_rate),) if sample_rate else (32000, 44100),
+            "opus": (48000,),
+        }
+        self.response_format = self.negotiate_audio_format(
+            config.get("response_format")
+        )
+        self.sample_rate = self.audio_sample_rate
         self.speed = float(config.get("speed", 1.0))
         self.gain = config.get("gain")
 
@@ -26,6 +35,7 @@ class TTSProvider(TTSProviderBase):
             "input": text,
             "voice": self.voice,
             "response_format": self.response_format,
+            "sample_rate": self.sample_rate,
         }
         headers = {
             "Authorization": f"Bearer {self.access_token}",
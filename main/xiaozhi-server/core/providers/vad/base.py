@@ -1,9 +1,166 @@
+import time
+import numpy as np
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, List
+from config.logger import setup_logging
+from core.utils.metrics import register_metrics
+from core.utils.vad_engine import VADBatchEngine
+from core.utils.audio_buffer import PCMRingBuffer
+from core.providers.vad.energy_gate import EnergyGate
+
+TAG = __name__
+logger = setup_logging()
+
+
+class VADSession:
+    """单个连接的VAD会话：模型隐藏状态和音频缓冲区都属于连接私有"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.model_state = provider.create_model_state()
+        # 预分配的PCM缓冲区，容纳多个60ms的包
+        self.audio_buffer = PCMRingBuffer(provider.chunk_size * 8, provider.chunk_size)
+        # 能量门限跳过推理时保留的最后一块静音，恢复推理时先送入模型，保证隐藏状态连续
+        self.warmup_chunk = np.zeros(provider.chunk_size, dtype=np.float32)
+        self.has_warmup = False
 
 
 class VADProviderBase(ABC):
+    # 每次送入模型的采样点数（16kHz下为32ms）
+    chunk_size = 512
+
+    def __init__(self, config):
+        # 处理空字符串的情况
+        threshold = config.get("threshold", "0.5")
+        threshold_low = config.get("threshold_low", "0.2")
+        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
+        speculative_silence_ms = config.get("speculative_silence_ms", "0")
+        batch_max_size = config.get("batch_max_size", "64")
+        batch_wait_ms = config.get("batch_wait_ms", "0")
+        energy_threshold_db = config.get("energy_threshold_db", "-55")
+        energy_zcr_threshold = config.get("energy_zcr_threshold", "0.35")
+
+        self.vad_threshold = float(threshold) if threshold else 0.5
+        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
+
+        self.silence_threshold_ms = (
+            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+        )
+        # 预判静音阈值：静音超过该值时提前开始识别，0表示关闭
+        self.speculative_silence_ms = (
+            int(speculative_silence_ms) if speculative_silence_ms else 0
+        )
+
+        # 至少要多少帧才算有语音,增加灵敏度
+        self.frame_window_threshold = 1
+
+        # 前置能量门限，明显静音的块不做神经网络推理
+        self.energy_gate = EnergyGate(
+            float(energy_threshold_db) if energy_threshold_db else 0,
+            float(energy_zcr_threshold) if energy_zcr_threshold else 0.35,
+        )
+
+        # 所有连接共享一个推理线程
+        self.engine = VADBatchEngine(
+            self.infer_batch,
+            chunk_size=self.chunk_size,
+            max_batch_size=int(batch_max_size) if batch_max_size else 64,
+            batch_wait_ms=float(batch_wait_ms) if batch_wait_ms else 0,
+        )
+        register_metrics("vad_gate", self.energy_gate.get_stats)
+        register_metrics("vad_batch", self.engine.get_stats)
+
+    @abstractmethod
+    def create_model_state(self) -> Any:
+        """创建单个连接的模型状态"""
+        pass
+
     @abstractmethod
-    def is_vad(self, conn, data) -> bool:
-        """检测音频数据中的语音活动"""
+    def infer_batch(
+        self, audio_batch: np.ndarray, model_states: List[Any]
+    ) -> np.ndarray:
+        """批量推理，audio_batch形状为 [B, chunk_size]，返回B个语音概率并就地更新模型状态"""
         pass
+
+    def get_session(self, conn) -> VADSession:
+        """获取连接的VAD会话，连接切换了VAD模块时重新创建"""
+        session = getattr(conn, "vad_session", None)
+        if session is None or session.provider is not self:
+            session = VADSession(self)
+            conn.vad_session = session
+        return session
+
+    def close(self):
+        """停止批量推理线程，模块被替换或连接私有的模块随连接释放时调用"""
+        self.engine.close()
+
+    def _detect(self, session: VADSession, chunks: np.ndarray) -> np.ndarray:
+        """返回每个块的语音概率，整段静音时跳过推理"""
+        if self.energy_gate.silent_mask(chunks).all():
+            session.warmup_chunk[:] = chunks[-1]
+            session.has_warmup = True
+            self.energy_gate.record(len(chunks), len(chunks))
+            return np.zeros(len(chunks), dtype=np.float32)
+
+        self.energy_gate.record(len(chunks), 0)
+        if not session.has_warmup:
+            return self.engine.submit(session, chunks).result(timeout=5)
+        # 从静音中恢复：先送入最后一块静音作为上下文，丢弃它的概率
+        session.has_warmup = False
+        chunks = np.concatenate((session.warmup_chunk[np.newaxis], chunks))
+        return self.engine.submit(session, chunks).result(timeout=5)[1:]
+
+    def is_vad(self, conn, pcm_frame):
+        """检测音频数据中的语音活动
+
+        pcm_frame是连接接入时已解码好的16kHz/16位PCM数据。
+        在连接的音频处理线程中调用，推理由共享的批量引擎执行，本方法阻塞等待结果
+        """
+        try:
+            session = self.get_session(conn)
+            # 将新数据加入缓冲区，写入时直接转换为模型需要的float32格式
+            session.audio_buffer.write_pcm16(pcm_frame)
+
+            # 取出缓冲区中的完整帧（每次处理512采样点），是缓冲区的零拷贝视图
+            chunks = session.audio_buffer.read_chunks()
+            if len(chunks) == 0:
+                return False
+            speech_probs = self._detect(session, chunks)
+
+            client_have_voice = False
+            for speech_prob in speech_probs:
+                # 双阈值判断
+                if speech_prob >= self.vad_threshold:
+                    is_voice = True
+                elif speech_prob <= self.vad_threshold_low:
+                    is_voice = False
+                else:
+                    is_voice = conn.last_is_voice
+
+                # 声音没低于最低值则延续前一个状态，判断为有声音
+                conn.last_is_voice = is_voice
+
+                # 更新滑动窗口
+                conn.client_voice_window.append(is_voice)
+                client_have_voice = (
+                    conn.client_voice_window.count(True) >= self.frame_window_threshold
+                )
+
+                # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+                if conn.client_have_voice and not client_have_voice:
+                    stop_duration = time.time() * 1000 - conn.last_activity_time
+                    if stop_duration >= self.silence_threshold_ms:
+                        conn.client_voice_stop = True
+                    elif (
+                        self.speculative_silence_ms
+                        and stop_duration >= self.speculative_silence_ms
+                    ):
+                        conn.client_voice_tentative_stop = True
+                if client_have_voice:
+                    conn.client_have_voice = True
+                    conn.client_voice_tentative_stop = False
+                    conn.last_activity_time = time.time() * 1000
+
+            return client_have_voice
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
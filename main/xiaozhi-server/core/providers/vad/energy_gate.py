@@ -0,0 +1,57 @@
+import threading
+import numpy as np
+
+
+class EnergyGate:
+    """VAD前置的能量门限
+
+    按块计算RMS能量和过零率，明显静音的块直接判定为无声，不再送入神经网络VAD。
+    判定规则：
+    - RMS低于energy_threshold_db的块为静音；
+    - RMS低于门限+10dB且过零率高于zcr_threshold的块（低电平的底噪/嘶声）也视为静音
+    """
+
+    # 过零率判定的能量余量（dB）
+    ZCR_MARGIN_DB = 10
+
+    def __init__(self, energy_threshold_db: float, zcr_threshold: float):
+        # energy_threshold_db为0或正数时表示关闭门限
+        self.enabled = energy_threshold_db < 0
+        self.rms_threshold = 10 ** (energy_threshold_db / 20)
+        self.rms_zcr_threshold = 10 ** (
+            (energy_threshold_db + self.ZCR_MARGIN_DB) / 20
+        )
+        self.zcr_threshold = zcr_threshold
+        self._lock = threading.Lock()
+        # 所有连接累计的检测块数和跳过推理的块数
+        self.total_chunks = 0
+        self.skipped_chunks = 0
+
+    def silent_mask(self, chunks: np.ndarray) -> np.ndarray:
+        """返回每个块是否为静音，chunks为归一化到[-1, 1]的 [块数, chunk_size] 数组"""
+        if not self.enabled or len(chunks) == 0:
+            return np.zeros(len(chunks), dtype=bool)
+        rms = np.sqrt(np.einsum("ij,ij->i", chunks, chunks) / chunks.shape[1])
+        silent = rms < self.rms_threshold
+        candidates = ~silent & (rms < self.rms_zcr_threshold)
+        if candidates.any():
+            signs = np.signbit(chunks[candidates])
+            zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (
+                chunks.shape[1] - 1
+            )
+            silent[candidates] = zcr > self.zcr_threshold
+        return silent
+
+    def record(self, total: int, skipped: int):
+        with self._lock:
+            self.total_chunks += total
+            self.skipped_chunks += skipped
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total, skipped = self.total_chunks, self.skipped_chunks
+        return {
+            "total_chunks": total,
+            "skipped_chunks": skipped,
+            "skip_rate": skipped / total if total else 0.0,
+        }
@@ -1,7 +1,4 @@
-import time
-import numpy as np
 import torch
-import opuslib_next
 from config.logger import setup_logging
 from core.providers.vad.base import VADProviderBase
 
@@ -18,71 +15,38 @@ class VADProvider(VADProviderBase):
             model="silero_vad",
             force_reload=False,
         )
-
-        self.decoder = opuslib_next.Decoder(16000, 1)
-
-        # 处理空字符串的情况
-        threshold = config.get("threshold", "0.5")
-        threshold_low = config.get("threshold_low", "0.2")
-        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
-
-        self.vad_threshold = float(threshold) if threshold else 0.5
-        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
-
-        self.silence_threshold_ms = (
-            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
-        )
-
-        # 至少要多少帧才算有语音,增加灵敏度
-        self.frame_window_threshold = 1
-
-    def is_vad(self, conn, opus_packet):
-        try:
-            pcm_frame = self.decoder.decode(opus_packet, 960)
-            conn.client_audio_buffer.extend(pcm_frame)  # 将新数据加入缓冲区
-
-            # 处理缓冲区中的完整帧（每次处理512采样点）
-            client_have_voice = False
-            while len(conn.client_audio_buffer) >= 512 * 2:
-                # 提取前512个采样点（1024字节）
-                chunk = conn.client_audio_buffer[: 512 * 2]
-                conn.client_audio_buffer = conn.client_audio_buffer[512 * 2 :]
-
-                # 转换为模型需要的张量格式
-                audio_int16 = np.frombuffer(chunk, dtype=np.int16)
-                audio_float32 = audio_int16.astype(np.float32) / 32768.0
-                audio_tensor = torch.from_numpy(audio_float32)
-
-                # 检测语音活动
-                with torch.no_grad():
-                    speech_prob = self.model(audio_tensor, 16000).item()
-
-                # 双阈值判断
-                if speech_prob >= self.vad_threshold:
-                    is_voice = True
-                elif speech_prob <= self.vad_threshold_low:
-                    is_voice = False
-                else:
-                    is_voice = conn.last_is_voice
-
-                # 声音没低于最低值则延续前一个状态，判断为有声音
-                conn.last_is_voice = is_voice
-
-                # 更新滑动窗口
-                conn.client_voice_window.append(is_voice)
-                client_have_voice = (conn.client_voice_window.count(True) >= self.frame_window_threshold)
-
-                # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
-                if conn.client_have_voice and not client_have_voice:
-                    stop_duration = time.time() * 1000 - conn.last_activity_time
-                    if stop_duration >= self.silence_threshold_ms:
-                        conn.client_voice_stop = True
-                if client_have_voice:
-                    conn.client_have_voice = True
-                    conn.last_activity_time = time.time() * 1000
-
-            return client_have_voice
-        except opuslib_next.OpusError as e:
-            logger.bind(tag=TAG).info(f"解码错误: {e}")
-        except Exception as e:
-            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+        # 16kHz下模型需要拼接前一个块末尾的64个采样点作为上下文
+        self.context_size = 64
+        super().__init__(config)
+        # 与引擎批次缓冲区共享内存的输入张量，推理时按批大小切片，不再逐块创建张量
+        self.input_tensor = torch.from_numpy(self.engine.batch_buffer)
+
+    def create_model_state(self):
+        return {
+            "state": torch.zeros((2, 1, 128), dtype=torch.float32),
+            "context": torch.zeros((1, self.context_size), dtype=torch.float32),
+        }
+
+    def infer_batch(self, audio_batch, model_states):
+        batch_size = len(model_states)
+        # 把各连接的RNN状态拼成一个批次写回模型，推理后再拆分回各连接
+        self.model._state = torch.cat([s["state"] for s in model_states], dim=1)
+        self.model._context = torch.cat([s["context"] for s in model_states], dim=0)
+        self.model._last_sr = 16000
+        self.model._last_batch_size = batch_size
+
+        with torch.no_grad():
+            speech_probs = self.model(self._as_input_tensor(audio_batch), 16000)
+
+        new_state = self.model._state
+        new_context = self.model._context
+        for i, model_state in enumerate(model_states):
+            model_state["state"] = new_state[:, i : i + 1].clone()
+            # 上下文是输入张量的视图，输入缓冲区会被复用，必须拷贝
+            model_state["context"] = new_context[i : i + 1].clone()
+        return speech_probs.reshape(batch_size).numpy()
+
+    def _as_input_tensor(self, audio_batch):
+        if audio_batch.base is self.engine.batch_buffer:
+            return self.input_tensor[: len(audio_batch)]
+        return torch.from_numpy(audio_batch)
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import onnxruntime
+from config.logger import setup_logging
+from core.providers.vad.base import VADProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+# 相对于model_dir的默认ONNX模型路径
+DEFAULT_MODEL_FILE = os.path.join("src", "silero_vad", "data", "silero_vad.onnx")
+
+
+class VADProvider(VADProviderBase):
+    """基于onnxruntime运行的SileroVAD，不依赖torch
+
+    RNN状态和上下文以numpy数组显式保存在每个连接的会话中，推理时按批拼接后一次送入模型
+    """
+
+    def __init__(self, config):
+        logger.bind(tag=TAG).info("SileroVAD(ONNX)", config)
+        model_path = config.get("model_path") or os.path.join(
+            config.get("model_dir", "models/snakers4_silero-vad"), DEFAULT_MODEL_FILE
+        )
+        num_threads = config.get("num_threads", "1")
+        num_threads = int(num_threads) if num_threads else 1
+
+        opts = onnxruntime.SessionOptions()
+        opts.intra_op_num_threads = num_threads
+        opts.inter_op_num_threads = 1
+        opts.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        # 16kHz下模型需要拼接前一个块末尾的64个采样点作为上下文
+        self.context_size = 64
+        self.sample_rate = np.array(16000, dtype=np.int64)
+        super().__init__(config)
+        # 复用的模型输入缓冲区：[上下文 | 音频块]
+        self.input_buffer = np.zeros(
+            (self.engine.max_batch_size, self.context_size + self.chunk_size),
+            dtype=np.float32,
+        )
+
+    def create_model_state(self):
+        return {
+            "state": np.zeros((2, 1, 128), dtype=np.float32),
+            "context": np.zeros((1, self.context_size), dtype=np.float32),
+        }
+
+    def infer_batch(self, audio_batch, model_states):
+        batch_size = len(model_states)
+        model_input = self.input_buffer[:batch_size]
+        for i, model_state in enumerate(model_states):
+            model_input[i, : self.context_size] = model_state["context"][0]
+        model_input[:, self.context_size :] = audio_batch
+        state = np.concatenate([s["state"] for s in model_states], axis=1)
+
+        speech_probs, new_state = self.session.run(
+            None, {"input": model_input, "state": state, "sr": self.sample_rate}
+        )
+
+        for i, model_state in enumerate(model_states):
+            model_state["state"] = new_state[:, i : i + 1].copy()
+            # 输入缓冲区会被复用，上下文必须拷贝
+            model_state["context"] = model_input[i : i + 1, -self.context_size :].copy()
+        return speech_probs.reshape(batch_size)
@@ -0,0 +1,204 @@
+"""
+短句识别结果缓存
+同一台设备反复说的短指令（"暂停"、"音量大一点"、"再见"）按语音指纹缓存识别结果，
+指纹足够接近时直接使用缓存的文本，跳过识别。
+
+指纹：把语音按时间均分成若干段、按mel刻度分成若干频带，取对数能量，
+再按相邻频带能量差在相邻时间段上的变化方向量化成64位；
+查找时按位分段建立索引（任意一段完全相同即为候选），再用汉明距离和时长确认
+"""
+
+import json
+from typing import Awaitable, Callable, Optional, Tuple
+
+import numpy as np
+
+from config.logger import setup_logging
+from core.utils.cache.manager import cache_manager, CacheType
+from core.utils.metrics import register_metrics
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+# 16位单声道PCM每毫秒的字节数
+PCM_BYTES_PER_MS = SAMPLE_RATE * 2 // 1000
+FRAME_SIZE = 400  # 25ms
+HOP_SIZE = 160  # 10ms
+N_FFT = 512
+# 时间段数和频带数，相邻差分后得到 8 x 8 = 64 位
+TIME_SEGMENTS = 9
+MEL_BANDS = 9
+# 指纹按每8位一段建立索引
+BAND_BITS = 8
+NUM_BANDS = 64 // BAND_BITS
+# 每个索引下最多保留的候选数
+MAX_CANDIDATES = 8
+# 比最响的帧低多少dB以内的帧参与计算（去掉静音帧）
+FRAME_DYNAMIC_RANGE_DB = 40
+
+
+def _mel(hz):
+    return 2595 * np.log10(1 + hz / 700)
+
+
+def _build_band_matrix() -> np.ndarray:
+    """FFT频点到mel频带（100Hz~4kHz）的归属矩阵，功率谱乘以它得到各频带能量"""
+    edges_mel = np.linspace(_mel(100), _mel(4000), MEL_BANDS + 1)
+    freqs = np.fft.rfftfreq(N_FFT, 1 / SAMPLE_RATE)
+    index = np.searchsorted(edges_mel, _mel(freqs), side="right") - 1
+    matrix = np.zeros((len(freqs), MEL_BANDS), dtype=np.float32)
+    valid = (index >= 0) & (index < MEL_BANDS)
+    matrix[np.nonzero(valid)[0], index[valid]] = 1
+    return matrix
+
+
+_BAND_MATRIX = _build_band_matrix()
+_WINDOW = np.hanning(FRAME_SIZE).astype(np.float32)
+
+
+def fingerprint(pcm_data: bytes) -> Optional[int]:
+    """计算16kHz/16位单声道PCM的64位语音指纹，语音太短时返回None"""
+    samples = np.frombuffer(pcm_data, dtype=np.int16).astype(np.float32) / 32768
+    frame_count = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    if frame_count < TIME_SEGMENTS * 2:
+        return None
+    frames = np.lib.stride_tricks.as_strided(
+        samples,
+        shape=(frame_count, FRAME_SIZE),
+        strides=(samples.strides[0] * HOP_SIZE, samples.strides[0]),
+    )
+    power = np.abs(np.fft.rfft(frames * _WINDOW, n=N_FFT)) ** 2
+    band_energy = power @ _BAND_MATRIX
+    log_energy = np.log10(band_energy + 1e-10) * 10
+
+    # 只保留语音帧，再按时间均分成若干段取平均
+    frame_db = log_energy.max(axis=1)
+    voiced = log_energy[frame_db >= frame_db.max() - FRAME_DYNAMIC_RANGE_DB]
+    if len(voiced) < TIME_SEGMENTS:
+        return None
+    segments = np.array(
+        [segment.mean(axis=0) for segment in np.array_split(voiced, TIME_SEGMENTS)]
+    )
+    band_diff = segments[:, :-1] - segments[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+class ASRResultCache:
+    """按设备划分的短句识别结果缓存"""
+
+    def __init__(
+        self,
+        max_duration_ms: int = 2000,
+        max_distance: int = 4,
+        max_duration_diff: float = 0.2,
+        ttl: float = 86400,
+    ):
+        """
+        Args:
+            max_duration_ms: 只缓存不超过该时长的语音，长句始终走识别
+            max_distance: 指纹汉明距离不超过该值才认为是同一句话
+            max_duration_diff: 与缓存语音的时长相差比例不超过该值
+            ttl: 缓存有效期（秒）
+        """
+        self.max_duration_ms = max_duration_ms
+        self.max_distance = max_distance
+        self.max_duration_diff = max_duration_diff
+        self.ttl = ttl
+        self.stats = {"lookups": 0, "hits": 0, "stores": 0, "skipped": 0}
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["hit_rate"] = (
+            round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        )
+        return stats
+
+    @staticmethod
+    def _band_keys(device_id: str, fp: int):
+        for i in range(NUM_BANDS):
+            band = (fp >> (i * BAND_BITS)) & ((1 << BAND_BITS) - 1)
+            yield f"{device_id}:{i}:{band}"
+
+    def lookup(self, device_id: str, fp: int, duration_ms: float) -> Optional[str]:
+        best = None
+        for key in self._band_keys(device_id, fp):
+            for cached_fp, cached_duration, text in (
+                cache_manager.get(CacheType.ASR_RESULT, key) or []
+            ):
+                if abs(cached_duration - duration_ms) > cached_duration * self.max_duration_diff:
+                    continue
+                distance = bin(cached_fp ^ fp).count("1")
+                if distance > self.max_distance:
+                    continue
+                if best is None or distance < best[0]:
+                    best = (distance, text)
+                elif distance == best[0] and text != best[1]:
+                    # 距离相同但文本不同，无法确定是哪一句
+                    return None
+        return best[1] if best else None
+
+    def store(self, device_id: str, fp: int, duration_ms: float, text: str):
+        entry = (fp, duration_ms, text)
+        for key in self._band_keys(device_id, fp):
+            candidates = [
+                c
+                for c in (cache_manager.get(CacheType.ASR_RESULT, key) or [])
+                if c[0] != fp
+            ]
+            candidates.append(entry)
+            cache_manager.set(
+                CacheType.ASR_RESULT, key, candidates[-MAX_CANDIDATES:], ttl=self.ttl
+            )
+        self.stats["stores"] += 1
+
+    async def recognize(
+        self,
+        device_id: Optional[str],
+        pcm_data: bytes,
+        run_asr: Callable[[], Awaitable[Tuple[str, Optional[str]]]],
+    ) -> Tuple[str, Optional[str]]:
+        """命中缓存时直接返回缓存的文本，否则调用run_asr识别并缓存结果"""
+        duration_ms = len(pcm_data) / PCM_BYTES_PER_MS
+        if not device_id or duration_ms > self.max_duration_ms:
+            self.stats["skipped"] += 1
+            return await run_asr()
+
+        fp = fingerprint(pcm_data)
+        if fp is None:
+            self.stats["skipped"] += 1
+            return await run_asr()
+
+        self.stats["lookups"] += 1
+        text = self.lookup(device_id, fp, duration_ms)
+        if text:
+            self.stats["hits"] += 1
+            logger.bind(tag=TAG).info(f"短句识别命中缓存: {text}")
+            return text, None
+
+        result = await run_asr()
+        if result and result[0]:
+            self.store(device_id, fp, duration_ms, result[0])
+        return result
+
+
+_caches = {}
+
+
+def get_asr_cache(config: Optional[dict]) -> Optional[ASRResultCache]:
+    """获取配置对应的缓存，未启用时返回None"""
+    if not config or str(config.get("enabled", False)).lower() not in ("true", "1"):
+        return None
+    key = json.dumps(config, sort_keys=True, default=str)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = ASRResultCache(
+            max_duration_ms=int(config.get("max_duration_ms", 2000)),
+            max_distance=int(config.get("max_distance", 4)),
+            max_duration_diff=float(config.get("max_duration_diff", 0.2)),
+            ttl=float(config.get("ttl", 86400)),
+        )
+        _caches[key] = cache
+        register_metrics("asr_cache", cache.get_stats)
+    return cache
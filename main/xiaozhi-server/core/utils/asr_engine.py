@@ -0,0 +1,390 @@
+"""
+本地ASR批量推理服务
+本地ASR模型（FunASR、sherpa-onnx）由所有连接共享，各连接说完的一句话统一排队，
+推理线程按最长等待时间凑成小批次一次识别，识别结果通过Future返回给各自的连接；
+在线（流式）模型则由StreamingASREngine把所有正在说话的连接的识别流合并解码
+"""
+
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class ASRRequest:
+    """一句待识别的音频"""
+
+    __slots__ = ("pcm_data", "future", "submit_time")
+
+    def __init__(self, pcm_data: bytes, future: Future):
+        # 16kHz/16位单声道PCM
+        self.pcm_data = pcm_data
+        self.future = future
+        self.submit_time = time.monotonic()
+
+
+class ASRBatchEngine:
+    """跨连接微批处理的本地ASR推理服务"""
+
+    # 每处理多少个批次输出一次统计日志
+    STATS_LOG_INTERVAL = 100
+
+    def __init__(
+        self,
+        recognize_batch: Callable[[List[bytes]], List[str]],
+        max_batch_size: int = 8,
+        batch_wait_ms: float = 10,
+        name: str = "asr-batch-engine",
+        num_workers: int = 1,
+    ):
+        """
+        Args:
+            recognize_batch: 批量识别函数，参数为多句PCM音频，按相同顺序返回识别文本
+            max_batch_size: 单批次最多合并的句子数
+            batch_wait_ms: 收到第一句后凑批的最长等待时间（毫秒），0表示有多少处理多少
+            num_workers: 并行处理批次的线程数，识别在多进程推理池中执行时与进程数一致
+        """
+        self.recognize_batch = recognize_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_wait = max(0.0, float(batch_wait_ms)) / 1000
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "batches": 0,
+            "requests": 0,
+            "max_batch": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, int(num_workers)))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, pcm_data: bytes) -> Future:
+        """提交一句PCM音频，返回识别文本的Future"""
+        future = Future()
+        if self._stop_event.is_set():
+            future.set_exception(RuntimeError("ASR推理服务已关闭"))
+            return future
+        self._queue.put(ASRRequest(pcm_data, future))
+        return future
+
+    async def recognize(self, pcm_data: bytes) -> str:
+        """在任意事件循环中等待识别结果"""
+        return await asyncio.wrap_future(self.submit(pcm_data))
+
+    def get_stats(self) -> dict:
+        """排队等待和批大小统计"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        batches, requests = stats["batches"], stats["requests"]
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch"] = requests / batches if batches else 0.0
+        stats["avg_wait_ms"] = stats["total_wait"] / requests * 1000 if requests else 0.0
+        stats["max_wait_ms"] = stats["max_wait"] * 1000
+        return stats
+
+    def close(self, timeout: float = 0):
+        """停止推理线程，排队中的请求以异常结束
+
+        Args:
+            timeout: 等待推理线程退出的秒数，0表示不等待（线程处理完当前批次后自行退出）
+        """
+        self._stop_event.set()
+        if timeout:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join(timeout)
+        self._fail_pending()
+
+    def _fail_pending(self):
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                request.future.set_exception(RuntimeError("ASR推理服务已关闭"))
+            except InvalidStateError:
+                pass
+
+    def _collect_batch(self) -> List[ASRRequest]:
+        batch = [self._queue.get(timeout=1)]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                timeout = deadline - time.monotonic()
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # 等待期间已被取消（例如用户打断）的请求不再识别
+        return [r for r in batch if r.future.set_running_or_notify_cancel()]
+
+    def _record(self, batch: List[ASRRequest], start_time: float):
+        waits = [start_time - r.submit_time for r in batch]
+        with self._stats_lock:
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            self.stats["total_wait"] += sum(waits)
+            self.stats["max_wait"] = max(self.stats["max_wait"], max(waits))
+            batches = self.stats["batches"]
+        return max(waits), batches
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                batch = self._collect_batch()
+            except queue.Empty:
+                continue
+            if not batch:
+                continue
+            start_time = time.monotonic()
+            max_wait, batches = self._record(batch, start_time)
+            try:
+                texts = self.recognize_batch([r.pcm_data for r in batch])
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"ASR批量识别失败: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            logger.bind(tag=TAG).debug(
+                f"ASR批次: {len(batch)}句 | 最长排队: {max_wait * 1000:.1f}ms | "
+                f"识别耗时: {time.monotonic() - start_time:.3f}s"
+            )
+            for request, text in zip(batch, texts):
+                request.future.set_result(text)
+            if batches % self.STATS_LOG_INTERVAL == 0:
+                stats = self.get_stats()
+                logger.bind(tag=TAG).info(
+                    f"ASR批量统计: {stats['batches']}批/{stats['requests']}句 | "
+                    f"平均批大小: {stats['avg_batch']:.2f} | 最大批: {stats['max_batch']} | "
+                    f"平均排队: {stats['avg_wait_ms']:.1f}ms | 最长排队: {stats['max_wait_ms']:.1f}ms"
+                )
+        self._fail_pending()
+
+
+class OnlineStreamHandle:
+    """一个连接正在识别的在线识别流"""
+
+    __slots__ = (
+        "stream",
+        "pending",
+        "on_partial",
+        "last_text",
+        "finishing",
+        "input_finished",
+        "discarded",
+        "future",
+    )
+
+    def __init__(self, stream, on_partial: Optional[Callable[[str], None]]):
+        self.stream = stream
+        # 待送入识别流的PCM，由事件循环线程写入、推理线程取出
+        self.pending = deque()
+        self.on_partial = on_partial
+        self.last_text = ""
+        self.finishing = False
+        self.input_finished = False
+        self.discarded = False
+        # 最终识别结果
+        self.future = Future()
+
+
+class StreamingASREngine:
+    """跨连接共享的在线（流式）识别推理服务
+
+    所有连接共享一个在线识别模型，每个连接说话期间持有一个识别流，音频逐帧送入；
+    推理线程每轮把所有可解码的流通过decode_streams合并成一个批次解码，
+    中间结果变化时回调on_partial，说完后只需解码剩余的尾部即可得到最终结果
+    """
+
+    # 每处理多少个批次输出一次统计日志
+    STATS_LOG_INTERVAL = 1000
+
+    def __init__(
+        self,
+        recognizer,
+        max_batch_size: int = 32,
+        tail_padding_ms: int = 300,
+        sample_rate: int = 16000,
+        name: str = "asr-stream-engine",
+    ):
+        """
+        Args:
+            recognizer: sherpa-onnx的OnlineRecognizer（或接口相同的识别器）
+            max_batch_size: 单次decode_streams最多合并的流数
+            tail_padding_ms: 结束时补充的静音长度（毫秒），让模型输出最后几个字
+        """
+        self.recognizer = recognizer
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.sample_rate = sample_rate
+        self.tail_padding = np.zeros(
+            sample_rate * max(0, int(tail_padding_ms)) // 1000, dtype=np.float32
+        )
+        self._handles: List[OnlineStreamHandle] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self.stats = {"batches": 0, "decoded": 0, "max_batch": 0, "finished": 0}
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def open(self, on_partial: Optional[Callable[[str], None]] = None) -> OnlineStreamHandle:
+        """为一句话创建识别流，on_partial在推理线程中调用"""
+        handle = OnlineStreamHandle(self.recognizer.create_stream(), on_partial)
+        with self._lock:
+            self._handles.append(handle)
+        return handle
+
+    def feed(self, handle: OnlineStreamHandle, pcm_data: bytes):
+        """送入一段16kHz/16位单声道PCM"""
+        if pcm_data and not handle.finishing:
+            handle.pending.append(pcm_data)
+            self._wakeup.set()
+
+    def finish(self, handle: OnlineStreamHandle) -> Future:
+        """结束输入，返回最终识别结果的Future"""
+        handle.finishing = True
+        self._wakeup.set()
+        return handle.future
+
+    def discard(self, handle: OnlineStreamHandle):
+        """丢弃不再需要的识别流（例如太短的语音、连接关闭）"""
+        handle.discarded = True
+        handle.on_partial = None
+        self._wakeup.set()
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["active_streams"] = len(self._handles)
+        stats["avg_batch"] = (
+            stats["decoded"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+
+    def close(self, timeout: float = 0):
+        """停止推理线程，未完成的识别流以异常结束
+
+        Args:
+            timeout: 等待推理线程退出的秒数，0表示不等待
+        """
+        self._stop_event.set()
+        self._wakeup.set()
+        if timeout and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        # 线程仍在运行时由它退出前清理
+        if not self._thread.is_alive():
+            self._fail_handles()
+
+    def _fail_handles(self):
+        with self._lock:
+            handles, self._handles = self._handles, []
+        for handle in handles:
+            handle.on_partial = None
+            try:
+                handle.future.set_exception(RuntimeError("流式ASR推理服务已关闭"))
+            except InvalidStateError:
+                pass
+
+    def _accept(self, handle: OnlineStreamHandle):
+        chunks = []
+        while handle.pending:
+            chunks.append(handle.pending.popleft())
+        if chunks:
+            samples = np.frombuffer(b"".join(chunks), dtype=np.int16)
+            handle.stream.accept_waveform(
+                self.sample_rate, samples.astype(np.float32) / 32768
+            )
+        if handle.finishing and not handle.input_finished:
+            if len(self.tail_padding):
+                handle.stream.accept_waveform(self.sample_rate, self.tail_padding)
+            handle.stream.input_finished()
+            handle.input_finished = True
+
+    def _decode(self, handles: List[OnlineStreamHandle]) -> List[OnlineStreamHandle]:
+        """解码所有可解码的流，返回本轮解码过的流"""
+        decoded = {}
+        while True:
+            ready = [h for h in handles if self.recognizer.is_ready(h.stream)]
+            if not ready:
+                break
+            for i in range(0, len(ready), self.max_batch_size):
+                batch = ready[i : i + self.max_batch_size]
+                self.recognizer.decode_streams([h.stream for h in batch])
+                self.stats["batches"] += 1
+                self.stats["decoded"] += len(batch)
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+                if self.stats["batches"] % self.STATS_LOG_INTERVAL == 0:
+                    stats = self.get_stats()
+                    logger.bind(tag=TAG).info(
+                        f"流式ASR统计: {stats['batches']}批 | 平均批大小: {stats['avg_batch']:.2f} | "
+                        f"最大批: {stats['max_batch']} | 活跃流: {stats['active_streams']}"
+                    )
+            for h in ready:
+                decoded[id(h)] = h
+        return list(decoded.values())
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self._wakeup.wait(timeout=1):
+                continue
+            self._wakeup.clear()
+            with self._lock:
+                self._handles = [h for h in self._handles if not h.discarded]
+                handles = list(self._handles)
+            if not handles:
+                continue
+            try:
+                for handle in handles:
+                    self._accept(handle)
+                decoded = self._decode(handles)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"流式ASR解码失败: {e}")
+                with self._lock:
+                    self._handles = [h for h in self._handles if h not in handles]
+                for handle in handles:
+                    if not handle.future.done():
+                        handle.future.set_exception(e)
+                continue
+
+            for handle in decoded:
+                if handle.on_partial is None or handle.input_finished:
+                    continue
+                text = self.recognizer.get_result(handle.stream)
+                if text and text != handle.last_text:
+                    handle.last_text = text
+                    try:
+                        handle.on_partial(text)
+                    except Exception as e:
+                        logger.bind(tag=TAG).warning(f"发送中间结果失败: {e}")
+
+            # 输入已结束且全部解码完的流返回最终结果
+            finished = [h for h in handles if h.input_finished and not h.discarded]
+            if finished:
+                with self._lock:
+                    self._handles = [h for h in self._handles if h not in finished]
+                for handle in finished:
+                    self.stats["finished"] += 1
+                    if not handle.future.done():
+                        handle.future.set_result(self.recognizer.get_result(handle.stream))
+        self._fail_handles()
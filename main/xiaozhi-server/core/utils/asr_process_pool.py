@@ -0,0 +1,130 @@
+"""
+本地ASR多进程推理池
+每个工作进程只加载一次模型，主进程通过共享内存传递PCM数据（不再pickle字节列表），
+让CPU密集的识别不再与websocket收发、Opus编解码和VAD争抢同一个进程的GIL
+"""
+
+import importlib
+import threading
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 工作进程内的模型和识别函数
+_worker_model = None
+_worker_recognize = None
+# 工作进程已映射的共享内存，按名称缓存
+_worker_buffers = {}
+_WORKER_BUFFER_CACHE_SIZE = 16
+
+
+def _init_worker(module_name: str, model_kwargs: dict):
+    """工作进程初始化：加载一次模型"""
+    global _worker_model, _worker_recognize
+    module = importlib.import_module(module_name)
+    _worker_model = module.load_model(**model_kwargs)
+    _worker_recognize = module.recognize
+
+
+def _attach_buffer(name: str) -> shared_memory.SharedMemory:
+    shm = _worker_buffers.get(name)
+    if shm is None:
+        if len(_worker_buffers) >= _WORKER_BUFFER_CACHE_SIZE:
+            for cached in _worker_buffers.values():
+                cached.close()
+            _worker_buffers.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        # 共享内存由主进程创建和释放，工作进程不参与回收
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        _worker_buffers[name] = shm
+    return shm
+
+
+def _recognize_in_worker(buffer_name: str, lengths: List[int]) -> List[str]:
+    """在工作进程中识别共享内存里的多句PCM，lengths为每句的采样点数"""
+    shm = _attach_buffer(buffer_name)
+    pcm = np.ndarray((sum(lengths),), dtype=np.int16, buffer=shm.buf)
+    samples, offset = [], 0
+    for length in lengths:
+        samples.append(pcm[offset : offset + length].astype(np.float32) / 32768)
+        offset += length
+    del pcm
+    return _worker_recognize(_worker_model, samples)
+
+
+def _ping() -> bool:
+    return True
+
+
+class ASRProcessPool:
+    """本地ASR多进程推理池"""
+
+    def __init__(self, module_name: str, model_kwargs: dict, pool_size: int):
+        """
+        Args:
+            module_name: ASR模块名，模块需提供load_model(**model_kwargs)和recognize(model, samples)
+            model_kwargs: 工作进程加载模型的参数
+            pool_size: 工作进程数
+        """
+        self.pool_size = max(1, int(pool_size))
+        # 使用spawn启动，避免fork带有线程和torch状态的主进程
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(module_name, model_kwargs),
+        )
+        # 每个提交线程复用自己的共享内存块，不够大时再重新分配
+        self._local = threading.local()
+        self._buffers = []
+        self._lock = threading.Lock()
+
+        # 预先启动所有工作进程并加载模型
+        warmups = [self.executor.submit(_ping) for _ in range(self.pool_size)]
+        for warmup in warmups:
+            warmup.result()
+        logger.bind(tag=TAG).info(f"ASR推理进程池已启动，进程数: {self.pool_size}")
+
+    def _get_buffer(self, size: int) -> shared_memory.SharedMemory:
+        shm = getattr(self._local, "buffer", None)
+        if shm is not None and shm.size >= size:
+            return shm
+        new_shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        with self._lock:
+            self._buffers.append(new_shm)
+            if shm is not None:
+                self._buffers.remove(shm)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        self._local.buffer = new_shm
+        return new_shm
+
+    def recognize_batch(self, pcm_batch: List[bytes]) -> List[str]:
+        """在工作进程中识别多句16位PCM，阻塞直到返回结果"""
+        lengths = [len(pcm_data) // 2 for pcm_data in pcm_batch]
+        shm = self._get_buffer(sum(lengths) * 2)
+        offset = 0
+        for pcm_data, length in zip(pcm_batch, lengths):
+            shm.buf[offset : offset + length * 2] = pcm_data[: length * 2]
+            offset += length * 2
+        return self.executor.submit(_recognize_in_worker, shm.name, lengths).result()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            buffers, self._buffers = self._buffers, []
+        for shm in buffers:
+            shm.close()
+            shm.unlink()
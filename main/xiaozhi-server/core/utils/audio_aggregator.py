@@ -0,0 +1,47 @@
+"""
+上行音频聚合
+流式ASR按服务端推荐的包长发送音频：把60ms的小包合并成较大的块（例如200ms）后再压缩发送，
+减少压缩调用和websocket消息数量；说话结束时立即发送剩余数据
+"""
+
+from typing import Optional
+
+SAMPLE_RATE = 16000
+# 16位单声道，每毫秒的字节数
+BYTES_PER_MS = SAMPLE_RATE * 2 // 1000
+
+
+class PCMAggregator:
+    """16kHz/16位单声道PCM聚合器"""
+
+    def __init__(self, chunk_ms: int = 200):
+        # chunk_ms为0或负数时不聚合，每个包直接发送
+        self.chunk_bytes = max(0, int(chunk_ms)) * BYTES_PER_MS
+        self._buffer = bytearray()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def push(self, pcm: bytes) -> Optional[bytes]:
+        """加入一段PCM，凑满一块（或更多）时返回可发送的数据，否则返回None"""
+        if not self.chunk_bytes:
+            return pcm or None
+        self._buffer += pcm
+        if len(self._buffer) < self.chunk_bytes:
+            return None
+        # 整块发送，不足一块的尾部留到下一次
+        size = len(self._buffer) - len(self._buffer) % self.chunk_bytes
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+
+    def flush(self) -> Optional[bytes]:
+        """取出剩余的全部数据"""
+        if not self._buffer:
+            return None
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        return chunk
+
+    def clear(self):
+        self._buffer.clear()
@@ -0,0 +1,99 @@
+"""
+ASR音频归档
+delete_audio为false时，识别用的音频由后台线程写入磁盘，磁盘延迟不再影响识别；
+队列有上限，磁盘跟不上时丢弃新的归档任务而不是阻塞识别
+"""
+
+import io
+import os
+import gzip
+import uuid
+import wave
+import queue
+import threading
+from typing import Dict, List, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 归档队列的最大长度
+ARCHIVE_QUEUE_SIZE = 64
+# gzip压缩级别，0表示不压缩，直接保存wav
+ARCHIVE_COMPRESS_LEVEL = 6
+
+
+class AudioArchiver:
+    """后台音频归档写入器"""
+
+    def __init__(
+        self,
+        output_dir: str,
+        queue_size: int = ARCHIVE_QUEUE_SIZE,
+        compress_level: int = ARCHIVE_COMPRESS_LEVEL,
+    ):
+        self.output_dir = output_dir
+        self.compress_level = compress_level
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(
+            target=self._run, name="asr-audio-archiver", daemon=True
+        )
+        self._thread.start()
+
+    def archive(self, pcm_data: List[bytes], prefix: str) -> Optional[str]:
+        """提交一段16kHz/16位单声道PCM，返回将要写入的文件路径，队列已满时返回None"""
+        suffix = ".wav.gz" if self.compress_level > 0 else ".wav"
+        file_path = os.path.join(self.output_dir, f"{prefix}_{uuid.uuid4()}{suffix}")
+        try:
+            self._queue.put_nowait((file_path, pcm_data))
+        except queue.Full:
+            # 多个连接的识别线程可能同时提交
+            with self._dropped_lock:
+                self.dropped += 1
+                dropped = self.dropped
+            logger.bind(tag=TAG).warning(
+                f"音频归档队列已满，丢弃本次归档（累计丢弃{dropped}次）"
+            )
+            return None
+        return file_path
+
+    def _write(self, file_path: str, pcm_data: List[bytes]):
+        wav_buffer = io.BytesIO()
+        with wave.open(wav_buffer, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)  # 2 bytes = 16-bit
+            wf.setframerate(16000)
+            wf.writeframes(b"".join(pcm_data))
+        wav_data = wav_buffer.getvalue()
+        if self.compress_level > 0:
+            wav_data = gzip.compress(wav_data, compresslevel=self.compress_level)
+        with open(file_path, "wb") as f:
+            f.write(wav_data)
+
+    def _run(self):
+        while True:
+            file_path, pcm_data = self._queue.get()
+            try:
+                self._write(file_path, pcm_data)
+                logger.bind(tag=TAG).debug(f"音频已归档: {file_path}")
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"音频归档失败: {file_path} | 错误: {e}")
+
+
+_archivers: Dict[str, AudioArchiver] = {}
+_archivers_lock = threading.Lock()
+
+
+def get_audio_archiver(output_dir: str) -> AudioArchiver:
+    """获取输出目录对应的归档写入器，同一目录共享一个写入线程"""
+    key = os.path.abspath(output_dir)
+    with _archivers_lock:
+        archiver = _archivers.get(key)
+        if archiver is None:
+            archiver = AudioArchiver(output_dir)
+            _archivers[key] = archiver
+        return archiver
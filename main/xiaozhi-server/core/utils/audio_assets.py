@@ -0,0 +1,117 @@
+"""
+预转码的提示音资源
+绑定码播报、超出使用量提示、说完话提示音等固定音频在启动时（或文件修改后）只转码一次，
+Opus帧保存在内存中，同时写入磁盘的p3缓存，重启后直接读取；播放时只是逐帧放入音频队列，
+不再每次调用ffmpeg解码、重采样和Opus编码
+"""
+
+import os
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from config.logger import setup_logging
+from core.utils import p3
+from core.utils.util import audio_to_data_stream
+
+TAG = __name__
+logger = setup_logging()
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac", ".m4a")
+
+
+class AudioAssetStore:
+    """转码后的提示音资源，按文件路径和修改时间缓存"""
+
+    def __init__(self, asset_dir: str = "config/assets", cache_dir: str = "tmp/asset_cache"):
+        self.asset_dir = asset_dir
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        # (绝对路径, 是否Opus) -> (文件签名, 帧列表)
+        self._frames: Dict[Tuple[str, bool], Tuple[Tuple[int, int], List[bytes]]] = {}
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _cache_path(self, path: str, signature: Tuple[int, int]) -> str:
+        name = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}-{signature[0]}-{signature[1]}.p3")
+
+    def _transcode(self, path: str, is_opus: bool, signature: Tuple[int, int]) -> List[bytes]:
+        cache_path = self._cache_path(path, signature) if is_opus else None
+        frames = []
+        if cache_path and os.path.exists(cache_path):
+            try:
+                p3.decode_opus_from_file_stream(cache_path, callback=frames.append)
+                return frames
+            except Exception as e:
+                logger.bind(tag=TAG).warning(f"读取提示音缓存失败，重新转码: {e}")
+                frames = []
+
+        audio_to_data_stream(path, is_opus=is_opus, callback=frames.append)
+        if cache_path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{cache_path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(p3.encode_opus_frames_to_bytes(frames))
+                os.replace(tmp_path, cache_path)
+                self._remove_stale(cache_path)
+            except OSError as e:
+                logger.bind(tag=TAG).warning(f"写入提示音缓存失败: {e}")
+        return frames
+
+    def _remove_stale(self, cache_path: str):
+        """删除同一文件修改前的缓存"""
+        prefix = os.path.basename(cache_path).split("-", 1)[0] + "-"
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name != os.path.basename(cache_path):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def get_frames(self, path: str, is_opus: bool = True) -> List[bytes]:
+        """获取音频文件转码后的帧，文件修改后自动重新转码"""
+        path = os.path.abspath(path)
+        signature = self._signature(path)
+        key = (path, is_opus)
+        cached = self._frames.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached and cached[0] == signature:
+                return cached[1]
+            frames = self._transcode(path, is_opus, signature)
+            self._frames[key] = (signature, frames)
+            return frames
+
+    def play(self, path: str, callback: Callable[[Any], Any], is_opus: bool = True):
+        """逐帧回调音频文件的数据"""
+        for frame in self.get_frames(path, is_opus):
+            callback(frame)
+
+    def preload(self):
+        """转码资源目录下的全部音频文件"""
+        count = 0
+        for root, _, files in os.walk(self.asset_dir):
+            for name in files:
+                if not name.lower().endswith(AUDIO_EXTENSIONS):
+                    continue
+                try:
+                    self.get_frames(os.path.join(root, name))
+                    count += 1
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"预转码提示音失败 {name}: {e}")
+        logger.bind(tag=TAG).info(f"提示音预转码完成，共{count}个文件")
+
+    def preload_in_background(self):
+        threading.Thread(
+            target=self.preload, name="audio-asset-preload", daemon=True
+        ).start()
+
+
+audio_asset_store = AudioAssetStore()
@@ -0,0 +1,267 @@
+"""
+音频缓冲区工具类
+为高频的逐包音频处理提供预分配、零拷贝的缓冲区
+"""
+
+import threading
+
+import numpy as np
+
+from core.utils.metrics import register_metrics
+
+# 16kHz/16位单声道PCM每毫秒的字节数
+PCM_BYTES_PER_MS = 16000 * 2 // 1000
+# 单句话的默认最长时长（毫秒）
+DEFAULT_MAX_UTTERANCE_MS = 60 * 1000
+
+
+class PCMRingBuffer:
+    """预分配的PCM环形缓冲区
+
+    以float32（归一化到[-1, 1]）存储采样点，写入时直接转换到预分配的存储中；
+    读取完整的块时返回存储的零拷贝视图。写指针到达末尾时把未读的尾部（不足一块）
+    回卷到开头，保证读出的块在内存中始终连续。
+    """
+
+    def __init__(self, capacity: int, chunk_size: int):
+        if capacity < chunk_size * 2:
+            capacity = chunk_size * 2
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._read_pos = 0
+        self._write_pos = 0
+
+    def __len__(self):
+        return self._write_pos - self._read_pos
+
+    def clear(self):
+        self._read_pos = 0
+        self._write_pos = 0
+
+    def _reserve(self, size: int) -> int:
+        """为写入size个采样点腾出连续空间，返回实际可写入的采样点数"""
+        if self._write_pos + size <= self.capacity:
+            return size
+        # 回卷：把未读数据搬到开头
+        pending = self._write_pos - self._read_pos
+        if pending and self._read_pos:
+            self._data[:pending] = self._data[self._read_pos : self._write_pos]
+        self._read_pos, self._write_pos = 0, pending
+        free = self.capacity - pending
+        if size > free:
+            # 空间仍不够时丢弃最旧的数据
+            drop = min(size - free, pending)
+            if drop:
+                self._data[: pending - drop] = self._data[drop:pending]
+                self._write_pos = pending - drop
+        return min(size, self.capacity - self._write_pos)
+
+    def write_pcm16(self, pcm: bytes):
+        """写入16位小端PCM数据"""
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity :]
+        size = self._reserve(len(samples))
+        target = self._data[self._write_pos : self._write_pos + size]
+        np.multiply(samples[len(samples) - size :], 1.0 / 32768.0, out=target)
+        self._write_pos += size
+
+    def read_chunks(self) -> np.ndarray:
+        """取出所有完整的块，返回形状为 [块数, chunk_size] 的零拷贝视图
+
+        视图在下一次写入之前有效
+        """
+        count = (self._write_pos - self._read_pos) // self.chunk_size
+        start = self._read_pos
+        end = start + count * self.chunk_size
+        if end == self._write_pos:
+            # 已全部读完，下一次从头写入，省去回卷拷贝
+            self._read_pos = self._write_pos = 0
+        else:
+            self._read_pos = end
+        return self._data[start:end].reshape(count, self.chunk_size)
+
+
+class AudioMemoryBudget:
+    """全服务的上行音频缓冲内存预算
+
+    统计所有连接的UtteranceAudio占用的字节数（原始音频包 + 解码后的PCM），
+    超过预算时拒绝新的音频，避免大量连接同时长时间说话把内存撑爆
+    """
+
+    def __init__(self, budget_bytes: int = 0):
+        self._lock = threading.Lock()
+        # 0表示不限制
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self.rejected = 0
+
+    def configure(self, budget_mb: float):
+        self.budget_bytes = max(0, int(float(budget_mb) * 1024 * 1024))
+
+    def reserve(self, size: int, force: bool = False) -> bool:
+        """申请size字节，超出预算时返回False；force为True时不检查预算"""
+        with self._lock:
+            if (
+                not force
+                and self.budget_bytes
+                and self.used_bytes + size > self.budget_bytes
+            ):
+                self.rejected += 1
+                return False
+            self.used_bytes += size
+            if self.used_bytes > self.peak_bytes:
+                self.peak_bytes = self.used_bytes
+            return True
+
+    def release(self, size: int):
+        if size:
+            with self._lock:
+                self.used_bytes -= size
+
+    def get_stats(self) -> dict:
+        return {
+            "used_bytes": self.used_bytes,
+            "peak_bytes": self.peak_bytes,
+            "budget_bytes": self.budget_bytes,
+            "rejected": self.rejected,
+        }
+
+
+audio_memory_budget = AudioMemoryBudget()
+register_metrics("audio_memory", audio_memory_budget.get_stats)
+
+
+def _entry_size(packet: bytes, pcm_frame: bytes) -> int:
+    # PCM客户端的音频包和PCM是同一个对象，只计算一次
+    if pcm_frame is packet:
+        return len(packet)
+    return len(packet) + len(pcm_frame)
+
+
+class UtteranceAudio:
+    """一句话的上行音频
+
+    同时保存客户端原始音频包、解码后的PCM帧和VAD对该包的判定（三者一一对应），
+    上行音频只在接入时解码一次，ASR、声纹识别和聊天记录上报都直接使用这里的PCM。
+    缓冲区有固定的容量（max_duration_ms），占用的内存计入全局的audio_memory_budget；
+    达到容量或超出预算后不再接收新的音频，并把is_full置为True，由调用方强制结束本句。
+    预算由接收音频的缓冲区持有，clear、keep_last或release_memory时归还；
+    copy、trim_silence得到的副本与原缓冲区共享数据，不重复计入预算
+    """
+
+    def __init__(self, max_duration_ms: int = DEFAULT_MAX_UTTERANCE_MS):
+        self.packets = []
+        self.pcm_frames = []
+        self.voice_flags = []
+        # 每个包计入预算的字节数，共享其他缓冲区数据的包为0
+        self.owned_sizes = []
+        self.max_duration_ms = max_duration_ms
+        self.capacity_bytes = max(0, int(max_duration_ms)) * PCM_BYTES_PER_MS
+        self.pcm_size = 0
+        self.nbytes = 0
+        self.is_full = False
+
+    def __len__(self):
+        return len(self.packets)
+
+    def append(self, packet: bytes, pcm_frame: bytes, is_voice: bool = True) -> bool:
+        """加入一个音频包，缓冲区已满或超出内存预算时丢弃并返回False"""
+        if not packet:
+            return False
+        if self.capacity_bytes and self.pcm_size + len(pcm_frame) > self.capacity_bytes:
+            self.is_full = True
+            return False
+        size = _entry_size(packet, pcm_frame)
+        if not audio_memory_budget.reserve(size):
+            self.is_full = True
+            return False
+        self.packets.append(packet)
+        self.pcm_frames.append(pcm_frame)
+        self.voice_flags.append(bool(is_voice))
+        self.owned_sizes.append(size)
+        self.pcm_size += len(pcm_frame)
+        self.nbytes += size
+        return True
+
+    def keep_last(self, count: int):
+        """只保留最近的count个包，用于说话前的预录音"""
+        if count <= 0:
+            self.clear()
+        elif len(self.packets) > count:
+            released = sum(self.owned_sizes[:-count])
+            self.pcm_size -= sum(len(pcm_frame) for pcm_frame in self.pcm_frames[:-count])
+            del self.packets[:-count]
+            del self.pcm_frames[:-count]
+            del self.voice_flags[:-count]
+            del self.owned_sizes[:-count]
+            self.nbytes -= released
+            audio_memory_budget.release(released)
+            self.is_full = False
+
+    def clear(self):
+        self.packets.clear()
+        self.pcm_frames.clear()
+        self.voice_flags.clear()
+        self.owned_sizes.clear()
+        audio_memory_budget.release(self.nbytes)
+        self.pcm_size = 0
+        self.nbytes = 0
+        self.is_full = False
+
+    def release_memory(self):
+        """归还占用的预算但保留数据，用于数据已交给识别、上报等后续处理之后"""
+        audio_memory_budget.release(self.nbytes)
+        self.owned_sizes = [0] * len(self.owned_sizes)
+        self.nbytes = 0
+
+    def take(self) -> "UtteranceAudio":
+        """取走全部音频（连同占用的预算）放入新的缓冲区，本缓冲区变为空"""
+        utterance = UtteranceAudio(self.max_duration_ms)
+        utterance.packets, self.packets = self.packets, []
+        utterance.pcm_frames, self.pcm_frames = self.pcm_frames, []
+        utterance.voice_flags, self.voice_flags = self.voice_flags, []
+        utterance.owned_sizes, self.owned_sizes = self.owned_sizes, []
+        utterance.pcm_size, self.pcm_size = self.pcm_size, 0
+        utterance.nbytes, self.nbytes = self.nbytes, 0
+        utterance.is_full, self.is_full = self.is_full, False
+        return utterance
+
+    def _slice(self, start: int = 0, end: int = None) -> "UtteranceAudio":
+        utterance = UtteranceAudio(self.max_duration_ms)
+        utterance.packets = self.packets[start:end]
+        utterance.pcm_frames = self.pcm_frames[start:end]
+        utterance.voice_flags = self.voice_flags[start:end]
+        # 副本与原缓冲区共享数据，预算仍由原缓冲区持有
+        utterance.owned_sizes = [0] * len(utterance.packets)
+        utterance.pcm_size = sum(len(pcm_frame) for pcm_frame in utterance.pcm_frames)
+        return utterance
+
+    def copy(self) -> "UtteranceAudio":
+        return self._slice()
+
+    def pcm_bytes(self) -> bytes:
+        return b"".join(self.pcm_frames)
+
+    def trim_silence(self, padding_bytes: int) -> "UtteranceAudio":
+        """去掉首尾的静音，语音前后各保留约padding_bytes字节的PCM
+
+        没有任何包被判定为语音时（例如手动拾音模式下VAD漏检）原样返回
+        """
+        voiced = [i for i, is_voice in enumerate(self.voice_flags) if is_voice]
+        if not voiced:
+            return self
+        start, end = voiced[0], voiced[-1] + 1
+        padded = 0
+        while start > 0 and padded < padding_bytes:
+            start -= 1
+            padded += len(self.pcm_frames[start])
+        padded = 0
+        while end < len(self.pcm_frames) and padded < padding_bytes:
+            padded += len(self.pcm_frames[end])
+            end += 1
+        if start == 0 and end == len(self.packets):
+            return self
+        return self._slice(start, end)
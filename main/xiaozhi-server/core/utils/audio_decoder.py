@@ -0,0 +1,157 @@
+"""
+合成音频的渐进式解码
+把TTS返回的音频（或音频文件）解码成16kHz/16位单声道PCM，边解码边产出，
+下游可以在解码完成之前就开始编码、发送前面的音频帧，首帧延迟不再随句子长度增长：
+- 16kHz的wav/pcm在进程内直接解析（多声道时混成单声道），不启动ffmpeg
+- 其他采样率的pcm按裸数据交给ffmpeg重采样，不需要探测容器格式
+- 其他格式通过ffmpeg管道流式解码，输入在后台线程写入，输出读到多少产出多少
+"""
+
+import os
+import wave
+import threading
+import subprocess
+from io import BytesIO
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+# 每次从ffmpeg读取的最大字节数（240ms的PCM）
+READ_SIZE = SAMPLE_RATE * 2 * 240 // 1000
+
+
+def _wav_to_pcm(audio_bytes: bytes) -> Optional[bytes]:
+    """解析16kHz/16位的wav，其他采样率或位深返回None（交给ffmpeg重采样）"""
+    try:
+        with wave.open(BytesIO(audio_bytes), "rb") as wav:
+            channels = wav.getnchannels()
+            if wav.getsampwidth() != 2 or wav.getframerate() != SAMPLE_RATE:
+                return None
+            data = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if channels == 1:
+        return data
+    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, channels)
+    return samples.mean(axis=1).astype(np.int16).tobytes()
+
+
+def _raw_pcm_args(sample_rate: int) -> List[str]:
+    """裸PCM输入没有文件头，需要告诉ffmpeg数据格式"""
+    return ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1"]
+
+
+def _ffmpeg_pcm_stream(
+    input_path: Optional[str] = None,
+    input_chunks: Optional[Iterable[bytes]] = None,
+    input_args: Optional[List[str]] = None,
+) -> Iterator[bytes]:
+    """通过ffmpeg管道流式解码，产出16kHz/16位单声道PCM"""
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        *(input_args or []),
+        "-i",
+        input_path or "pipe:0",
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL if input_path else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    def write_input():
+        try:
+            for chunk in input_chunks:
+                process.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    writer = None
+    if input_chunks is not None:
+        writer = threading.Thread(target=write_input, daemon=True)
+        writer.start()
+
+    produced = 0
+    try:
+        fd = process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, READ_SIZE)
+            if not chunk:
+                break
+            produced += len(chunk)
+            yield chunk
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        error = process.stderr.read().decode("utf-8", errors="ignore").strip()
+        process.stderr.close()
+        process.wait()
+        if writer is not None:
+            writer.join(timeout=1)
+    if process.returncode != 0 and produced == 0:
+        raise RuntimeError(f"ffmpeg解码失败: {error}")
+
+
+def decode_audio_bytes(
+    audio_bytes: bytes, file_type: str, sample_rate: int = SAMPLE_RATE
+) -> Iterator[bytes]:
+    """流式解码内存中的音频数据，sample_rate只用于没有文件头的pcm"""
+    file_type = (file_type or "").lower()
+    if file_type == "pcm":
+        if sample_rate == SAMPLE_RATE:
+            yield audio_bytes
+        else:
+            yield from _ffmpeg_pcm_stream(
+                input_chunks=[audio_bytes], input_args=_raw_pcm_args(sample_rate)
+            )
+        return
+    if file_type == "wav":
+        pcm = _wav_to_pcm(audio_bytes)
+        if pcm is not None:
+            yield pcm
+            return
+    yield from _ffmpeg_pcm_stream(input_chunks=[audio_bytes])
+
+
+def decode_audio_file(
+    audio_file_path: str, sample_rate: int = SAMPLE_RATE
+) -> Iterator[bytes]:
+    """流式解码音频文件，sample_rate只用于没有文件头的.pcm文件"""
+    if audio_file_path.lower().endswith(".pcm"):
+        if sample_rate == SAMPLE_RATE:
+            with open(audio_file_path, "rb") as f:
+                while True:
+                    chunk = f.read(READ_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        else:
+            yield from _ffmpeg_pcm_stream(
+                input_path=audio_file_path, input_args=_raw_pcm_args(sample_rate)
+            )
+        return
+    if audio_file_path.lower().endswith(".wav"):
+        with open(audio_file_path, "rb") as f:
+            pcm = _wav_to_pcm(f.read())
+        if pcm is not None:
+            yield pcm
+            return
+    yield from _ffmpeg_pcm_stream(input_path=audio_file_path)
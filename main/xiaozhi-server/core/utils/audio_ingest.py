@@ -0,0 +1,42 @@
+"""
+上行音频接入
+按客户端hello消息中声明的音频格式，把上行音频包统一转换为16kHz/16位单声道PCM
+"""
+
+import opuslib_next
+
+SAMPLE_RATE = 16000
+# 每个Opus包最多解码的采样点数（60ms）
+OPUS_FRAME_SIZE = 960
+
+
+class UplinkAudioDecoder:
+    """单个连接的上行音频解码器
+
+    PCM客户端（网关、桥接盒子等直接发送16kHz PCM）的数据原样透传，不创建Opus解码器；
+    Opus客户端的每个包只在这里解码一次
+    """
+
+    def __init__(self):
+        self._opus_decoder = None
+        # PCM包长度为奇数字节时，留到下一个包拼接，保证采样点对齐
+        self._pcm_remainder = b""
+
+    def decode(self, packet: bytes, audio_format: str = "opus") -> bytes:
+        """解码一个上行音频包，解码失败时抛出opuslib_next.OpusError"""
+        if not packet:
+            return b""
+        if audio_format == "pcm":
+            return self._align_pcm(packet)
+        if self._opus_decoder is None:
+            self._opus_decoder = opuslib_next.Decoder(SAMPLE_RATE, 1)
+        return self._opus_decoder.decode(packet, OPUS_FRAME_SIZE)
+
+    def _align_pcm(self, packet: bytes) -> bytes:
+        if self._pcm_remainder:
+            packet = self._pcm_remainder + packet
+            self._pcm_remainder = b""
+        if len(packet) % 2:
+            self._pcm_remainder = packet[-1:]
+            packet = packet[:-1]
+        return packet
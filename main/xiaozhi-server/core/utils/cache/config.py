@@ -19,6 +19,7 @@ class CacheType(Enum):
     CONFIG = "config"
     DEVICE_PROMPT = "device_prompt"
     VOICEPRINT_HEALTH = "voiceprint_health"  # 声纹识别健康检查
+    ASR_RESULT = "asr_result"  # 短句语音指纹对应的识别结果
 
 
 @dataclass
@@ -58,5 +59,8 @@ class CacheConfig:
             CacheType.VOICEPRINT_HEALTH: cls(
                 strategy=CacheStrategy.TTL, ttl=600, max_size=100  # 10分钟过期
             ),
+            CacheType.ASR_RESULT: cls(
+                strategy=CacheStrategy.TTL_LRU, ttl=86400, max_size=20000  # 24小时
+            ),
         }
         return configs.get(cache_type, cls())
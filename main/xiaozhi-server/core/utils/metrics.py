@@ -0,0 +1,28 @@
+"""
+服务运行指标
+各模块注册自己的统计函数，由HTTP接口统一汇总输出
+"""
+
+from typing import Callable, Dict
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, collector: Callable[[], dict]):
+    """注册一组指标，同名的注册会覆盖之前的"""
+    _collectors[name] = collector
+
+
+def collect_metrics() -> dict:
+    metrics = {}
+    for name, collector in list(_collectors.items()):
+        try:
+            metrics[name] = collector()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"获取指标{name}失败: {e}")
+    return metrics
@@ -1,3 +1,4 @@
+import inspect
 from typing import Dict, Any
 from config.logger import setup_logging
 from core.utils import tts, llm, intent, memory, vad, asr
@@ -120,15 +121,37 @@ def initialize_asr(config):
         if "type" not in config["ASR"][select_asr_module]
         else config["ASR"][select_asr_module]["type"]
     )
+    asr_config = config["ASR"][select_asr_module]
+    if asr_type == "router":
+        # 路由ASR引用的是其他ASR的配置名，这里展开成具体配置
+        asr_config = dict(asr_config)
+        for key in ("local", "remote"):
+            name = asr_config.get(key)
+            if name not in config["ASR"]:
+                raise ValueError(f"路由ASR的{key}配置的ASR不存在: {name}")
+            asr_config[key] = {"name": name, **config["ASR"][name]}
     new_asr = asr.create_instance(
         asr_type,
-        config["ASR"][select_asr_module],
+        asr_config,
         str(config.get("delete_audio", True)).lower() in ("true", "1", "yes"),
     )
     logger.bind(tag=TAG).info("ASR模块初始化完成")
     return new_asr
 
 
+async def close_module(module):
+    """释放模块占用的推理线程、进程等资源，模块的close可以是同步或异步方法"""
+    close = getattr(module, "close", None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.bind(tag=TAG).error(f"释放模块资源失败: {e}")
+
+
 def initialize_voiceprint(asr_instance, config):
     """初始化声纹识别功能"""
     voiceprint_config = config.get("voiceprint")
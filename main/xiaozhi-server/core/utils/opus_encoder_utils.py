@@ -3,14 +3,87 @@ Opus编码工具类
 将PCM音频数据编码为Opus格式
 """
 
+import ctypes
 import logging
+import threading
 import traceback
-import numpy as np
-from typing import Optional, Callable, Any
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 from opuslib_next import Encoder
 from opuslib_next import constants
 
 
+class PCMFrameSlicer:
+    """把任意长度的PCM数据切成固定大小的帧
+
+    帧数据写入预分配的缓冲区，产出的是缓冲区上的ctypes视图，可以直接交给Opus编码器，
+    不为每一帧创建新的bytes；视图只在取下一帧之前有效，需要保存时调用bytes(frame)
+    """
+
+    def __init__(self, frame_bytes: int):
+        self.frame_bytes = frame_bytes
+        self._buffer = bytearray(frame_bytes)
+        self._view = memoryview(self._buffer)
+        self._frame = (ctypes.c_char * frame_bytes).from_buffer(self._buffer)
+        self._fill = 0
+
+    def reset(self):
+        self._fill = 0
+
+    def push(self, data) -> Iterator[ctypes.Array]:
+        """追加数据，逐个产出凑满的帧"""
+        data = memoryview(data).cast("B")
+        frame_bytes = self.frame_bytes
+        pos, size = 0, len(data)
+        while pos < size:
+            take = min(frame_bytes - self._fill, size - pos)
+            self._view[self._fill : self._fill + take] = data[pos : pos + take]
+            self._fill += take
+            pos += take
+            if self._fill == frame_bytes:
+                self._fill = 0
+                yield self._frame
+
+    def flush(self) -> Iterator[ctypes.Array]:
+        """产出剩余不足一帧的数据（补零）"""
+        if self._fill:
+            self._view[self._fill :] = bytes(self.frame_bytes - self._fill)
+            self._fill = 0
+            yield self._frame
+
+
+class OpusEncoderPool:
+    """按线程复用的Opus编码器，每次取用时重置状态
+
+    下行音频的每句话、每首音乐都在合成线程中顺序编码，同一线程内复用一个编码器即可，
+    不必为每次编码重新创建
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def acquire(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        application: int = constants.APPLICATION_AUDIO,
+    ) -> Encoder:
+        encoders: Dict[Tuple[int, int, int], Encoder] = getattr(
+            self._local, "encoders", None
+        )
+        if encoders is None:
+            encoders = self._local.encoders = {}
+        key = (sample_rate, channels, application)
+        encoder = encoders.get(key)
+        if encoder is None:
+            encoder = encoders[key] = Encoder(sample_rate, channels, application)
+        else:
+            encoder.reset_state()
+        return encoder
+
+
+opus_encoder_pool = OpusEncoderPool()
+
+
 class OpusEncoderUtils:
     """PCM到Opus的编码器"""
 
@@ -35,8 +108,8 @@ class OpusEncoderUtils:
         self.bitrate = 24000  # bps
         self.complexity = 10  # 最高质量
 
-        # 缓冲区初始化为空
-        self.buffer = np.array([], dtype=np.int16)
+        # 不足一帧的数据暂存在预分配的帧缓冲区中
+        self._slicer = PCMFrameSlicer(self.total_frame_size * 2)
 
         try:
             # 创建Opus编码器
@@ -53,7 +126,7 @@ class OpusEncoderUtils:
     def reset_state(self):
         """重置编码器状态"""
         self.encoder.reset_state()
-        self.buffer = np.array([], dtype=np.int16)
+        self._slicer.reset()
 
     def encode_pcm_to_opus_stream(self, pcm_data: bytes, end_of_stream: bool, callback: Callable[[Any], Any]):
         """
@@ -67,66 +140,30 @@ class OpusEncoderUtils:
         Returns:
             Opus数据包列表
         """
-        # 将字节数据转换为short数组
-        new_samples = self._convert_bytes_to_shorts(pcm_data)
-
-        # 校验PCM数据
-        self._validate_pcm_data(new_samples)
-
-        # 将新数据追加到缓冲区
-        self.buffer = np.append(self.buffer, new_samples)
-
-        offset = 0
-
-        # 处理所有完整帧
-        while offset <= len(self.buffer) - self.total_frame_size:
-            frame = self.buffer[offset : offset + self.total_frame_size]
+        # 处理所有完整帧（假设输入是小端字节序的16位PCM）
+        for frame in self._slicer.push(pcm_data):
             output = self._encode(frame)
             if output:
                 callback(output)
-            offset += self.total_frame_size
 
-        # 保留未处理的样本
-        self.buffer = self.buffer[offset:]
+        # 流结束时处理剩余数据，最后一帧用0填充
+        if end_of_stream:
+            for frame in self._slicer.flush():
+                output = self._encode(frame)
+                if output:
+                    callback(output)
 
-        # 流结束时处理剩余数据
-        if end_of_stream and len(self.buffer) > 0:
-            # 创建最后一帧并用0填充
-            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
-            last_frame[: len(self.buffer)] = self.buffer
-
-            output = self._encode(last_frame)
-            if output:
-                callback(output)
-            self.buffer = np.array([], dtype=np.int16)
-
-    def _encode(self, frame: np.ndarray) -> Optional[bytes]:
+    def _encode(self, frame) -> Optional[bytes]:
         """编码一帧音频数据"""
         try:
-            # 将numpy数组转换为bytes
-            frame_bytes = frame.tobytes()
             # opuslib要求输入字节数必须是channels*2的倍数
-            encoded = self.encoder.encode(frame_bytes, self.frame_size)
+            encoded = self.encoder.encode(frame, self.frame_size)
             return encoded
         except Exception as e:
             logging.error(f"Opus编码失败: {e}")
             traceback.print_exc()
             return None
 
-    def _convert_bytes_to_shorts(self, bytes_data: bytes) -> np.ndarray:
-        """将字节数组转换为short数组 (16位PCM)"""
-        # 假设输入是小端字节序的16位PCM
-        return np.frombuffer(bytes_data, dtype=np.int16)
-
-    def _validate_pcm_data(self, pcm_shorts: np.ndarray) -> None:
-        """验证PCM数据是否有效"""
-        # 16位PCM数据范围是 -32768 到 32767
-        if np.any((pcm_shorts < -32768) | (pcm_shorts > 32767)):
-            invalid_samples = pcm_shorts[(pcm_shorts < -32768) | (pcm_shorts > 32767)]
-            logging.warning(f"发现无效PCM样本: {invalid_samples[:5]}...")
-            # 在实际应用中可以选择裁剪而不是抛出异常
-            # np.clip(pcm_shorts, -32768, 32767, out=pcm_shorts)
-
     def close(self):
         """关闭编码器并释放资源"""
         # opuslib没有明确的关闭方法，Python的垃圾回收会处理
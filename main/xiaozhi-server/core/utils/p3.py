@@ -40,3 +40,14 @@ def decode_opus_from_bytes_stream(input_bytes, callback: Callable[[Any], Any]):
         if len(opus_data) != data_len:
             raise ValueError(f"Data length({len(opus_data)}) mismatch({data_len}) in the bytes.")
         callback(opus_data)
+
+
+def encode_opus_frames_to_bytes(frames) -> bytes:
+    """
+    把 Opus 数据包列表编码为p3二进制数据，每个包前加4字节头部。
+    """
+    output = bytearray()
+    for opus_data in frames:
+        output += struct.pack('>BBH', 0, 0, len(opus_data))
+        output += opus_data
+    return bytes(output)
@@ -0,0 +1,97 @@
+"""
+流式文本分句
+LLM逐个token输出时，只扫描新追加的字符：遇到标点就切出一句交给TTS，
+第一句使用更宽松的标点集合（包括逗号等），尽快开始播放；
+配置了最大句长时，没有标点的超长文本在最后一个停顿处（或直接按长度）切开
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+
+def _pattern(punctuations: Iterable[str]):
+    return re.compile("[" + re.escape("".join(sorted(set(punctuations)))) + "]")
+
+
+class SentenceSegmenter:
+    """增量分句器，每轮对话调用reset，每个token调用push，结束时调用flush"""
+
+    def __init__(
+        self,
+        punctuations: Iterable[str],
+        first_sentence_punctuations: Iterable[str],
+        max_segment_length: int = 0,
+    ):
+        """
+        Args:
+            punctuations: 第一句之后的断句标点
+            first_sentence_punctuations: 第一句的断句标点
+            max_segment_length: 单句最大长度，0表示不限制
+        """
+        self._pattern = _pattern(punctuations)
+        self._first_pattern = _pattern(first_sentence_punctuations)
+        # 超长文本优先在这些停顿处切开
+        self._soft_pattern = _pattern(
+            set(first_sentence_punctuations) - set(punctuations) | {" ", "\n"}
+        )
+        self.max_segment_length = max(0, int(max_segment_length))
+        self.reset()
+
+    def reset(self):
+        self._pending: List[str] = []
+        self._pending_length = 0
+        self.is_first_sentence = True
+
+    def _take(self, text: str, end: int) -> str:
+        self._pending.append(text[:end])
+        segment = "".join(self._pending)
+        self._pending = []
+        self._pending_length = 0
+        return segment
+
+    def push(self, text: str) -> List[str]:
+        """追加一段文本，返回新切出的句子（含标点）"""
+        segments = []
+        while text:
+            pattern = self._first_pattern if self.is_first_sentence else self._pattern
+            match = pattern.search(text)
+            if match is None:
+                break
+            segments.append(self._take(text, match.end()))
+            text = text[match.end() :]
+            self.is_first_sentence = False
+        if text:
+            self._pending.append(text)
+            self._pending_length += len(text)
+        if self.max_segment_length and self._pending_length >= self.max_segment_length:
+            segments.extend(self._split_long())
+        return segments
+
+    def _split_long(self) -> List[str]:
+        """把超过最大长度的未断句文本切开"""
+        pending = "".join(self._pending)
+        segments = []
+        while len(pending) >= self.max_segment_length:
+            window = pending[: self.max_segment_length]
+            cut = 0
+            for match in self._soft_pattern.finditer(window):
+                cut = match.end()
+            if cut == 0:
+                cut = self.max_segment_length
+            segments.append(pending[:cut])
+            pending = pending[cut:]
+        self._pending = [pending] if pending else []
+        self._pending_length = len(pending)
+        if segments:
+            self.is_first_sentence = False
+        return segments
+
+    def flush(self) -> Optional[str]:
+        """取出剩余未断句的文本"""
+        if not self._pending:
+            return None
+        segment = "".join(self._pending)
+        self._pending = []
+        self._pending_length = 0
+        self.is_first_sentence = True
+        return segment
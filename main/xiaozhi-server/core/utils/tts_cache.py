@@ -0,0 +1,197 @@
+"""
+TTS音频缓存
+按（TTS提供者及其配置、音频格式、规范化后的文本）缓存最终下发的60ms音频帧，
+问候语、播放提示、错误提示、绑定说明、告别语等重复的句子命中后直接把帧放入音频队列，
+不再合成和编码。内存中按LRU保留，超出内存预算时淘汰到磁盘（p3格式），磁盘也有容量上限
+"""
+
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from config.logger import setup_logging
+from core.utils import p3
+from core.utils.metrics import register_metrics
+
+TAG = __name__
+logger = setup_logging()
+
+# 每个音频帧对象除数据外的内存开销（字节）
+FRAME_OVERHEAD = 33
+
+
+def _frames_size(frames: List[bytes]) -> int:
+    return sum(len(frame) for frame in frames) + FRAME_OVERHEAD * len(frames)
+
+
+class TTSAudioCache:
+    """内存LRU + 磁盘p3的两级TTS音频缓存"""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        memory_budget_mb: float = 64,
+        disk_budget_mb: float = 512,
+        max_text_length: int = 100,
+    ):
+        """
+        Args:
+            cache_dir: 磁盘缓存目录
+            memory_budget_mb: 内存缓存上限，超出后把最久未用的句子淘汰到磁盘
+            disk_budget_mb: 磁盘缓存上限，超出后删除最久未用的文件，0表示不使用磁盘
+            max_text_length: 只缓存不超过该长度的句子
+        """
+        self.cache_dir = cache_dir
+        self.memory_budget = int(float(memory_budget_mb) * 1024 * 1024)
+        self.disk_budget = int(float(disk_budget_mb) * 1024 * 1024)
+        self.max_text_length = max_text_length
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        if self.disk_budget:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """启动时按修改时间加载已有的磁盘缓存"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".p3"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-3], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self.disk_bytes += size
+        self._evict_disk()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.p3")
+
+    def make_key(self, provider_key: str, text: str) -> Optional[str]:
+        """生成缓存键，句子太长时返回None（不缓存）"""
+        normalized = re.sub(r"\s+", " ", text).strip()
+        if not normalized or len(normalized) > self.max_text_length:
+            return None
+        return hashlib.sha1(f"{provider_key}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        with self._lock:
+            frames = self._memory.get(key)
+            if frames is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return frames
+            on_disk = key in self._disk
+        if on_disk:
+            frames = []
+            try:
+                p3.decode_opus_from_file_stream(self._path(key), callback=frames.append)
+            except Exception as e:
+                logger.bind(tag=TAG).warning(f"读取TTS磁盘缓存失败: {e}")
+                with self._lock:
+                    self._remove_disk(key)
+                    self.stats["misses"] += 1
+                return None
+            with self._lock:
+                self.stats["disk_hits"] += 1
+                self._store_memory(key, frames)
+            return frames
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, frames: List[bytes]):
+        if not frames:
+            return
+        with self._lock:
+            self.stats["stores"] += 1
+            self._store_memory(key, frames)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = len(self._disk)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        stats["memory_bytes"] = self.memory_bytes
+        stats["disk_bytes"] = self.disk_bytes
+        return stats
+
+    def _store_memory(self, key: str, frames: List[bytes]):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = frames
+        self.memory_bytes += _frames_size(frames)
+        # 超出内存预算时把最久未用的句子淘汰到磁盘
+        while self.memory_bytes > self.memory_budget and len(self._memory) > 1:
+            old_key, old_frames = self._memory.popitem(last=False)
+            self.memory_bytes -= _frames_size(old_frames)
+            self._spill(old_key, old_frames)
+
+    def _spill(self, key: str, frames: List[bytes]):
+        if not self.disk_budget:
+            return
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            return
+        data = p3.encode_opus_frames_to_bytes(frames)
+        try:
+            with open(self._path(key), "wb") as f:
+                f.write(data)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"写入TTS磁盘缓存失败: {e}")
+            return
+        self._disk[key] = len(data)
+        self.disk_bytes += len(data)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self.disk_bytes > self.disk_budget and self._disk:
+            self._remove_disk(next(iter(self._disk)))
+
+    def _remove_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self.disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_tts_cache(config: Optional[dict]) -> Optional[TTSAudioCache]:
+    """获取配置对应的缓存，未启用时返回None"""
+    if not config or str(config.get("enabled", False)).lower() not in ("true", "1"):
+        return None
+    cache_dir = config.get("cache_dir", "tmp/tts_cache")
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = TTSAudioCache(
+                cache_dir,
+                memory_budget_mb=config.get("memory_budget_mb", 64),
+                disk_budget_mb=config.get("disk_budget_mb", 512),
+                max_text_length=int(config.get("max_text_length", 100)),
+            )
+            _caches[cache_dir] = cache
+            register_metrics("tts_cache", cache.get_stats)
+    return cache
@@ -0,0 +1,116 @@
+"""
+非流式TTS的预合成流水线
+当前句子播放（编码发送）的同时提前合成后面的句子，最多同时合成lookahead句；
+输出严格按提交顺序进入音频队列：排在最前面的句子边合成边输出，后面的句子先暂存，
+轮到它时再一次性输出暂存的部分并改为直接输出
+"""
+
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Any, Callable
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 所有连接共享的合成线程池
+_synthesis_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=64, thread_name_prefix="tts-synthesis"
+)
+
+
+class _SegmentJob:
+    __slots__ = ("buffer", "direct", "done", "cancelled")
+
+    def __init__(self):
+        self.buffer = []
+        # 是否已轮到本句输出
+        self.direct = False
+        self.done = False
+        self.cancelled = False
+
+
+class TTSPipeline:
+    """按顺序输出的有界预合成流水线，每个连接一个"""
+
+    def __init__(self, output: Callable[[Any], None], lookahead: int = 2):
+        """
+        Args:
+            output: 输出一条音频队列数据，例如tts_audio_queue.put
+            lookahead: 最多同时合成的句数，1表示不预合成（逐句合成）
+        """
+        self.output = output
+        self.lookahead = max(1, int(lookahead))
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        # 每次cancel加一，等待中的submit据此发现本轮已被打断
+        self._generation = 0
+
+    def submit(self, synthesize: Callable[[Callable[[Any], None]], None], stop_event=None):
+        """提交一句话的合成，synthesize(emit)在线程池中执行，通过emit输出音频队列数据
+
+        已有lookahead句在合成时阻塞等待
+        """
+        job = _SegmentJob()
+        with self._cond:
+            generation = self._generation
+            while len(self._jobs) >= self.lookahead:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                self._cond.wait(timeout=1)
+                if self._generation != generation:
+                    # 等待期间本轮被打断，丢弃这一句
+                    return
+            job.direct = not self._jobs
+            self._jobs.append(job)
+        _synthesis_executor.submit(self._run, job, synthesize)
+
+    def wait(self, stop_event=None):
+        """等待已提交的句子全部输出完毕"""
+        with self._cond:
+            while self._jobs:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                self._cond.wait(timeout=1)
+
+    def cancel(self):
+        """丢弃所有正在合成的句子（用户打断），合成中的线程结束后其输出会被忽略"""
+        with self._cond:
+            self._generation += 1
+            for job in self._jobs:
+                job.cancelled = True
+                job.buffer.clear()
+            if self._jobs:
+                logger.bind(tag=TAG).debug(f"丢弃{len(self._jobs)}句预合成的语音")
+            self._jobs.clear()
+            self._cond.notify_all()
+
+    def _emit(self, job: _SegmentJob, item):
+        with self._cond:
+            if job.cancelled:
+                return
+            if job.direct:
+                self.output(item)
+            else:
+                job.buffer.append(item)
+
+    def _run(self, job: _SegmentJob, synthesize):
+        try:
+            synthesize(lambda item: self._emit(job, item))
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"预合成语音失败: {e}")
+        finally:
+            with self._cond:
+                job.done = True
+                # 按顺序推进：前面的句子都完成后，把下一句暂存的数据输出并改为直接输出
+                while self._jobs and self._jobs[0].done:
+                    self._jobs.popleft()
+                    if self._jobs:
+                        head = self._jobs[0]
+                        for item in head.buffer:
+                            self.output(item)
+                        head.buffer.clear()
+                        head.direct = True
+                self._cond.notify_all()
@@ -2,14 +2,11 @@ import json
 import socket
 import subprocess
 import re
-import os
-from io import BytesIO
-from typing import Callable, Any
+from typing import Callable, Any, Iterable
 from core.utils import p3
-import numpy as np
 import requests
-import opuslib_next
-from pydub import AudioSegment
+from core.utils.audio_decoder import decode_audio_bytes, decode_audio_file
+from core.utils.opus_encoder_utils import PCMFrameSlicer, opus_encoder_pool
 import copy
 
 TAG = __name__
@@ -211,67 +208,59 @@ def extract_json_from_string(input_string):
     return None
 
 
-def audio_to_data_stream(audio_file_path, is_opus=True, callback: Callable[[Any], Any]=None) -> None:
-    # 获取文件后缀名
-    file_type = os.path.splitext(audio_file_path)[1]
-    if file_type:
-        file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
+def audio_to_data_stream(
+    audio_file_path, is_opus=True, callback: Callable[[Any], Any] = None, sample_rate=16000
+) -> None:
+    # 边解码边编码：ffmpeg每输出一段PCM就立即切帧回调，不等整个文件解码完成
+    pcm_chunks_to_data_stream(
+        decode_audio_file(audio_file_path, sample_rate), is_opus, callback
     )
 
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
 
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-    pcm_to_data_stream(raw_data, is_opus, callback)
-
-
-def audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback: Callable[[Any], Any]) -> None:
+def audio_bytes_to_data_stream(
+    audio_bytes, file_type, is_opus, callback: Callable[[Any], Any], sample_rate=16000
+) -> None:
     """
-    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3
+    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3、pcm
+    sample_rate为pcm数据的采样率，16kHz的pcm直接进入Opus编码器
     """
     if file_type == "p3":
         # 直接用p3解码
         return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
+        # 16kHz的wav/pcm在进程内解析，其他格式通过ffmpeg管道流式解码
+        pcm_chunks_to_data_stream(
+            decode_audio_bytes(audio_bytes, file_type, sample_rate), is_opus, callback
         )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        raw_data = audio.raw_data
-        pcm_to_data_stream(raw_data, is_opus, callback)
 
 
 def pcm_to_data_stream(raw_data, is_opus=True, callback: Callable[[Any], Any] = None):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
+    pcm_chunks_to_data_stream([raw_data], is_opus, callback)
+
 
+def pcm_chunks_to_data_stream(
+    chunks: Iterable[bytes], is_opus=True, callback: Callable[[Any], Any] = None
+):
+    """把逐段到达的PCM切成60ms帧，凑满一帧立即编码回调（最后一帧不足时补零）"""
     # 编码参数
     frame_duration = 60  # 60ms per frame
     frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
 
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-            callback(frame_data)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-            callback(frame_data)
+    # 同一线程复用编码器，不再每句话重新创建
+    encoder = opus_encoder_pool.acquire(16000, 1) if is_opus else None
+    slicer = PCMFrameSlicer(frame_size * 2)  # 16bit=2bytes/sample
+
+    def emit(frames):
+        for frame in frames:
+            if is_opus:
+                callback(encoder.encode(frame, frame_size))
+            else:
+                callback(bytes(frame))
+
+    for data in chunks:
+        if data:
+            emit(slicer.push(data))
+    emit(slicer.flush())
 
 
 def check_vad_update(before_config, new_config):
@@ -0,0 +1,191 @@
+"""
+VAD批量推理引擎
+所有连接共享一个推理线程：每个tick收集各连接待检测的音频块，拼成一个批次统一推理，
+推理结果通过Future返回给提交的连接线程，VAD推理不再占用事件循环
+"""
+
+import time
+import queue
+import weakref
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List
+
+import numpy as np
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class VADRequest:
+    """一个连接一次提交的待检测音频块"""
+
+    __slots__ = ("session", "chunks", "future")
+
+    def __init__(self, session, chunks, future: Future):
+        self.session = session
+        # 形状为 [块数, chunk_size] 的float32数组（或等价的块列表）
+        self.chunks = chunks
+        self.future = future
+
+
+class VADBatchEngine:
+    """跨连接批量推理的VAD引擎"""
+
+    def __init__(
+        self,
+        infer_batch: Callable[[np.ndarray, List[Any]], np.ndarray],
+        chunk_size: int = 512,
+        max_batch_size: int = 64,
+        batch_wait_ms: float = 0,
+    ):
+        """
+        Args:
+            infer_batch: 批量推理函数，参数为 [B, chunk_size] 的音频和B个连接的模型状态，
+                返回B个语音概率，并就地更新各连接的模型状态
+            chunk_size: 每个音频块的采样点数
+            max_batch_size: 单批次最多合并的音频块数
+            batch_wait_ms: 凑批的最长等待时间（毫秒），0表示有多少处理多少
+        """
+        # 绑定方法只保存弱引用，推理线程不会让VAD模块及其模型无法释放；
+        # 模块被回收后线程自动退出
+        if hasattr(infer_batch, "__self__"):
+            self._infer_batch = weakref.WeakMethod(infer_batch)
+        else:
+            self._infer_batch = lambda: infer_batch
+        self.chunk_size = chunk_size
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_wait = max(0.0, float(batch_wait_ms)) / 1000
+        self.stats = {"batches": 0, "chunks": 0, "max_batch": 0}
+
+        self._queue = queue.Queue()
+        # 同一连接在一个批次中只能出现一次（RNN状态有先后依赖），重复的请求顺延到下一批
+        self._deferred = []
+        # 复用的批次缓冲区，避免每个tick重新分配；推理实现可以基于它创建一次性的张量视图
+        self.batch_buffer = np.zeros(
+            (self.max_batch_size, self.chunk_size), dtype=np.float32
+        )
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="vad-batch-engine", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, session, chunks) -> Future:
+        """提交一个连接的音频块，返回每个块的语音概率
+
+        Args:
+            session: 连接的VAD会话，推理时使用其model_state
+            chunks: 形状为 [块数, chunk_size] 的float32音频块
+        """
+        future = Future()
+        if len(chunks) == 0:
+            future.set_result(np.zeros(0, dtype=np.float32))
+            return future
+        if self._stop_event.is_set():
+            future.set_exception(RuntimeError("VAD引擎已关闭"))
+            return future
+        self._queue.put(VADRequest(session, chunks, future))
+        return future
+
+    def get_stats(self) -> dict:
+        """批量推理统计：推理批次数、推理块数和单批次最大块数"""
+        return dict(self.stats)
+
+    def close(self, timeout: float = 0):
+        """停止推理线程，尚未处理的请求以异常结束
+
+        Args:
+            timeout: 等待推理线程退出的秒数，0表示不等待（线程最多1秒后自行退出）
+        """
+        self._stop_event.set()
+        if timeout and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        # 线程仍在运行时由它退出前清理，避免两个线程同时操作等待队列
+        if not self._thread.is_alive():
+            self._fail_pending()
+
+    def _fail_pending(self):
+        pending, self._deferred = self._deferred, []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for request in pending:
+            try:
+                request.future.set_exception(RuntimeError("VAD引擎已关闭"))
+            except InvalidStateError:
+                pass
+
+    def _collect_batch(self) -> List[VADRequest]:
+        batch, seen = [], set()
+        pending, self._deferred = self._deferred, []
+
+        def add(request):
+            if id(request.session) in seen:
+                self._deferred.append(request)
+            else:
+                seen.add(id(request.session))
+                batch.append(request)
+
+        for request in pending:
+            add(request)
+        if not batch:
+            add(self._queue.get(timeout=1))
+
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                timeout = deadline - time.monotonic()
+                if timeout > 0:
+                    add(self._queue.get(timeout=timeout))
+                else:
+                    add(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _process_batch(self, batch: List[VADRequest]):
+        results = [np.empty(len(r.chunks), dtype=np.float32) for r in batch]
+        rounds = max(len(r.chunks) for r in batch)
+        # 同一连接的多个块按顺序逐轮推理，每一轮合并所有连接的第N个块
+        for index in range(rounds):
+            active = [i for i, r in enumerate(batch) if len(r.chunks) > index]
+            audio = self.batch_buffer[: len(active)]
+            for row, i in enumerate(active):
+                audio[row] = batch[i].chunks[index]
+            infer_batch = self._infer_batch()
+            if infer_batch is None:
+                raise RuntimeError("VAD模块已释放")
+            probs = infer_batch(
+                audio, [batch[i].session.model_state for i in active]
+            )
+            for row, i in enumerate(active):
+                results[i][index] = probs[row]
+            self.stats["batches"] += 1
+            self.stats["chunks"] += len(active)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(active))
+        return results
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self._infer_batch() is None:
+                self._stop_event.set()
+                break
+            try:
+                batch = self._collect_batch()
+            except queue.Empty:
+                continue
+            try:
+                results = self._process_batch(batch)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"VAD批量推理失败: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+        self._fail_pending()
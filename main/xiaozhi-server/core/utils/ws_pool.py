@@ -0,0 +1,151 @@
+"""
+远程ASR的websocket连接池
+按提供者配置预先建立并完成鉴权/初始化的连接，检测到说话时直接取用，
+把TLS握手和协议初始化移出每句话的关键路径；空闲连接定期ping保活，超时或失效的连接会被替换
+"""
+
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple
+
+from websockets.protocol import State
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class WebSocketPool:
+    """预热的websocket连接池，绑定在创建它的事件循环上"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable],
+        pool_size: int = 2,
+        max_idle_time: float = 30,
+        ping_interval: float = 10,
+        ping_timeout: float = 5,
+    ):
+        """
+        Args:
+            connect: 建立一个可直接使用的连接（含鉴权和初始化）的协程函数
+            pool_size: 保持的空闲连接数，也是空闲连接数的上限
+            max_idle_time: 空闲连接的最长保留时间（秒），超过后关闭并重新建立
+            ping_interval: 空闲连接健康检查的间隔（秒）
+            ping_timeout: ping等待pong的超时时间（秒）
+        """
+        self.connect = connect
+        self.pool_size = max(0, int(pool_size))
+        self.max_idle_time = max_idle_time
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        # (连接, 放入池中的时间)
+        self._idle: List[Tuple[object, float]] = []
+        self._connecting = 0
+        self._maintain_task = None
+        self.stats = {"hits": 0, "misses": 0, "replaced": 0}
+
+    def start(self):
+        """在当前事件循环中启动预热和健康检查，重复调用无副作用"""
+        if self.pool_size and (self._maintain_task is None or self._maintain_task.done()):
+            self._maintain_task = asyncio.create_task(self._maintain())
+
+    async def acquire(self):
+        """取出一个健康的空闲连接，没有时直接新建"""
+        self.start()
+        now = time.monotonic()
+        while self._idle:
+            ws, idle_since = self._idle.pop()
+            if ws.state is State.OPEN and now - idle_since < self.max_idle_time:
+                self.stats["hits"] += 1
+                self._refill()
+                return ws
+            self.stats["replaced"] += 1
+            asyncio.create_task(self._close(ws))
+        self.stats["misses"] += 1
+        self._refill()
+        return await self.connect()
+
+    async def release(self, ws, reusable: bool = True):
+        """归还连接，不可复用、已关闭或池已满时直接关闭"""
+        if (
+            reusable
+            and ws.state is State.OPEN
+            and len(self._idle) + self._connecting < self.pool_size
+        ):
+            self._idle.append((ws, time.monotonic()))
+        else:
+            await self._close(ws)
+
+    async def close(self):
+        if self._maintain_task:
+            self._maintain_task.cancel()
+            self._maintain_task = None
+        idle, self._idle = self._idle, []
+        for ws, _ in idle:
+            await self._close(ws)
+
+    def _refill(self):
+        missing = self.pool_size - len(self._idle) - self._connecting
+        for _ in range(max(0, missing)):
+            self._connecting += 1
+            asyncio.create_task(self._add_connection())
+
+    async def _add_connection(self):
+        try:
+            ws = await self.connect()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"预建ASR连接失败: {e}")
+            return
+        finally:
+            self._connecting -= 1
+        if len(self._idle) < self.pool_size:
+            self._idle.append((ws, time.monotonic()))
+        else:
+            await self._close(ws)
+
+    async def _is_healthy(self, ws, idle_since: float) -> bool:
+        if ws.state is not State.OPEN:
+            return False
+        if time.monotonic() - idle_since >= self.max_idle_time:
+            return False
+        try:
+            pong = await ws.ping()
+            await asyncio.wait_for(pong, timeout=self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _maintain(self):
+        while True:
+            self._refill()
+            await asyncio.sleep(self.ping_interval)
+            for entry in list(self._idle):
+                ws, idle_since = entry
+                if await self._is_healthy(ws, idle_since):
+                    continue
+                # 检查期间可能已被取走使用，只处理仍在池中的连接
+                if entry in self._idle:
+                    self._idle.remove(entry)
+                    self.stats["replaced"] += 1
+                    await self._close(ws)
+
+    @staticmethod
+    async def _close(ws):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+
+_pools: Dict[Hashable, WebSocketPool] = {}
+
+
+def get_ws_pool(key: Hashable, connect: Callable[[], Awaitable], **kwargs) -> WebSocketPool:
+    """获取配置对应的连接池，相同配置的提供者实例共享一个池"""
+    pool = _pools.get(key)
+    if pool is None:
+        pool = WebSocketPool(connect, **kwargs)
+        _pools[key] = pool
+    return pool
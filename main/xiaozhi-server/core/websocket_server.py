@@ -3,7 +3,9 @@ import websockets
 from config.logger import setup_logging
 from core.connection import ConnectionHandler
 from config.config_loader import get_config_from_api
-from core.utils.modules_initialize import initialize_modules
+from core.utils.modules_initialize import initialize_modules, close_module
+from core.utils.audio_buffer import audio_memory_budget
+from core.utils.audio_assets import audio_asset_store
 from core.utils.util import check_vad_update, check_asr_update
 
 TAG = __name__
@@ -14,6 +16,9 @@ class WebSocketServer:
         self.config = config
         self.logger = setup_logging()
         self.config_lock = asyncio.Lock()
+        audio_memory_budget.configure(self.config.get("audio_buffer_budget_mb", 0))
+        # 提示音在后台预先转码，播放时直接使用Opus帧
+        audio_asset_store.preload_in_background()
         modules = initialize_modules(
             self.logger,
             self.config,
@@ -31,6 +36,8 @@ class WebSocketServer:
         self._memory = modules["memory"] if "memory" in modules else None
 
         self.active_connections = set()
+        # 更新配置时被替换的共享模块，等仍在使用它的连接全部断开后再释放
+        self._retired_modules = []
 
     async def start(self):
         server_config = self.config["server"]
@@ -62,6 +69,7 @@ class WebSocketServer:
         finally:
             # 确保从活动连接集合中移除
             self.active_connections.discard(handler)
+            await self._release_retired_modules()
             # 强制关闭连接（如果还没有关闭的话）
             try:
                 # 安全地检查WebSocket状态并关闭
@@ -77,6 +85,24 @@ class WebSocketServer:
                     f"服务器端强制关闭连接时出错: {close_error}"
                 )
 
+    def _retire_module(self, module):
+        if module is not None:
+            self._retired_modules.append(module)
+
+    def _module_in_use(self, module) -> bool:
+        for handler in self.active_connections:
+            for attr in ("_vad", "_asr", "vad", "asr"):
+                if getattr(handler, attr, None) is module:
+                    return True
+        return False
+
+    async def _release_retired_modules(self):
+        """释放已被替换且没有连接再使用的模块（推理线程、进程池等）"""
+        for module in list(self._retired_modules):
+            if not self._module_in_use(module):
+                self._retired_modules.remove(module)
+                await close_module(module)
+
     async def _http_response(self, websocket, request_headers):
         # 检查是否为 WebSocket 升级请求
         if request_headers.headers.get("connection", "").lower() == "upgrade":
@@ -122,8 +148,10 @@ class WebSocketServer:
 
                 # 更新组件实例
                 if "vad" in modules:
+                    self._retire_module(self._vad)
                     self._vad = modules["vad"]
                 if "asr" in modules:
+                    self._retire_module(self._asr)
                     self._asr = modules["asr"]
                 if "llm" in modules:
                     self._llm = modules["llm"]
@@ -131,6 +159,7 @@ class WebSocketServer:
                     self._intent = modules["intent"]
                 if "memory" in modules:
                     self._memory = modules["memory"]
+                await self._release_retired_modules()
                 self.logger.bind(tag=TAG).info(f"更新配置任务执行完毕")
                 return True
         except Exception as e:
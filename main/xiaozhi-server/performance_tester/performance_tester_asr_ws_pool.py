@@ -0,0 +1,122 @@
+import json
+import time
+import asyncio
+import logging
+import statistics
+import websockets
+from tabulate import tabulate
+from core.providers.asr.fun_server import ASRProvider
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "远程ASR连接池测试（本地模拟FunASR服务，对比首个结果耗时）"
+
+HOST = "127.0.0.1"
+PORT = 10196
+# 模拟建立连接时的网络往返和TLS握手耗时（秒）
+HANDSHAKE_DELAY = 0.08
+# 模拟服务端识别耗时（秒）
+RECOGNIZE_DELAY = 0.02
+ROUNDS = 20
+# 1秒的静音PCM
+TEST_PCM = [b"\x00\x00" * 960] * 17
+
+
+async def _process_request(connection, request):
+    await asyncio.sleep(HANDSHAKE_DELAY)
+    return None
+
+
+async def _handle_client(ws):
+    """按FunASR离线模式的协议应答：配置消息、PCM数据、结束消息后返回最终结果"""
+    async for message in ws:
+        if isinstance(message, bytes):
+            continue
+        data = json.loads(message)
+        if data.get("is_speaking") is False:
+            await asyncio.sleep(RECOGNIZE_DELAY)
+            await ws.send(json.dumps({"text": "测试", "is_final": True}))
+
+
+class ASRPoolPerformanceTester:
+    def __init__(self):
+        self.results = []
+
+    async def _test_provider(self, pool_size: int):
+        asr = ASRProvider(
+            {
+                "host": HOST,
+                "port": PORT,
+                "is_ssl": False,
+                "output_dir": "tmp/",
+                "pool_size": pool_size,
+            },
+            True,
+        )
+        if asr.ws_pool:
+            asr.ws_pool.start()
+            # 等待连接池预热完成
+            await asyncio.sleep(HANDSHAKE_DELAY * 3)
+
+        latencies = []
+        for i in range(ROUNDS):
+            start = time.perf_counter()
+            text, _ = await asr.speech_to_text(TEST_PCM, f"pool-test-{i}", "pcm")
+            latencies.append(time.perf_counter() - start)
+            # 模拟两句话之间的间隔
+            await asyncio.sleep(0.05)
+
+        if asr.ws_pool:
+            stats = asr.ws_pool.stats
+            await asr.ws_pool.close()
+        else:
+            stats = {"hits": 0, "misses": ROUNDS}
+        return {
+            "pool_size": pool_size,
+            "avg": statistics.mean(latencies),
+            "p50": statistics.median(latencies),
+            "max": max(latencies),
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+        }
+
+    def _print_results(self):
+        print("\n" + "=" * 50)
+        print("远程ASR连接池测试结果")
+        print("=" * 50)
+        headers = ["连接池大小", "平均耗时(s)", "中位耗时(s)", "最大耗时(s)", "命中", "新建"]
+        table_data = [
+            [
+                r["pool_size"],
+                f"{r['avg']:.3f}",
+                f"{r['p50']:.3f}",
+                f"{r['max']:.3f}",
+                r["hits"],
+                r["misses"],
+            ]
+            for r in self.results
+        ]
+        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print(f"- 本地模拟服务建立连接耗时{HANDSHAKE_DELAY * 1000:.0f}ms，识别耗时{RECOGNIZE_DELAY * 1000:.0f}ms")
+        print(f"- 每种配置连续识别{ROUNDS}句，耗时为发送音频到收到最终结果")
+        print("\n测试完成！")
+
+    async def run(self):
+        async with websockets.serve(
+            _handle_client, HOST, PORT, process_request=_process_request
+        ):
+            for pool_size in (0, 2):
+                print(f"开始测试 连接池大小={pool_size} ...")
+                self.results.append(await self._test_provider(pool_size))
+        self._print_results()
+
+
+async def main():
+    tester = ASRPoolPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
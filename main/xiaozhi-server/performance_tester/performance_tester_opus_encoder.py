@@ -0,0 +1,165 @@
+import time
+import numpy as np
+import opuslib_next
+from tabulate import tabulate
+from core.utils.util import pcm_chunks_to_data_stream
+from core.utils.opus_encoder_utils import OpusEncoderUtils
+
+description = "下行Opus编码测试（单核每秒编码帧数）"
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 960
+FRAME_BYTES = FRAME_SIZE * 2
+SENTENCES = 50
+SENTENCE_SECONDS = 4
+STREAM_SECONDS = 120
+# 流式TTS每次推送的PCM大小（字节）
+STREAM_CHUNK = 4096
+
+
+def _build_pcm(seconds: float, seed: int) -> bytes:
+    """生成带噪声的和弦音，模拟合成语音/音乐"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    wave = sum(np.sin(2 * np.pi * f * t) for f in (220, 330, 440)) / 3
+    wave = 0.6 * wave + 0.1 * rng.standard_normal(len(t))
+    return (np.clip(wave, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def _legacy_pcm_to_data_stream(raw_data, is_opus, callback):
+    """原实现：每次调用新建编码器，逐帧切片补零并经过numpy往返"""
+    encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO)
+    for i in range(0, len(raw_data), FRAME_BYTES):
+        chunk = raw_data[i : i + FRAME_BYTES]
+        if len(chunk) < FRAME_BYTES:
+            chunk += b"\x00" * (FRAME_BYTES - len(chunk))
+        if is_opus:
+            np_frame = np.frombuffer(chunk, dtype=np.int16)
+            callback(encoder.encode(np_frame.tobytes(), FRAME_SIZE))
+        else:
+            callback(chunk if isinstance(chunk, bytes) else bytes(chunk))
+
+
+class _LegacyStreamEncoder(OpusEncoderUtils):
+    """原实现：np.append扩充缓冲区，每块数据都做一次int16范围检查"""
+
+    def __init__(self):
+        super().__init__(SAMPLE_RATE, 1, 60)
+        self.buffer = np.array([], dtype=np.int16)
+
+    def encode_pcm_to_opus_stream(self, pcm_data, end_of_stream, callback):
+        samples = np.frombuffer(pcm_data, dtype=np.int16)
+        if np.any((samples < -32768) | (samples > 32767)):
+            pass
+        self.buffer = np.append(self.buffer, samples)
+        offset = 0
+        while offset <= len(self.buffer) - self.total_frame_size:
+            frame = self.buffer[offset : offset + self.total_frame_size]
+            callback(self.encoder.encode(frame.tobytes(), self.frame_size))
+            offset += self.total_frame_size
+        self.buffer = self.buffer[offset:]
+        if end_of_stream and len(self.buffer) > 0:
+            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
+            last_frame[: len(self.buffer)] = self.buffer
+            callback(self.encoder.encode(last_frame.tobytes(), self.frame_size))
+            self.buffer = np.array([], dtype=np.int16)
+
+
+class OpusEncoderPerformanceTester:
+    def __init__(self):
+        self.sentences = [_build_pcm(SENTENCE_SECONDS, i) for i in range(SENTENCES)]
+        self.stream = _build_pcm(STREAM_SECONDS, SENTENCES)
+        self.results = []
+
+    @staticmethod
+    def _measure(run):
+        frames = []
+        start = time.process_time()
+        run(frames.append)
+        cost = time.process_time() - start
+        return len(frames), cost
+
+    def _sentence_case(self, func, is_opus):
+        def run(callback):
+            for pcm in self.sentences:
+                func(pcm, is_opus, callback)
+
+        return run
+
+    def _stream_case(self, encoder_factory):
+        def run(callback):
+            encoder = encoder_factory()
+            for i in range(0, len(self.stream), STREAM_CHUNK):
+                encoder.encode_pcm_to_opus_stream(
+                    self.stream[i : i + STREAM_CHUNK], False, callback
+                )
+            encoder.encode_pcm_to_opus_stream(b"", True, callback)
+
+        return run
+
+    def _add_result(self, name, legacy, new):
+        (legacy_frames, legacy_cost), (new_frames, new_cost) = legacy, new
+        legacy_fps = legacy_frames / legacy_cost
+        new_fps = new_frames / new_cost
+        self.results.append(
+            [
+                name,
+                legacy_frames,
+                f"{legacy_fps:,.0f}",
+                f"{new_fps:,.0f}",
+                f"{new_fps / legacy_fps:.2f}x",
+            ]
+        )
+
+    def run(self):
+        print("开始测试整句编码（Opus）...")
+        self._add_result(
+            f"整句编码Opus({SENTENCES}句x{SENTENCE_SECONDS}秒)",
+            self._measure(self._sentence_case(_legacy_pcm_to_data_stream, True)),
+            self._measure(
+                self._sentence_case(
+                    lambda pcm, is_opus, cb: pcm_chunks_to_data_stream([pcm], is_opus, cb),
+                    True,
+                )
+            ),
+        )
+        print("开始测试整句切帧（PCM）...")
+        self._add_result(
+            f"整句切帧PCM({SENTENCES}句x{SENTENCE_SECONDS}秒)",
+            self._measure(self._sentence_case(_legacy_pcm_to_data_stream, False)),
+            self._measure(
+                self._sentence_case(
+                    lambda pcm, is_opus, cb: pcm_chunks_to_data_stream([pcm], is_opus, cb),
+                    False,
+                )
+            ),
+        )
+        print("开始测试流式编码 ...")
+        self._add_result(
+            f"流式编码Opus({STREAM_SECONDS}秒，每块{STREAM_CHUNK}字节)",
+            self._measure(self._stream_case(_LegacyStreamEncoder)),
+            self._measure(
+                self._stream_case(lambda: OpusEncoderUtils(SAMPLE_RATE, 1, 60))
+            ),
+        )
+
+        print("\n" + "=" * 50)
+        print("下行Opus编码测试结果")
+        print("=" * 50)
+        headers = ["场景", "帧数", "原实现(帧/秒/核)", "新实现(帧/秒/核)", "加速比"]
+        print(tabulate(self.results, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print("- 帧为16kHz单声道60ms，按进程CPU时间计算，即单核每秒处理的帧数")
+        print("- 整句编码：原实现每句新建编码器，新实现同一线程复用编码器并在预分配缓冲区上切帧")
+        print("- 流式编码：原实现用np.append扩充缓冲区，新实现写入固定大小的帧缓冲区")
+        print("- 实时播放每路每秒约17帧，帧/秒/核除以17即单核可支撑的下行路数")
+        print("\n测试完成！")
+
+
+def main():
+    tester = OpusEncoderPerformanceTester()
+    tester.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import time
+import random
+import statistics
+from tabulate import tabulate
+from core.utils.sentence_segmenter import SentenceSegmenter
+
+description = "流式文本分句测试（2000字回答逐token分句的耗时）"
+
+ANSWER_LENGTH = 2000
+ROUNDS = 20
+PUNCTUATIONS = ("。", "？", "?", "！", "!", "；", ";", "：")
+FIRST_SENTENCE_PUNCTUATIONS = ("，", "~", "、", ",") + PUNCTUATIONS
+
+
+def _build_tokens(seed: int, punctuation_ratio: float):
+    """生成2000字的回答并按1~4个字切成token，模拟LLM流式输出"""
+    rng = random.Random(seed)
+    chars = []
+    for _ in range(ANSWER_LENGTH):
+        if rng.random() < punctuation_ratio:
+            chars.append(rng.choice("，。！？；"))
+        else:
+            chars.append(chr(rng.randint(0x4E00, 0x9FA5)))
+    text = "".join(chars)
+    tokens = []
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 4)
+        tokens.append(text[i : i + size])
+        i += size
+    return tokens
+
+
+def _legacy_segment(tokens):
+    """原实现：每个token都拼接整轮文本，并对未处理部分逐个标点rfind"""
+    text_buff = []
+    processed_chars = 0
+    is_first_sentence = True
+    segments = []
+    for token in tokens:
+        text_buff.append(token)
+        full_text = "".join(text_buff)
+        current_text = full_text[processed_chars:]
+        last_punct_pos = -1
+        punctuations = FIRST_SENTENCE_PUNCTUATIONS if is_first_sentence else PUNCTUATIONS
+        for punct in punctuations:
+            pos = current_text.rfind(punct)
+            if (pos != -1 and last_punct_pos == -1) or (pos != -1 and pos < last_punct_pos):
+                last_punct_pos = pos
+        if last_punct_pos != -1:
+            segments.append(current_text[: last_punct_pos + 1])
+            processed_chars += last_punct_pos + 1
+            is_first_sentence = False
+    full_text = "".join(text_buff)
+    if full_text[processed_chars:]:
+        segments.append(full_text[processed_chars:])
+    return segments
+
+
+def _incremental_segment(tokens, max_segment_length=0):
+    segmenter = SentenceSegmenter(
+        PUNCTUATIONS, FIRST_SENTENCE_PUNCTUATIONS, max_segment_length
+    )
+    segments = []
+    for token in tokens:
+        segments.extend(segmenter.push(token))
+    rest = segmenter.flush()
+    if rest:
+        segments.append(rest)
+    return segments
+
+
+class SegmenterPerformanceTester:
+    def __init__(self):
+        self.results = []
+
+    def _measure(self, func, tokens):
+        costs = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            segments = func(tokens)
+            costs.append(time.perf_counter() - start)
+        return statistics.median(costs), len(segments)
+
+    def run(self):
+        cases = [
+            ("正常标点(约5%)", 0.05),
+            ("标点很少(约0.5%)", 0.005),
+            ("没有标点", 0.0),
+        ]
+        for name, ratio in cases:
+            tokens = _build_tokens(0, ratio)
+            print(f"开始测试 {name}，共{len(tokens)}个token ...")
+            legacy_cost, legacy_count = self._measure(_legacy_segment, tokens)
+            new_cost, new_count = self._measure(_incremental_segment, tokens)
+            limited_cost, limited_count = self._measure(
+                lambda t: _incremental_segment(t, 120), tokens
+            )
+            self.results.append(
+                [
+                    name,
+                    f"{legacy_cost * 1000:.3f} ({legacy_count}句)",
+                    f"{new_cost * 1000:.3f} ({new_count}句)",
+                    f"{limited_cost * 1000:.3f} ({limited_count}句)",
+                    f"{legacy_cost / new_cost:.1f}x",
+                ]
+            )
+
+        print("\n" + "=" * 50)
+        print("流式文本分句测试结果")
+        print("=" * 50)
+        headers = ["文本类型", "原实现(ms)", "增量分句(ms)", "增量分句+最大句长120(ms)", "加速比"]
+        print(tabulate(self.results, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print(f"- 每轮回答{ANSWER_LENGTH}字，按1~4字切成token逐个分句，取{ROUNDS}次的中位数")
+        print("- 原实现每个token都重新拼接整轮文本，标点越少、回答越长越慢")
+        print("\n测试完成！")
+
+
+def main():
+    tester = SegmenterPerformanceTester()
+    tester.run()
+
+
+if __name__ == "__main__":
+    main()
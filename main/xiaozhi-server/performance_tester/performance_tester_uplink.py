@@ -0,0 +1,145 @@
+import time
+import wave
+import logging
+from collections import deque
+from types import SimpleNamespace
+import numpy as np
+import opuslib_next
+from tabulate import tabulate
+from config.settings import load_config
+from core.utils.audio_buffer import PCMRingBuffer
+from core.utils.audio_ingest import UplinkAudioDecoder, OPUS_FRAME_SIZE, SAMPLE_RATE
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "上行音频接入CPU开销测试（PCM与Opus对比）"
+
+TEST_WAV = "config/assets/wakeup_words.wav"
+CONNECTIONS = 50
+
+
+class UplinkPerformanceTester:
+    def __init__(self):
+        self.config = load_config()
+        self.pcm = self._load_test_pcm()
+        self.audio_seconds = len(self.pcm) / 2 / SAMPLE_RATE
+        self.vad = self._load_vad()
+        self.results = []
+
+    def _load_test_pcm(self) -> bytes:
+        """读取测试音频并转换为16kHz单声道16位PCM"""
+        with wave.open(TEST_WAV, "rb") as f:
+            channels = f.getnchannels()
+            rate = f.getframerate()
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        if rate != SAMPLE_RATE:
+            positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples)
+        return samples.astype(np.int16).tobytes()
+
+    def _load_vad(self):
+        """加载配置中的VAD，加载失败时只测试解码和缓冲"""
+        try:
+            from core.utils.vad import create_instance
+
+            select_vad_module = self.config["selected_module"]["VAD"]
+            vad_config = self.config["VAD"][select_vad_module]
+            return create_instance(vad_config.get("type", select_vad_module), vad_config)
+        except Exception as e:
+            print(f"VAD加载失败，仅测试解码与缓冲: {e}")
+            return None
+
+    def _build_packets(self):
+        """按60ms切分为上行音频包，分别得到PCM包和Opus包"""
+        frame_bytes = OPUS_FRAME_SIZE * 2
+        encoder = opuslib_next.Encoder(
+            SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO
+        )
+        pcm_packets, opus_packets = [], []
+        for i in range(0, len(self.pcm) - frame_bytes + 1, frame_bytes):
+            frame = self.pcm[i : i + frame_bytes]
+            pcm_packets.append(frame)
+            opus_packets.append(encoder.encode(frame, OPUS_FRAME_SIZE))
+        return {"pcm": pcm_packets, "opus": opus_packets}
+
+    def _create_connection(self):
+        return SimpleNamespace(
+            uplink_decoder=UplinkAudioDecoder(),
+            audio_buffer=PCMRingBuffer(4096, 512),
+            vad_session=None,
+            last_is_voice=False,
+            client_voice_window=deque(maxlen=5),
+            client_have_voice=False,
+            client_voice_stop=False,
+            last_activity_time=0.0,
+        )
+
+    def _run_format(self, audio_format, packets):
+        connections = [self._create_connection() for _ in range(CONNECTIONS)]
+        decode_errors = 0
+        start_cpu = time.process_time()
+        start_wall = time.perf_counter()
+        # 按包轮询所有连接，模拟并发设备的上行节奏
+        for packet in packets:
+            for conn in connections:
+                try:
+                    pcm_frame = conn.uplink_decoder.decode(packet, audio_format)
+                except opuslib_next.OpusError:
+                    decode_errors += 1
+                    continue
+                if self.vad:
+                    self.vad.is_vad(conn, pcm_frame)
+                else:
+                    conn.audio_buffer.write_pcm16(pcm_frame)
+                    conn.audio_buffer.read_chunks()
+        cpu_time = time.process_time() - start_cpu
+        wall_time = time.perf_counter() - start_wall
+        per_conn_ms = cpu_time / CONNECTIONS / self.audio_seconds * 1000
+        return {
+            "format": audio_format,
+            "cpu_time": cpu_time,
+            "wall_time": wall_time,
+            "per_conn_ms": per_conn_ms,
+            "decode_errors": decode_errors,
+        }
+
+    def _print_results(self):
+        print("\n" + "=" * 50)
+        print("上行音频接入CPU开销测试结果")
+        print("=" * 50)
+        headers = ["上行格式", "总CPU时间(s)", "总耗时(s)", "每连接每秒音频CPU(ms)", "解码错误"]
+        table_data = [
+            [
+                r["format"],
+                f"{r['cpu_time']:.3f}",
+                f"{r['wall_time']:.3f}",
+                f"{r['per_conn_ms']:.3f}",
+                r["decode_errors"],
+            ]
+            for r in self.results
+        ]
+        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print(f"- 模拟{CONNECTIONS}个连接，每个连接上行{self.audio_seconds:.1f}秒音频，60ms一个包")
+        print(f"- 测试范围：上行解码 + {'VAD检测' if self.vad else 'VAD缓冲（未加载VAD模型）'}")
+        print("- CPU时间为进程所有线程的CPU时间之和")
+        print("\n测试完成！")
+
+    def run(self):
+        packets = self._build_packets()
+        for audio_format in ("pcm", "opus"):
+            print(f"开始测试 {audio_format} 上行...")
+            self.results.append(self._run_format(audio_format, packets[audio_format]))
+        self._print_results()
+
+
+def main():
+    tester = UplinkPerformanceTester()
+    tester.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import gzip
+import time
+import socket
+import logging
+import threading
+import numpy as np
+from tabulate import tabulate
+from core.utils.audio_aggregator import PCMAggregator
+from core.providers.asr.doubao_stream import ASRProvider
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "流式ASR上行聚合测试（每秒音频的CPU时间和发送次数）"
+
+CONNECTIONS = 100
+AUDIO_SECONDS = 10
+PACKET_MS = 60
+CHUNK_MS_LIST = [0, 120, 200, 400]
+
+
+class UplinkAggregationTester:
+    def __init__(self):
+        # 只使用协议头的构造方法，不需要真实配置
+        self.protocol = ASRProvider.__new__(ASRProvider)
+        self.packets = self._build_packets()
+        self.results = []
+
+    def _build_packets(self):
+        """生成带噪声的语音样音频，按60ms切包"""
+        rng = np.random.default_rng(0)
+        t = np.arange(16000 * AUDIO_SECONDS) / 16000
+        signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t))
+        signal += rng.normal(0, 0.02, len(t))
+        pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+        packet_bytes = 16000 * 2 * PACKET_MS // 1000
+        return [pcm[i : i + packet_bytes] for i in range(0, len(pcm), packet_bytes)]
+
+    def _run(self, chunk_ms):
+        # 用socketpair模拟websocket发送，统计实际的send系统调用次数
+        sender, receiver = socket.socketpair()
+        stop = threading.Event()
+
+        def drain():
+            receiver.settimeout(0.1)
+            while not stop.is_set():
+                try:
+                    receiver.recv(1 << 20)
+                except socket.timeout:
+                    continue
+
+        drain_thread = threading.Thread(target=drain, daemon=True)
+        drain_thread.start()
+
+        aggregators = [PCMAggregator(chunk_ms) for _ in range(CONNECTIONS)]
+        sends = 0
+        sent_bytes = 0
+
+        def send(pcm):
+            nonlocal sends, sent_bytes
+            payload = gzip.compress(pcm)
+            audio_request = bytearray(self.protocol.generate_audio_default_header())
+            audio_request.extend(len(payload).to_bytes(4, "big"))
+            audio_request.extend(payload)
+            sender.sendall(audio_request)
+            sends += 1
+            sent_bytes += len(audio_request)
+
+        start_cpu = time.process_time()
+        for packet in self.packets:
+            for aggregator in aggregators:
+                chunk = aggregator.push(packet)
+                if chunk:
+                    send(chunk)
+        # 说话结束，发送剩余数据
+        for aggregator in aggregators:
+            chunk = aggregator.flush()
+            if chunk:
+                send(chunk)
+        cpu_time = time.process_time() - start_cpu
+
+        stop.set()
+        drain_thread.join()
+        sender.close()
+        receiver.close()
+
+        audio_seconds = CONNECTIONS * AUDIO_SECONDS
+        return [
+            chunk_ms or PACKET_MS,
+            f"{cpu_time / audio_seconds * 1000:.3f}",
+            f"{sends / audio_seconds:.1f}",
+            f"{sent_bytes / audio_seconds / 1024:.1f}",
+        ]
+
+    def run(self):
+        for chunk_ms in CHUNK_MS_LIST:
+            print(f"开始测试 聚合包长={chunk_ms or PACKET_MS}ms ...")
+            self.results.append(self._run(chunk_ms))
+
+        print("\n" + "=" * 50)
+        print("流式ASR上行聚合测试结果")
+        print("=" * 50)
+        headers = ["发送包长(ms)", "每秒音频CPU(ms)", "每秒音频send次数", "每秒音频发送量(KB)"]
+        print(tabulate(self.results, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print(f"- 模拟{CONNECTIONS}个连接各上行{AUDIO_SECONDS}秒音频，客户端每{PACKET_MS}ms一个包")
+        print("- 测试范围：聚合 + gzip压缩 + 协议头 + socket发送")
+        print("\n测试完成！")
+
+
+def main():
+    tester = UplinkAggregationTester()
+    tester.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import sys
+import json
+import time
+import wave
+import logging
+import subprocess
+import numpy as np
+from tabulate import tabulate
+
+# 设置全局日志级别为WARNING，抑制INFO级别日志
+logging.basicConfig(level=logging.WARNING)
+
+description = "VAD后端对比测试（torch与onnxruntime的启动耗时、内存和一致性）"
+
+TEST_WAV = "config/assets/wakeup_words.wav"
+MODEL_DIR = "models/snakers4_silero-vad"
+BACKENDS = ["silero", "silero_onnx"]
+CHUNK_SIZE = 512
+
+# 在独立进程中加载VAD，测量导入+加载模型的耗时和进程常驻内存
+STARTUP_SCRIPT = """
+import json, time, psutil
+start = time.perf_counter()
+from core.utils.vad import create_instance
+vad = create_instance({backend!r}, {{"model_dir": {model_dir!r}}})
+elapsed = time.perf_counter() - start
+rss = psutil.Process().memory_info().rss
+print(json.dumps({{"startup": elapsed, "rss": rss, "torch": "torch" in __import__("sys").modules}}))
+"""
+
+
+class VADBackendTester:
+    def __init__(self):
+        self.chunks = self._load_test_chunks()
+        self.startup_results = []
+        self.parity_results = []
+
+    def _load_test_chunks(self) -> np.ndarray:
+        """读取测试音频，转换为16kHz单声道后按512采样点切块"""
+        with wave.open(TEST_WAV, "rb") as f:
+            channels = f.getnchannels()
+            rate = f.getframerate()
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        samples = samples.astype(np.float32) / 32768.0
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        if rate != 16000:
+            positions = np.arange(0, len(samples), rate / 16000)
+            samples = np.interp(positions, np.arange(len(samples)), samples)
+        count = len(samples) // CHUNK_SIZE
+        return samples[: count * CHUNK_SIZE].astype(np.float32).reshape(count, CHUNK_SIZE)
+
+    def _test_startup(self, backend):
+        script = STARTUP_SCRIPT.format(backend=backend, model_dir=MODEL_DIR)
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"{backend} 加载失败: {result.stderr.strip().splitlines()[-1:]}")
+            return None
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        data["backend"] = backend
+        return data
+
+    def _run_probs(self, vad, batch_size=1):
+        """逐块推理，batch_size路并发连接各自输入同一段音频"""
+        states = [vad.create_model_state() for _ in range(batch_size)]
+        probs = []
+        start = time.perf_counter()
+        for chunk in self.chunks:
+            batch = np.repeat(chunk[np.newaxis], batch_size, axis=0)
+            probs.append(np.asarray(vad.infer_batch(batch, states)))
+        elapsed = time.perf_counter() - start
+        return np.stack(probs), elapsed
+
+    def _test_parity(self):
+        from core.utils.vad import create_instance
+
+        vads = {}
+        for backend in BACKENDS:
+            try:
+                vads[backend] = create_instance(backend, {"model_dir": MODEL_DIR})
+            except Exception as e:
+                print(f"{backend} 加载失败，跳过一致性测试: {e}")
+                return
+        reference, _ = self._run_probs(vads["silero"])
+        for backend, vad in vads.items():
+            probs, elapsed = self._run_probs(vad)
+            batch_probs, batch_elapsed = self._run_probs(vad, batch_size=16)
+            # 批量推理时每一路的结果都应与单路一致
+            batch_diff = np.abs(batch_probs - probs).max()
+            diff = np.abs(probs - reference)
+            agree = np.mean((probs >= 0.5) == (reference >= 0.5))
+            self.parity_results.append(
+                [
+                    backend,
+                    f"{diff.max():.6f}",
+                    f"{agree * 100:.2f}%",
+                    f"{batch_diff:.6f}",
+                    f"{elapsed / len(self.chunks) * 1000:.3f}",
+                    f"{batch_elapsed / len(self.chunks) / 16 * 1000:.3f}",
+                ]
+            )
+            vad.engine.close()
+
+    def _print_results(self):
+        print("\n" + "=" * 50)
+        print("VAD后端启动耗时与内存")
+        print("=" * 50)
+        table = [
+            [
+                r["backend"],
+                f"{r['startup']:.2f}",
+                f"{r['rss'] / 1024 / 1024:.1f}",
+                "是" if r["torch"] else "否",
+            ]
+            for r in self.startup_results
+        ]
+        print(
+            tabulate(
+                table,
+                headers=["VAD类型", "启动耗时(s)", "常驻内存(MB)", "加载了torch"],
+                tablefmt="grid",
+            )
+        )
+
+        if self.parity_results:
+            print("\n" + "=" * 50)
+            print(f"VAD一致性（以silero为基准，共{len(self.chunks)}块）")
+            print("=" * 50)
+            print(
+                tabulate(
+                    self.parity_results,
+                    headers=[
+                        "VAD类型",
+                        "最大概率差",
+                        "判定一致率",
+                        "批量/单路最大差",
+                        "单块耗时(ms)",
+                        "批量单块耗时(ms)",
+                    ],
+                    tablefmt="grid",
+                )
+            )
+        print("\n测试完成！")
+
+    def run(self):
+        for backend in BACKENDS:
+            print(f"开始测试 {backend} 的启动耗时...")
+            result = self._test_startup(backend)
+            if result:
+                self.startup_results.append(result)
+        print("开始测试一致性...")
+        self._test_parity()
+        self._print_results()
+
+
+def main():
+    tester = VADBackendTester()
+    tester.run()
+
+
+if __name__ == "__main__":
+    main()